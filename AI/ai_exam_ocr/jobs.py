@@ -0,0 +1,69 @@
+import json
+import os
+import uuid
+from typing import Dict, Optional
+
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+JOB_REDIS_URL = os.getenv("EXAM_JOB_REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+JOB_TTL = 60 * 60 * 6
+
+# 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_redis_client = None
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(JOB_REDIS_URL)
+    return _redis_client
+
+
+class ExamJob:
+    """
+    시험지 OCR 작업 상태 (Redis)
+    - exam_job:{id}           : status / total / done / error
+    - exam_job:{id}:questions : 문항 index → 문항 JSON (끝나는 대로 추가)
+    """
+
+    def __init__(self, job_id: Optional[str] = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.key = f"exam_job:{self.job_id}"
+        self.questions_key = f"{self.key}:questions"
+        self.client = get_redis()
+
+    def update(self, **fields) -> None:
+        self.client.hset(self.key, mapping={k: str(v) for k, v in fields.items()})
+        self.client.expire(self.key, JOB_TTL)
+
+    def add_question(self, index: int, question: Dict) -> None:
+        pipe = self.client.pipeline()
+        pipe.hset(self.questions_key, int(index), json.dumps(question, ensure_ascii=False))
+        pipe.expire(self.questions_key, JOB_TTL)
+        pipe.hincrby(self.key, "done", 1)
+        pipe.execute()
+
+    def exists(self) -> bool:
+        return bool(self.client.exists(self.key))
+
+    def snapshot(self) -> Dict:
+        state = {k.decode(): v.decode() for k, v in self.client.hgetall(self.key).items()}
+        raw = self.client.hgetall(self.questions_key)
+        ready = sorted(int(k) for k in raw)
+
+        return {
+            "jobId": self.job_id,
+            "status": state.get("status", QUEUED),
+            "total": int(state["total"]) if state.get("total") else None,
+            "done": int(state.get("done", 0)),
+            "error": state.get("error"),
+            # 완료된 문항 (문항 순서대로, index 포함)
+            "questions": [{"index": i, **json.loads(raw[str(i).encode()])} for i in ready],
+        }
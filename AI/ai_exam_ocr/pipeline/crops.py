@@ -0,0 +1,44 @@
+import base64
+import os
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class Crop:
+    """
+    원본 이미지(img_bgr)에서 잘라낸 영역.
+    - image : img_bgr의 numpy view (복사 없음)
+    - png   : 처음 필요할 때 한 번만 인코딩
+    - path  : save()로 파일을 쓴 경우에만 설정 (save_json/debug)
+    """
+
+    def __init__(self, img_bgr: np.ndarray, bbox, name: str):
+        x1, y1, x2, y2 = bbox
+        self.image = img_bgr[y1:y2, x1:x2]
+        self.name = name
+        self.path: Optional[str] = None
+        self._png: Optional[bytes] = None
+
+    @property
+    def empty(self) -> bool:
+        return self.image.size == 0
+
+    @property
+    def png(self) -> bytes:
+        if self._png is None:
+            ok, buf = cv2.imencode(".png", self.image)
+            if not ok:
+                raise ValueError(f"crop 인코딩 실패: {self.name}")
+            self._png = buf.tobytes()
+        return self._png
+
+    def data_url(self) -> str:
+        return "data:image/png;base64," + base64.b64encode(self.png).decode("utf-8")
+
+    def save(self, output_dir: str) -> str:
+        self.path = os.path.join(output_dir, self.name)
+        with open(self.path, "wb") as f:
+            f.write(self.png)
+        return self.path
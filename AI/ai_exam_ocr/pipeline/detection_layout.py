@@ -1,51 +1,27 @@
 from typing import List, Dict, Any, Tuple
+import os
 import re
+import json
 import base64
 import cv2
-import requests
+import numpy as np
+from llm_gateway import chat
+from ocr_pool import recognize_crops
 
+from layout_order import assign_columns, column_boundaries
+from ai_exam_ocr.pipeline.detectors import get_detector
 from ai_exam_ocr.pipeline.ocr_hybrid import (
-    enhance_for_ocr,
-    get_openai,
+    run_concurrently,
     _extract_text_from_openai_message,
 )
 
 
 # ==============================
-# 1. Roboflow 객체 검출
+# 1. 레이아웃 객체 검출 (ONNX 로컬 / Roboflow HTTP, detectors.py)
 # ==============================
 
-def detect_boxes_with_roboflow(img_path: str,
-                               api_key: str,
-                               model_id: str) -> Tuple[Any, List[Dict[str, Any]]]:
-
-    img_bgr = cv2.imread(img_path)
-    if img_bgr is None:
-        raise FileNotFoundError(img_path)
-
-    with open(img_path, "rb") as f:
-        resp = requests.post(
-            f"https://detect.roboflow.com/{model_id}"
-            f"?api_key={api_key}&format=json&confidence=0.2&overlap=0.1",
-            files={"file": f}
-        )
-
-    data = resp.json()
-    preds = data.get("predictions", [])
-
-    all_boxes: List[Dict[str, Any]] = []
-    for p in preds:
-        x, y, pw, ph = p["x"], p["y"], p["width"], p["height"]
-        cls = p["class"]
-        x1 = int(x - pw / 2)
-        y1 = int(y - ph / 2)
-        x2 = int(x + pw / 2)
-        y2 = int(y + ph / 2)
-        all_boxes.append(
-            {"class_name": cls, "bbox": (x1, y1, x2, y2), "conf": p.get("confidence", 0.0)}
-        )
-
-    return img_bgr, all_boxes
+def detect_boxes(img_bgr) -> List[Dict[str, Any]]:
+    return get_detector().detect(img_bgr)
 
 
 # ==============================
@@ -68,10 +44,8 @@ def ocr_qnum_only(img_bgr, bbox) -> Tuple[int | None, str]:
     b64 = base64.b64encode(buf).decode("utf-8")
     data_url = f"data:image/jpeg;base64,{b64}"
 
-    client = get_openai()
-
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
+    resp = chat(
+        "gpt-4o-mini",
         messages=[
             {
                 "role": "system",
@@ -100,38 +74,136 @@ def ocr_qnum_only(img_bgr, bbox) -> Tuple[int | None, str]:
 
 
 # ==============================
-# 3. 레이아웃 검출
+# 2-1. qnum 일괄 인식 (로컬 RapidOCR → 남은 것만 GPT 1회)
 # ==============================
 
-def detect_layout_and_mid_x(qnum_boxes: List[Dict[str, Any]],
-                            img_width: int,
-                            min_gap_ratio: float = 0.15) -> Tuple[str, float | None]:
+QNUM_LOCAL_MIN_SCORE = float(os.getenv("QNUM_LOCAL_MIN_SCORE", 0.8))
+QNUM_PATTERN = re.compile(r"^\D{0,2}(\d{1,3})\D{0,2}$")  # '12', '12.', '(3)', 'Q5' 등
+
+
+def parse_qnum_local(text: str, score: float) -> int | None:
+    """로컬 인식 결과가 숫자 형태이고 신뢰도가 충분하면 번호, 아니면 None"""
+    m = QNUM_PATTERN.match(text.strip())
+    if m and score >= QNUM_LOCAL_MIN_SCORE:
+        return int(m.group(1))
+    return None
+
+
+def read_qnums_local(crops: List[Any]) -> List[Tuple[int | None, str]]:
+    """RapidOCR 인식 모델만으로 qnum crop 전체를 한 번에 읽기 (공용 세션 풀, rec 배치 추론)"""
+    results: List[Tuple[int | None, str]] = [(None, "")] * len(crops)
+    valid = [i for i, crop in enumerate(crops) if crop.size]
+    for i, (text, score) in zip(valid, recognize_crops([crops[i] for i in valid])):
+        results[i] = (parse_qnum_local(text, score), text)
+    return results
+
+
+def read_qnums_batch(crops: List[Any]) -> List[Tuple[int | None, str]]:
+    """여러 qnum crop을 한 번의 요청으로 읽는다. 응답: {"0": 3, "1": 12, ...}"""
+    content = []
+    for i, crop in enumerate(crops):
+        _, buf = cv2.imencode(".jpg", crop)
+        b64 = base64.b64encode(buf).decode("utf-8")
+        content.append({"type": "text", "text": f"[{i}]"})
+        content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}})
+    content.append({
+        "type": "text",
+        "text": "각 [번호] 바로 뒤 이미지의 문항 번호(숫자)를 읽어 JSON으로만 답하라. "
+                "예: {\"0\": 3, \"1\": 12}. 숫자가 없으면 null.",
+    })
+
+    resp = chat(
+        "gpt-4o-mini",
+        response_format={"type": "json_object"},
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "너는 시험지의 '문항 번호(숫자)'만 읽어주는 초정밀 OCR 보정기다.\n"
+                    "이미지마다 문항 번호 1개만 읽어라. 다른 글자나 문장은 절대 출력하지 마라.\n"
+                )
+            },
+            {"role": "user", "content": content},
+        ]
+    )
+
+    txt = _extract_text_from_openai_message(resp.choices[0].message)
+    answers = json.loads(txt)
 
-    centers = sorted(((b["bbox"][0] + b["bbox"][2]) / 2.0 for b in qnum_boxes))
-    if len(centers) < 3:
-        return "single", None
+    results = []
+    for i in range(len(crops)):
+        value = answers.get(str(i))
+        m = re.search(r"\d+", str(value)) if value is not None else None
+        results.append((int(m.group(0)), str(value)) if m else (None, str(value or "")))
+    return results
 
-    gaps = [centers[i + 1] - centers[i] for i in range(len(centers) - 1)]
-    max_gap = max(gaps)
-    max_gap_idx = gaps.index(max_gap)
 
-    if max_gap / img_width > min_gap_ratio:
-        mid_x = (centers[max_gap_idx] + centers[max_gap_idx + 1]) / 2.0
-        left_cnt = sum(c < mid_x for c in centers)
-        right_cnt = sum(c >= mid_x for c in centers)
-        if left_cnt >= 1 and right_cnt >= 1:
-            return "double", mid_x
+def read_qnums(img_bgr, bboxes: List[Tuple[int, int, int, int]]) -> List[Tuple[int | None, str]]:
+    """
+    qnum 박스들의 (번호, 원문) 목록 (입력 순서 유지)
+    1) 로컬 RapidOCR로 확실한 숫자는 바로 확정
+    2) 나머지는 GPT Vision 1회 일괄 요청
+    3) 일괄 요청이 실패하면 박스별 요청(ocr_qnum_only)으로 대체
+    """
+    crops = [img_bgr[y1:y2, x1:x2] for x1, y1, x2, y2 in bboxes]
+    results: List[Tuple[int | None, str]] = [(None, "")] * len(crops)
+
+    try:
+        local = read_qnums_local(crops)
+    except Exception as e:
+        print(f"[QNUM] 로컬 인식 실패 | {e}")
+        local = [(None, "")] * len(crops)
+
+    remaining = []
+    for i, (qnum, raw) in enumerate(local):
+        if qnum is not None:
+            results[i] = (qnum, raw)
+        else:
+            remaining.append(i)
 
-    return "single", None
+    print(f"[QNUM] 로컬 확정 {len(crops) - len(remaining)}/{len(crops)}, GPT 요청 {len(remaining)}")
+    if not remaining:
+        return results
 
+    try:
+        batch = read_qnums_batch([crops[i] for i in remaining])
+    except Exception as e:
+        print(f"[QNUM] 일괄 요청 실패, 박스별 요청으로 대체 | {e}")
+        batch = run_concurrently(ocr_qnum_only, [(img_bgr, bboxes[i]) for i in remaining], label="QNUM")
 
-def split_by_mid_x(boxes: List[Dict[str, Any]], mid_x: float):
-    left, right = [], []
-    for b in boxes:
-        x1, y1, x2, y2 = b["bbox"]
-        cx = (x1 + x2) / 2.0
-        (left if cx < mid_x else right).append(b)
-    return left, right
+    for i, result in zip(remaining, batch):
+        results[i] = result
+    return results
+
+
+# ==============================
+# 3. 레이아웃 검출 (numpy: 박스 N개 → (N, 4) 배열)
+# ==============================
+
+def boxes_array(boxes: List[Dict[str, Any]]) -> np.ndarray:
+    return np.array([b["bbox"] for b in boxes], dtype=np.float64).reshape(-1, 4)
+
+
+def detect_columns(qnum_boxes: List[Dict[str, Any]],
+                   img_width: int,
+                   min_gap_ratio: float = 0.15) -> np.ndarray:
+    """
+    qnum 중심 x좌표 사이 간격이 이미지 폭의 min_gap_ratio보다 큰 곳을 모두 단 경계로 본다.
+    반환: 단 경계 x좌표 배열 (1단이면 빈 배열, N단이면 N-1개)
+    1단/2단은 이전 구현(가장 넓은 간격 한 곳만 경계)과 결과가 같고, 3단 이상은 모든 단으로 나뉜다.
+    (tests/test_exam_layout.py)
+    """
+    arr = boxes_array(qnum_boxes)
+    return column_boundaries((arr[:, 0] + arr[:, 2]) / 2.0, img_width, min_gap_ratio)
+
+
+def split_columns(boxes: List[Dict[str, Any]], boundaries: np.ndarray) -> List[List[Dict[str, Any]]]:
+    """박스 중심 x가 속한 단별로 나눈다 (경계와 같으면 오른쪽 단)"""
+    arr = boxes_array(boxes)
+    columns: List[List[Dict[str, Any]]] = [[] for _ in range(len(boundaries) + 1)]
+    for b, col in zip(boxes, assign_columns((arr[:, 0] + arr[:, 2]) / 2.0, boundaries)):
+        columns[col].append(b)
+    return columns
 
 
 # ==============================
@@ -141,11 +213,17 @@ def split_by_mid_x(boxes: List[Dict[str, Any]], mid_x: float):
 def assign_by_qnum_spans(content_boxes: List[Dict[str, Any]],
                          qnums: List[Dict[str, Any]],
                          img_height: int):
-
+    """
+    qnum을 y1 순으로 정렬해 [top, 다음 qnum top) 구간을 만들고,
+    content 중심 y가 속한 구간을 searchsorted로 찾는다. (O((N + Q) log Q))
+    """
     if not qnums:
         return [], {}
 
-    qnums_sorted = sorted(qnums, key=lambda b: b["bbox"][1])
+    order = np.argsort(boxes_array(qnums)[:, 1], kind="stable")
+    qnums_sorted = [qnums[i] for i in order]
+    tops = boxes_array(qnums_sorted)[:, 1]
+    bottoms = np.append(tops[1:], img_height)
 
     spans = []
     for i, qb in enumerate(qnums_sorted):
@@ -154,13 +232,19 @@ def assign_by_qnum_spans(content_boxes: List[Dict[str, Any]],
         spans.append({"idx": i, "qnum_box": qb, "top": top, "bottom": bottom})
 
     groups = {s["idx"]: [] for s in spans}
-    for b in content_boxes:
-        y1, y2 = b["bbox"][1], b["bbox"][3]
-        cy = (y1 + y2) / 2
-        for s in spans:
-            if s["top"] <= cy < s["bottom"]:
-                groups[s["idx"]].append(b)
-                break
+    if not content_boxes:
+        return spans, groups
+
+    arr = boxes_array(content_boxes)
+    cy = (arr[:, 1] + arr[:, 3]) / 2
+    # top이 같은 구간이 여러 개면 마지막 것만 폭이 있으므로 side="right"
+    span_idx = np.searchsorted(tops, cy, side="right") - 1
+    valid = span_idx >= 0
+    valid[valid] &= cy[valid] < bottoms[span_idx[valid]]
+
+    for b, idx, ok in zip(content_boxes, span_idx, valid):
+        if ok:
+            groups[int(idx)].append(b)
 
     return spans, groups
 
@@ -214,10 +298,9 @@ def build_structured_questions(img_bgr,
 
     print(f"[PIPE] qnum 개수: {len(qnum_boxes)}")
 
-    for b in qnum_boxes:
-        print(f"[PIPE] qnum OCR 실행 중: bbox={b['bbox']}")
-        qnum, raw = ocr_qnum_only(img_bgr, b["bbox"])
+    qnum_results = read_qnums(img_bgr, [b["bbox"] for b in qnum_boxes])
 
+    for b, (qnum, raw) in zip(qnum_boxes, qnum_results):
         if qnum is None:
             # 숫자 없음 → text로 강등
             demoted_to_text.append(
@@ -232,31 +315,20 @@ def build_structured_questions(img_bgr,
     content_boxes += demoted_to_text
 
     # -----------------------
-    # 레이아웃(single / double)
+    # 레이아웃 (단 개수는 qnum x 분포로 결정)
     # -----------------------
-    layout, mid_x = detect_layout_and_mid_x(qnum_boxes, w)
-
-    if layout == "single":
-        left_qnums, right_qnums = qnum_boxes, []
-        left_contents, right_contents = content_boxes, []
-    else:
-        left_qnums, right_qnums = split_by_mid_x(qnum_boxes, mid_x)
-        left_contents, right_contents = split_by_mid_x(content_boxes, mid_x)
-
-    left_spans, left_groups = assign_by_qnum_spans(left_contents, left_qnums, h)
-
-    if layout == "double":
-        right_spans, right_groups = assign_by_qnum_spans(right_contents, right_qnums, h)
-    else:
-        right_spans, right_groups = [], {}
+    boundaries = detect_columns(qnum_boxes, w)
+    qnum_columns = split_columns(qnum_boxes, boundaries)
+    content_columns = split_columns(content_boxes, boundaries)
 
     # -----------------------
-    # 구조화
+    # 구조화 (단 순서대로)
     # -----------------------
-    left_struct = build_structured(left_spans, left_groups)
-    right_struct = build_structured(right_spans, right_groups)
+    structured_questions = []
+    for col_qnums, col_contents in zip(qnum_columns, content_columns):
+        spans, groups = assign_by_qnum_spans(col_contents, col_qnums, h)
+        structured_questions += build_structured(spans, groups)
 
-    structured_questions = left_struct + right_struct
     structured_questions = sorted(
         structured_questions,
         key=lambda q: (q["question_number"] if q["question_number"] is not None else 9999),
@@ -0,0 +1,350 @@
+# 시험지 레이아웃(qnum/text/choice/chart/table/code) 박스 검출기.
+#
+# - OnnxDetector      : 로컬 ONNX Runtime (Roboflow에서 export한 YOLO 모델), 여러 페이지 요청을 모아 배치 추론
+# - RoboflowDetector  : detect.roboflow.com HTTP API (세션 재사용 + 타임아웃)
+# - FallbackDetector  : 1순위 검출기가 실패하면 2순위로 재시도
+#
+# 모든 검출기는 detect(img_bgr) → [{"class_name", "bbox": (x1, y1, x2, y2), "conf"}] 형태로 같은 결과를 돌려준다.
+# 여러 페이지는 페이지별 요청이 동시에 detect()를 호출하면 OnnxDetector가 모아서 배치 추론한다.
+#
+# 벤치마크: python -m ai_exam_ocr.pipeline.detectors page1.jpg page2.jpg ...
+
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+LAYOUT_DETECTOR = os.getenv("LAYOUT_DETECTOR", "auto")  # auto | onnx | roboflow
+LAYOUT_CONFIDENCE = float(os.getenv("LAYOUT_CONFIDENCE", 0.2))
+LAYOUT_OVERLAP = float(os.getenv("LAYOUT_OVERLAP", 0.1))  # NMS IoU 기준 (Roboflow overlap과 동일 의미)
+
+ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
+ROBOFLOW_MODEL_ID = os.getenv("ROBOFLOW_MODEL_ID", "ccd-pn4pd/11")
+ROBOFLOW_TIMEOUT = float(os.getenv("ROBOFLOW_TIMEOUT", 30))
+
+LAYOUT_ONNX_MODEL = os.getenv("LAYOUT_ONNX_MODEL")
+LAYOUT_ONNX_INPUT_SIZE = int(os.getenv("LAYOUT_ONNX_INPUT_SIZE", 640))
+LAYOUT_ONNX_THREADS = int(os.getenv("LAYOUT_ONNX_THREADS", 0))  # 0 = onnxruntime 기본값
+# export된 모델의 클래스 순서 (Roboflow export는 알파벳 순)
+LAYOUT_ONNX_CLASSES = os.getenv("LAYOUT_ONNX_CLASSES", "chart,choice,code,qnum,table,text").split(",")
+LAYOUT_BATCH_SIZE = int(os.getenv("LAYOUT_BATCH_SIZE", 8))
+LAYOUT_BATCH_WINDOW_MS = float(os.getenv("LAYOUT_BATCH_WINDOW_MS", 20))
+
+
+def make_box(class_name: str, cx: float, cy: float, w: float, h: float, conf: float) -> Dict[str, Any]:
+    """중심좌표/크기 → 검출 결과 dict (Roboflow 응답과 같은 반올림 방식)"""
+    return {
+        "class_name": class_name,
+        "bbox": (int(cx - w / 2), int(cy - h / 2), int(cx + w / 2), int(cy + h / 2)),
+        "conf": float(conf),
+    }
+
+
+class LayoutDetector(ABC):
+    name = "base"
+
+    @abstractmethod
+    def detect(self, img_bgr) -> List[Dict[str, Any]]:
+        ...
+
+    def detect_batch(self, images: List[Any]) -> List[List[Dict[str, Any]]]:
+        return [self.detect(img) for img in images]
+
+
+# ==============================
+# 1. Roboflow HTTP
+# ==============================
+
+class RoboflowDetector(LayoutDetector):
+    name = "roboflow"
+
+    def __init__(self, api_key: str, model_id: str, timeout: float = ROBOFLOW_TIMEOUT):
+        if not api_key:
+            raise RuntimeError("ROBOFLOW_API_KEY 환경변수를 설정해 주세요.")
+        self.url = f"https://detect.roboflow.com/{model_id}"
+        self.params = {
+            "api_key": api_key,
+            "format": "json",
+            "confidence": LAYOUT_CONFIDENCE,
+            "overlap": LAYOUT_OVERLAP,
+        }
+        self.timeout = timeout
+        # 페이지마다 TLS 연결을 새로 맺지 않도록 세션 재사용
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+    def detect(self, img_bgr) -> List[Dict[str, Any]]:
+        ok, buf = cv2.imencode(".jpg", img_bgr, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        if not ok:
+            raise ValueError("이미지 인코딩 실패")
+
+        resp = self.session.post(
+            self.url,
+            params=self.params,
+            files={"file": ("page.jpg", buf.tobytes(), "image/jpeg")},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+
+        return [
+            make_box(p["class"], p["x"], p["y"], p["width"], p["height"], p.get("confidence", 0.0))
+            for p in resp.json().get("predictions", [])
+        ]
+
+
+# ==============================
+# 2. 로컬 ONNX Runtime
+# ==============================
+
+def letterbox(img_bgr, size: int):
+    """비율 유지 리사이즈 + 회색 패딩 → (size x size 이미지, scale, pad_x, pad_y)"""
+    h, w = img_bgr.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = int(round(h * scale)), int(round(w * scale))
+    resized = cv2.resize(img_bgr, (nw, nh), interpolation=cv2.INTER_LINEAR)
+
+    pad_x, pad_y = (size - nw) // 2, (size - nh) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = resized
+    return canvas, scale, pad_x, pad_y
+
+
+class OnnxDetector(LayoutDetector):
+    """
+    YOLOv8 계열 출력 (batch, 4 + 클래스 수, anchors)을 가정.
+    동시에 들어온 여러 페이지 요청은 짧은 대기 시간 동안 모아 한 번에 추론한다.
+    """
+    name = "onnx"
+
+    def __init__(self, model_path: str, class_names: List[str] = LAYOUT_ONNX_CLASSES,
+                 input_size: int = LAYOUT_ONNX_INPUT_SIZE):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if LAYOUT_ONNX_THREADS:
+            options.intra_op_num_threads = LAYOUT_ONNX_THREADS
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # 배치 차원이 고정(1)인 모델은 한 장씩 추론
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.class_names = class_names
+        self.input_size = input_size
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    # ---------- 추론 ----------
+
+    def _postprocess(self, pred, scale: float, pad_x: int, pad_y: int) -> List[Dict[str, Any]]:
+        if pred.shape[0] == 4 + len(self.class_names):
+            pred = pred.T  # (anchors, 4 + 클래스 수)
+
+        scores = pred[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), class_ids]
+        keep = confs >= LAYOUT_CONFIDENCE
+        boxes, class_ids, confs = pred[keep, :4], class_ids[keep], confs[keep]
+        if not len(boxes):
+            return []
+
+        # letterbox 좌표 → 원본 좌표
+        boxes = boxes.copy()
+        boxes[:, 0] = (boxes[:, 0] - pad_x) / scale
+        boxes[:, 1] = (boxes[:, 1] - pad_y) / scale
+        boxes[:, 2:4] /= scale
+
+        # 클래스별 NMS
+        xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2,
+                                boxes[:, 2], boxes[:, 3]])
+        results = []
+        for cls in np.unique(class_ids):
+            idx = np.flatnonzero(class_ids == cls)
+            kept = cv2.dnn.NMSBoxes(xywh[idx].tolist(), confs[idx].tolist(),
+                                    LAYOUT_CONFIDENCE, LAYOUT_OVERLAP)
+            for k in np.array(kept).reshape(-1):
+                i = idx[k]
+                cx, cy, w, h = boxes[i]
+                results.append(make_box(self.class_names[cls], cx, cy, w, h, confs[i]))
+        return results
+
+    def infer(self, images: List[Any]) -> List[List[Dict[str, Any]]]:
+        prepared = [letterbox(img, self.input_size) for img in images]
+        blob = np.stack([p[0] for p in prepared])[..., ::-1]  # BGR → RGB
+        blob = np.ascontiguousarray(blob.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+        if self.dynamic_batch:
+            preds = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            preds = np.concatenate([self.session.run(None, {self.input_name: b[None]})[0] for b in blob])
+
+        return [self._postprocess(pred, scale, px, py) for pred, (_, scale, px, py) in zip(preds, prepared)]
+
+    def detect_batch(self, images: List[Any]) -> List[List[Dict[str, Any]]]:
+        results = []
+        for i in range(0, len(images), LAYOUT_BATCH_SIZE):
+            results.extend(self.infer(images[i:i + LAYOUT_BATCH_SIZE]))
+        return results
+
+    # ---------- 요청 모으기 ----------
+
+    def detect(self, img_bgr) -> List[Dict[str, Any]]:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((img_bgr, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._batch_loop, name="layout-onnx", daemon=True)
+                self._worker.start()
+
+    def _batch_loop(self):
+        window = LAYOUT_BATCH_WINDOW_MS / 1000.0
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + window
+            while len(batch) < LAYOUT_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                results = self.infer([img for img, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if len(batch) > 1:
+                print(f"[LAYOUT] onnx 배치 추론: {len(batch)}장")
+            for (_, future), boxes in zip(batch, results):
+                future.set_result(boxes)
+
+
+# ==============================
+# 3. fallback / 선택
+# ==============================
+
+class FallbackDetector(LayoutDetector):
+    def __init__(self, primary: LayoutDetector, fallback: LayoutDetector):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def detect(self, img_bgr) -> List[Dict[str, Any]]:
+        try:
+            return self.primary.detect(img_bgr)
+        except Exception as e:
+            print(f"[LAYOUT] {self.primary.name} 검출 실패 → {self.fallback.name} 사용: {e}")
+            return self.fallback.detect(img_bgr)
+
+    def detect_batch(self, images: List[Any]) -> List[List[Dict[str, Any]]]:
+        try:
+            return self.primary.detect_batch(images)
+        except Exception as e:
+            print(f"[LAYOUT] {self.primary.name} 배치 검출 실패 → {self.fallback.name} 사용: {e}")
+            return self.fallback.detect_batch(images)
+
+
+_DETECTORS: Dict[int, LayoutDetector] = {}
+_lock = threading.Lock()
+
+
+def build_detector(kind: str = LAYOUT_DETECTOR) -> LayoutDetector:
+    onnx_ready = bool(LAYOUT_ONNX_MODEL) and os.path.exists(LAYOUT_ONNX_MODEL)
+
+    if kind == "roboflow":
+        return RoboflowDetector(ROBOFLOW_API_KEY, ROBOFLOW_MODEL_ID)
+    if kind == "onnx":
+        return OnnxDetector(LAYOUT_ONNX_MODEL)
+
+    # auto: 로컬 모델이 있으면 ONNX 우선 (Roboflow 키가 있으면 fallback)
+    if onnx_ready:
+        local = OnnxDetector(LAYOUT_ONNX_MODEL)
+        if ROBOFLOW_API_KEY:
+            return FallbackDetector(local, RoboflowDetector(ROBOFLOW_API_KEY, ROBOFLOW_MODEL_ID))
+        return local
+    return RoboflowDetector(ROBOFLOW_API_KEY, ROBOFLOW_MODEL_ID)
+
+
+def get_detector() -> LayoutDetector:
+    # Celery prefork 워커마다 세션/배치 스레드를 따로 생성
+    pid = os.getpid()
+    with _lock:
+        if pid not in _DETECTORS:
+            _DETECTORS[pid] = build_detector()
+            print(f"[LAYOUT] detector: {_DETECTORS[pid].name}")
+        return _DETECTORS[pid]
+
+
+# ==============================
+# 4. 벤치마크
+# ==============================
+
+def benchmark(image_paths: List[str], repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """사용 가능한 백엔드별 페이지당 지연시간(ms) 비교"""
+    images = [cv2.imread(p) for p in image_paths]
+    images = [img for img in images if img is not None]
+    if not images:
+        raise ValueError("읽을 수 있는 이미지가 없습니다.")
+
+    backends: Dict[str, LayoutDetector] = {}
+    if LAYOUT_ONNX_MODEL and os.path.exists(LAYOUT_ONNX_MODEL):
+        backends["onnx"] = OnnxDetector(LAYOUT_ONNX_MODEL)
+    if ROBOFLOW_API_KEY:
+        backends["roboflow"] = RoboflowDetector(ROBOFLOW_API_KEY, ROBOFLOW_MODEL_ID)
+
+    report = {}
+    for name, detector in backends.items():
+        detector.detect_batch(images[:1])  # warm-up (세션 초기화/TLS 연결)
+
+        per_page = []
+        for _ in range(repeat):
+            for img in images:
+                t = time.perf_counter()
+                detector.detect_batch([img])
+                per_page.append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        for _ in range(repeat):
+            detector.detect_batch(images)
+        batched = (time.perf_counter() - t) * 1000 / (repeat * len(images))
+
+        per_page.sort()
+        report[name] = {
+            "pages": len(images),
+            "p50_ms": round(per_page[len(per_page) // 2], 1),
+            "p95_ms": round(per_page[min(len(per_page) - 1, int(len(per_page) * 0.95))], 1),
+            "batched_ms_per_page": round(batched, 1),
+        }
+        print(f"[BENCH] {name}: {report[name]}")
+
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: python -m ai_exam_ocr.pipeline.detectors page1.jpg [page2.jpg ...]")
+
+    benchmark(sys.argv[1:])
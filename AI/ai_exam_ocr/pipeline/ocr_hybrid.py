@@ -2,15 +2,19 @@ from __future__ import annotations
 
 import os
 import re
+import time
 import base64
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence
 
 import cv2
 import numpy as np
 #from paddleocr import PaddleOCR
 from ai_file_ocr.pipeline.rewrite import code_rewrite, process_latex
-from openai import OpenAI
+from ai_exam_ocr.pipeline.crops import Crop
 from dotenv import load_dotenv
+from llm_gateway import chat
 
 load_dotenv()
 
@@ -18,13 +22,8 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY 환경변수를 설정해 주세요.")
 
-_OPENAI_CLIENT = None
-
-def get_openai():
-    global _OPENAI_CLIENT
-    if _OPENAI_CLIENT is None:
-        _OPENAI_CLIENT = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    return _OPENAI_CLIENT
+# 한 시험지 안에서 동시에 보내는 GPT Vision 요청 수 (모델별 전역 한도는 llm_gateway)
+EXAM_OCR_CONCURRENCY = int(os.getenv("EXAM_OCR_CONCURRENCY", 8))
 
 TEXTUAL_CLASSES = {"qnum", "text", "choice", "code"}
 VISUAL_CLASSES = {"chart", "table"}
@@ -131,6 +130,39 @@ def enhance_for_choice(crop_bgr: np.ndarray, scale: int = 4, pad: int = 8) -> np
 #     return "\n".join(lines).strip()
 
 
+def run_concurrently(fn: Callable, jobs: Sequence[tuple], label: str,
+                     max_workers: int = EXAM_OCR_CONCURRENCY,
+                     on_result: Callable[[int, Any], None] | None = None) -> List[Any]:
+    """
+    jobs(인자 튜플)를 병렬 실행하고 입력 순서대로 결과 반환 + 항목별 소요시간 출력
+    on_result(i, result)는 항목이 끝나는 즉시 작업 스레드에서 호출된다.
+    """
+    if not jobs:
+        return []
+
+    timings = [0.0] * len(jobs)
+
+    def timed(i, args):
+        t = time.time()
+        try:
+            result = fn(*args)
+        finally:
+            timings[i] = time.time() - t
+            print(f"[{label}] #{i} {timings[i]:.2f} sec")
+        if on_result:
+            on_result(i, result)
+        return result
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        futures = [pool.submit(timed, i, args) for i, args in enumerate(jobs)]
+        results = [f.result() for f in futures]
+
+    print(f"[{label}] {len(jobs)}건 | wall {time.time() - t0:.2f} sec | "
+          f"sum {sum(timings):.2f} sec | max {max(timings):.2f} sec")
+    return results
+
+
 def _extract_text_from_openai_message(message) -> str:
     """OpenAI SDK message.content 안전 추출."""
     content = message.content
@@ -153,15 +185,18 @@ def _extract_text_from_openai_message(message) -> str:
 # 2. GPT Hybrid OCR
 # ==============================
 
-def hybrid_gpt_vision_with_paddle(img_path: str,
+def hybrid_gpt_vision_with_paddle(image: Crop | str,
                                   kind: str = "text") -> str:
-    with open(img_path, "rb") as f:
-        image_bytes = f.read()
-    b64 = base64.b64encode(image_bytes).decode("utf-8")
+    if isinstance(image, Crop):
+        image_url = image.data_url()
+    else:
+        with open(image, "rb") as f:
+            image_bytes = f.read()
+        b64 = base64.b64encode(image_bytes).decode("utf-8")
 
-    ext = os.path.splitext(img_path)[1].lower()
-    mime = "image/jpeg" if ext in [".jpg", ".jpeg"] else "image/png"
-    image_url = f"data:{mime};base64,{b64}"
+        ext = os.path.splitext(image)[1].lower()
+        mime = "image/jpeg" if ext in [".jpg", ".jpeg"] else "image/png"
+        image_url = f"data:{mime};base64,{b64}"
 
     # kind별 프롬프트
     if kind == "qnum":
@@ -203,10 +238,8 @@ def hybrid_gpt_vision_with_paddle(img_path: str,
             f"이미지 안에는 {desc}가 들어있다.\n"
         )
 
-    client = get_openai()
-
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
+    resp = chat(
+        "gpt-4o-mini",
         messages=[
             {"role": "system", "content": system_prompt},
             {
@@ -317,44 +350,63 @@ def build_reading_text(kind: str, raw: str) -> str:
 # 4. seq_meta에 하이브리드 OCR 적용
 # ==============================
 
-def run_hybrid_ocr_on_seq_meta(seq_meta: List[Dict[str, Any]]):
+def _ocr_item(crop: Crop, kind: str) -> str:
+    gpt_text = hybrid_gpt_vision_with_paddle(crop, kind=kind)
+    clean_text = code_rewrite(gpt_text)
+    clean_text = process_latex(clean_text)
+    return clean_text
+
+
+def run_hybrid_ocr_on_seq_meta(seq_meta: List[Dict[str, Any]],
+                               on_question: Callable[[int, Dict[str, Any]], None] | None = None):
+    """
+    on_question(index, q)는 문항의 모든 item OCR이 끝나는 즉시 호출된다.
+    (요청은 읽기 순서대로 들어가므로 앞 문항부터 먼저 끝나는 편)
+    """
     total_items = sum(len(q["items"]) for q in seq_meta)
     processed = 0
+    targets = []  # GPT 요청 대상 item (순서 유지)
+    owners = []   # targets[i]가 속한 문항 index
 
-    for q in seq_meta:
+    for q_index, q in enumerate(seq_meta):
         qnum = q.get("question_number", "unknown")
         print(f"\n[HYBRID] === 문항 {qnum} 시작 ===")
 
         for item in q["items"]:
             processed += 1
             kind = item["kind"]
-            path = item["path"]
-
 
             if kind not in TEXTUAL_CLASSES:
                 print("    → 시각요소(chart/table)라 OCR 생략")
                 continue
 
-            crop = cv2.imread(path)
-            if crop is None:
-                print("    → 이미지 로드 실패 (건너뜀)")
+            if item["crop"].empty:
+                print("    → 빈 영역 (건너뜀)")
                 item["gpt_hybrid_text"] = ""
                 continue
 
-            if kind == "code":
-                crop_for_paddle = enhance_for_code(crop)
-            elif kind == "choice":
-                crop_for_paddle = enhance_for_choice(crop)
-            else:
-                crop_for_paddle = enhance_for_ocr(crop)
-
-           
-            paddle_text = ""  # 지금은 안 씀
-
-           
-            gpt_text = hybrid_gpt_vision_with_paddle(path, kind=kind)
-            clean_text = code_rewrite(gpt_text)
-            clean_text = process_latex(clean_text)
-            item["gpt_hybrid_text"] = clean_text
+            targets.append(item)
+            owners.append(q_index)
+
+    remaining = [owners.count(i) for i in range(len(seq_meta))]
+    lock = threading.Lock()
+
+    def item_done(i, clean_text):
+        targets[i]["gpt_hybrid_text"] = clean_text
+        with lock:
+            remaining[owners[i]] -= 1
+            finished = remaining[owners[i]] == 0
+        if finished and on_question:
+            on_question(owners[i], seq_meta[owners[i]])
+
+    # OCR할 item이 없는 문항은 바로 완료
+    if on_question:
+        for q_index, count in enumerate(remaining):
+            if count == 0:
+                on_question(q_index, seq_meta[q_index])
+
+    # item별 GPT 호출은 병렬로, 결과는 원래 item 순서대로 채운다
+    run_concurrently(_ocr_item, [(item["crop"], item["kind"]) for item in targets],
+                     label="HYBRID", on_result=item_done)
 
     return seq_meta
@@ -3,22 +3,17 @@
 import os
 import re
 import json
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any
 
 import cv2
 from dotenv import load_dotenv
-from ai_exam_ocr.pipeline.detection_layout import detect_boxes_with_roboflow, build_structured_questions
+from ai_exam_ocr.pipeline.detection_layout import detect_boxes, build_structured_questions
 from ai_exam_ocr.pipeline.ocr_hybrid import run_hybrid_ocr_on_seq_meta, build_reading_text
+from ai_exam_ocr.pipeline.crops import Crop
 
 
 load_dotenv()
 
-ROBOFLOW_API_KEY = os.environ.get("ROBOFLOW_API_KEY")
-MODEL_ID = os.environ.get("ROBOFLOW_MODEL_ID", "ccd-pn4pd/11")
-
-if not ROBOFLOW_API_KEY:
-    raise RuntimeError("ROBOFLOW_API_KEY 환경변수를 설정해 주세요.")
-
 
 # ==============================
 # 1. seq_meta 빌더
@@ -30,9 +25,10 @@ def sort_by_reading_order(boxes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
 def build_sequential_crops(structured_questions: List[Dict[str, Any]],
                            img_bgr,
-                           output_dir: str) -> List[Dict[str, Any]]:
+                           output_dir: str | None = None) -> List[Dict[str, Any]]:
     """
-    structured_questions → 각 문항/요소별 crop 파일 + 메타(seq_meta)
+    structured_questions → 각 문항/요소별 crop(메모리) + 메타(seq_meta)
+    output_dir가 있으면(save_json/debug) crop 파일도 저장
     """
     seq_meta: List[Dict[str, Any]] = []
 
@@ -43,22 +39,20 @@ def build_sequential_crops(structured_questions: List[Dict[str, Any]],
 
         # qnum 먼저
         qbbox = q["qnum_bbox"]
-        x1, y1, x2, y2 = qbbox
-        crop = img_bgr[y1:y2, x1:x2]
-        fname = os.path.join(output_dir, f"q{qnum}_{idx:02d}_qnum.png")
-        cv2.imwrite(fname, crop)
-        items.append({"index": idx, "kind": "qnum", "path": fname, "bbox": qbbox})
+        crop = Crop(img_bgr, qbbox, f"q{qnum}_{idx:02d}_qnum.png")
+        if output_dir:
+            crop.save(output_dir)
+        items.append({"index": idx, "kind": "qnum", "crop": crop, "bbox": qbbox})
         idx += 1
 
         def add_kind(kind_name: str, box_list: List[Dict[str, Any]]):
             nonlocal idx, items
             for b in sort_by_reading_order(box_list):
-                x1, y1, x2, y2 = b["bbox"]
-                crop = img_bgr[y1:y2, x1:x2]
-                fname = os.path.join(output_dir, f"q{qnum}_{idx:02d}_{kind_name}.png")
-                cv2.imwrite(fname, crop)
+                crop = Crop(img_bgr, b["bbox"], f"q{qnum}_{idx:02d}_{kind_name}.png")
+                if output_dir:
+                    crop.save(output_dir)
                 items.append(
-                    {"index": idx, "kind": kind_name, "path": fname, "bbox": b["bbox"]}
+                    {"index": idx, "kind": kind_name, "crop": crop, "bbox": b["bbox"]}
                 )
                 idx += 1
 
@@ -77,95 +71,144 @@ def build_sequential_crops(structured_questions: List[Dict[str, Any]],
 # 2. 최종 JSON 생성
 # ==============================
 
+def _image_ref(crop: Crop, base_url: str | None) -> str:
+    # 파일로 저장한 경우에만 경로/URL, 아니면 업로드 전 임시 이름
+    if base_url:
+        return base_url.rstrip("/") + "/" + crop.name
+    return crop.path or crop.name
+
+
 def build_exam_json_for_views(seq_meta_hybrid: List[Dict[str, Any]],
                               img_bgr,
-                              output_dir: str,
+                              output_dir: str | None = None,
                               base_url: str | None = None) -> Dict[str, Any]:
+    """
+    문항/요소별 in-memory crop은 "_image" 키로 함께 넘긴다.
+    (라우터에서 S3 업로드 후 제거, JSON 저장 시에는 제외)
+    """
+    return {
+        "questions": [build_question_json(q, img_bgr, output_dir, base_url) for q in seq_meta_hybrid]
+    }
+
+
+def build_question_json(q: Dict[str, Any],
+                        img_bgr,
+                        output_dir: str | None = None,
+                        base_url: str | None = None) -> Dict[str, Any]:
     full_h, full_w = img_bgr.shape[:2]
-    questions: List[Dict[str, Any]] = []
-
-    for q in seq_meta_hybrid:
-        qnum = q.get("question_number")
-        items_src = q["items"]
-
-        all_bboxes = [it["bbox"] for it in items_src]
-        x1 = min(b[0] for b in all_bboxes)
-        y1 = min(b[1] for b in all_bboxes)
-        x2 = max(b[2] for b in all_bboxes)
-        y2 = max(b[3] for b in all_bboxes)
-
-        pad = 20
-        x1 = max(0, x1 - pad)
-        y1 = max(0, y1 - pad)
-        x2 = min(full_w, x2 + pad)
-        y2 = min(full_h, y2 + pad)
-
-        # 전체 문제 크롭 저장
-        q_crop = img_bgr[y1:y2, x1:x2]
-        qnum_safe = qnum if qnum is not None else "unknown"
-        q_full_filename = f"q{qnum_safe}_full.png"
-        q_full_path = os.path.join(output_dir, q_full_filename)
-        cv2.imwrite(q_full_path, q_crop)
-
-        if base_url:
-            q_full_url = base_url.rstrip("/") + "/" + q_full_filename
-        else:
-            q_full_url = q_full_path
-
-        # 각 요소
-        q_items: List[Dict[str, Any]] = []
-        for item in items_src:
-            img_path = item["path"]
-            filename = os.path.basename(img_path)
-            image_url = base_url.rstrip("/") + "/" + filename if base_url else img_path
-
-            kind = item["kind"]
-            raw = item.get("gpt_hybrid_text", "") or ""
-            display_text = build_reading_text(kind, raw)
-
-            q_items.append(
-                {
-                    "kind": kind,
-                    "imagePath": image_url,
-                    "displayText": display_text,
-                }
-            )
-
-        # qnum displayText에서 문제 번호 재추출
-        for it in q_items:
-            if it["kind"] == "qnum":
-                src = it["displayText"]
-                m = re.search(r"\d+", src)
-                if m:
-                    qnum = int(m.group(0))
-                break
-
-        questions.append(
+
+    qnum = q.get("question_number")
+    items_src = q["items"]
+
+    all_bboxes = [it["bbox"] for it in items_src]
+    x1 = min(b[0] for b in all_bboxes)
+    y1 = min(b[1] for b in all_bboxes)
+    x2 = max(b[2] for b in all_bboxes)
+    y2 = max(b[3] for b in all_bboxes)
+
+    pad = 20
+    x1 = max(0, x1 - pad)
+    y1 = max(0, y1 - pad)
+    x2 = min(full_w, x2 + pad)
+    y2 = min(full_h, y2 + pad)
+
+    # 전체 문제 크롭
+    qnum_safe = qnum if qnum is not None else "unknown"
+    q_crop = Crop(img_bgr, (x1, y1, x2, y2), f"q{qnum_safe}_full.png")
+    if output_dir:
+        q_crop.save(output_dir)
+
+    # 각 요소
+    q_items: List[Dict[str, Any]] = []
+    for item in items_src:
+        kind = item["kind"]
+        raw = item.get("gpt_hybrid_text", "") or ""
+        display_text = build_reading_text(kind, raw)
+
+        q_items.append(
             {
-                "questionNumber": qnum,
-                "questionImagePath": q_full_url,
-                "items": q_items,
+                "kind": kind,
+                "imagePath": _image_ref(item["crop"], base_url),
+                "displayText": display_text,
+                "_image": item["crop"],
             }
         )
 
-    return {"questions": questions}
+    # qnum displayText에서 문제 번호 재추출
+    for it in q_items:
+        if it["kind"] == "qnum":
+            src = it["displayText"]
+            m = re.search(r"\d+", src)
+            if m:
+                qnum = int(m.group(0))
+            break
+
+    return {
+        "questionNumber": qnum,
+        "questionImagePath": _image_ref(q_crop, base_url),
+        "items": q_items,
+        "_image": q_crop,
+    }
+
+
+def strip_images(exam_json: Dict[str, Any]) -> Dict[str, Any]:
+    """in-memory crop("_image")을 뺀 JSON 직렬화용 사본"""
+    return {
+        "questions": [
+            {
+                **{k: v for k, v in q.items() if k != "_image"},
+                "items": [{k: v for k, v in it.items() if k != "_image"} for it in q["items"]],
+            }
+            for q in exam_json["questions"]
+        ]
+    }
+
 
 def process_exam(
     image_path: str,
-    output_dir: str,
+    output_dir: str | None = None,
     base_url: str | None = None,
     save_json: bool = False,
+    debug: bool = False,
+    on_structure: Callable[[int], None] | None = None,
+    on_question: Callable[[int, Dict[str, Any]], None] | None = None,
 ) -> Dict[str, Any]:
-    img_bgr, all_boxes = detect_boxes_with_roboflow(image_path, ROBOFLOW_API_KEY, MODEL_ID)
+    """
+    on_structure(total) : 문항 구조가 잡힌 직후 (전체 문항 수)
+    on_question(index, question) : 문항 OCR이 끝나는 즉시 (view용 문항 JSON)
+    """
+    if save_json and not output_dir:
+        raise ValueError("save_json=True에는 output_dir가 필요합니다.")
+
+    # crop 파일은 save_json/debug일 때만 기록
+    file_dir = output_dir if (save_json or debug) else None
+    if file_dir:
+        os.makedirs(file_dir, exist_ok=True)
+
+    img_bgr = cv2.imread(image_path)
+    if img_bgr is None:
+        raise FileNotFoundError(image_path)
+
+    all_boxes = detect_boxes(img_bgr)
     structured_questions = build_structured_questions(img_bgr, all_boxes)
-    seq_meta = build_sequential_crops(structured_questions, img_bgr, output_dir)
-    seq_meta_hybrid = run_hybrid_ocr_on_seq_meta(seq_meta)
-    exam_json = build_exam_json_for_views(seq_meta_hybrid, img_bgr, output_dir, base_url)
+    seq_meta = build_sequential_crops(structured_questions, img_bgr, file_dir)
+    if on_structure:
+        on_structure(len(seq_meta))
+
+    questions: List[Dict[str, Any] | None] = [None] * len(seq_meta)
+
+    def question_done(index, q):
+        questions[index] = build_question_json(q, img_bgr, file_dir, base_url)
+        if on_question:
+            on_question(index, questions[index])
+
+    run_hybrid_ocr_on_seq_meta(seq_meta, on_question=question_done)
+    exam_json = {"questions": questions}
 
     if save_json:
         out_path = os.path.join(output_dir, "exam_questions.json")
         with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(exam_json, f, ensure_ascii=False, indent=2)
+            json.dump(strip_images(exam_json), f, ensure_ascii=False, indent=2)
         exam_json["_output_path"] = out_path
 
     return exam_json
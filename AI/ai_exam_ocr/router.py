@@ -5,58 +5,90 @@ import traceback
 from datetime import datetime
 import cv2
 import numpy as np
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
+from ai_exam_ocr.jobs import ExamJob, QUEUED
 from ai_exam_ocr.tasks import *
+from executors import run_io
 
 
+# crop 파일을 남겨서 확인할 때만 사용
+EXAM_DEBUG_CROPS = os.getenv("EXAM_DEBUG_CROPS", "false").lower() == "true"
+
 router = APIRouter(
     prefix="/exam",
     tags=["Exam OCR"]
 )
 
-@router.post("/ocr")
-async def exam_ocr(image: UploadFile = File(...)):
+def _run_exam_ocr(img_bytes: bytes, filename: str, defer_upload: bool = False):
+    """저장 → 파이프라인 → S3 업로드 (블로킹, 실행 풀에서 호출)"""
 
     # temp 작업 폴더
     tmp_root = tempfile.mkdtemp(prefix="exam_")
     uid = uuid.uuid4().hex
 
-    ext = os.path.splitext(image.filename)[1] or ".png"
+    ext = os.path.splitext(filename)[1] or ".png"
     img_path = os.path.join(tmp_root, f"input{ext}")
-    out_dir = os.path.join(tmp_root, "out")
-    os.makedirs(out_dir, exist_ok=True)
+    # 디버그 crop은 임시 폴더가 지워진 뒤에도 /exam_images로 볼 수 있게 exam_temp에 남긴다
+    out_dir = os.path.join("exam_temp", uid) if EXAM_DEBUG_CROPS else None
 
     try:
         # 이미지 저장
-        img_bytes = await image.read()
         with open(img_path, "wb") as f:
             f.write(img_bytes)
 
-        # 파이프라인 실행 (crop 로컬 생성)
+        # 파이프라인 실행 (crop은 메모리에만, 디버그 시에만 파일 기록)
         exam_json = process_exam(
             image_path=img_path,
             output_dir=out_dir,
             base_url=None,
             save_json=False,
+            debug=EXAM_DEBUG_CROPS,
         )
 
-        # 생성된 모든 crop 파일을 S3 업로드
-        for q in exam_json.get("questions", []):
-            q_img_path = q.get("questionImagePath")
-            if q_img_path and os.path.exists(q_img_path):
-                q["questionImagePath"] = upload_s3(q_img_path, f"questions/{uid}")
-
-            for item in q.get("items", []):
-                item_path = item.get("imagePath")
-                if item_path and os.path.exists(item_path):
-                    item["imagePath"] = upload_s3(item_path, f"items/{uid}")
+        # 모든 crop을 메모리에서 병렬 업로드 (defer_upload면 완료 전에 응답)
+        upload_exam_crops(exam_json, wait_uploads=not defer_upload)
 
         return {"questions": exam_json.get("questions", [])}
 
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+
+@router.post("/ocr")
+async def exam_ocr(image: UploadFile = File(...), defer_upload: bool = Query(False)):
+    try:
+        img_bytes = await image.read()
+
+        # 파이프라인 전체를 실행 풀로 보내 이벤트 루프를 막지 않는다
+        return await run_io(_run_exam_ocr, img_bytes, image.filename, defer_upload)
+
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"OCR 오류: {e}")
 
-    finally:
-        shutil.rmtree(tmp_root, ignore_errors=True)
 
+# 비동기 작업 API: 제출 → jobId → 문항 단위 진행 상황 조회
+@router.post("/jobs")
+async def create_exam_job(image: UploadFile = File(...), callback_url: str | None = Form(None)):
+    try:
+        img_bytes = await image.read()
+        if not img_bytes:
+            raise ValueError("Empty image received")
+
+        job = ExamJob()
+        await run_io(job.update, status=QUEUED, done=0)
+        await run_io(run_exam_ocr.delay, job.job_id, img_bytes, image.filename, callback_url)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"jobId": job.job_id, "status": QUEUED}
+
+
+@router.get("/jobs/{job_id}")
+async def get_exam_job(job_id: str):
+    job = ExamJob(job_id)
+    if not await run_io(job.exists):
+        raise HTTPException(status_code=404, detail="작업 없음")
+
+    return await run_io(job.snapshot)
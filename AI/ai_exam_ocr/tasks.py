@@ -1,42 +1,173 @@
 import os
 import boto3
 import shutil
+import hashlib
+import tempfile
+import threading
 import traceback
-from ai_exam_ocr.pipeline.pipeline import process_exam
-from dotenv import load_dotenv
-import boto3
-import cv2
+import requests
 from io import BytesIO
-import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from botocore.exceptions import ClientError
+from ai_exam_ocr.pipeline.pipeline import process_exam
+from ai_exam_ocr.jobs import ExamJob, RUNNING, DONE, FAILED
+from ai_file_ocr.celery_app import celery_app
 
 S3_BUCKET = os.getenv("AWS_BUCKET_NAME")
 AWS_REGION = os.getenv("AWS_REGION")
 
 s3_client = boto3.client("s3", region_name=AWS_REGION)
 
+# crop 업로드 전용 풀 (라우터의 io 풀 안에서 기다리므로 별도로 둔다)
+UPLOAD_CONCURRENCY = int(os.getenv("EXAM_UPLOAD_CONCURRENCY", 16))
+upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix="exam-s3")
+
+# 설정 시 공개 URL 대신 presigned URL 반환 (초)
+PRESIGN_TTL = int(os.getenv("EXAM_S3_PRESIGN_TTL", 0))
+
+# 이 프로세스에서 이미 올린 key (최근 EXAM_UPLOADED_KEYS_MAX개만 기억하는 LRU)
+UPLOADED_KEYS_MAX = int(os.getenv("EXAM_UPLOADED_KEYS_MAX", 10000))
+_uploaded_keys: "OrderedDict[str, None]" = OrderedDict()
+_uploaded_keys_lock = threading.Lock()
+
+
+def _is_uploaded(key: str) -> bool:
+    with _uploaded_keys_lock:
+        if key not in _uploaded_keys:
+            return False
+        _uploaded_keys.move_to_end(key)
+        return True
+
+
+def _mark_uploaded(key: str):
+    with _uploaded_keys_lock:
+        _uploaded_keys[key] = None
+        _uploaded_keys.move_to_end(key)
+        while len(_uploaded_keys) > UPLOADED_KEYS_MAX:
+            _uploaded_keys.popitem(last=False)
 
-def upload_s3(local_path: str, key_prefix: str):
-    filename = os.path.basename(local_path)
-    key = f"exam/{key_prefix}/{filename}"
 
-    s3_client.upload_file(
-        local_path,
-        S3_BUCKET,
-        key,
-    )
+def crop_key(data: bytes) -> str:
+    # 내용 해시 key → 같은 시험지를 다시 스캔해도 같은 객체
+    return f"exam/crops/{hashlib.sha256(data).hexdigest()[:32]}.png"
 
+
+def s3_url(key: str) -> str:
+    if PRESIGN_TTL:
+        return s3_client.generate_presigned_url(
+            "get_object", Params={"Bucket": S3_BUCKET, "Key": key}, ExpiresIn=PRESIGN_TTL
+        )
     return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{key}"
 
-def run_exam_ocr(image_np, user_id: str, now_str: str):
+
+def upload_if_absent(data: bytes, key: str, content_type: str = "image/png"):
+    if _is_uploaded(key):
+        return
+
     try:
-        exam_json = process_exam(
-            image_np=image_np,
-            user_id=user_id,
-            now_str=now_str
+        s3_client.head_object(Bucket=S3_BUCKET, Key=key)
+    except ClientError as e:
+        # s3:ListBucket 권한이 없으면 없는 객체도 404 대신 403으로 응답한다
+        if e.response.get("Error", {}).get("Code") not in ("403", "AccessDenied", "Forbidden",
+                                                           "404", "NoSuchKey", "NotFound"):
+            raise
+        s3_client.upload_fileobj(
+            BytesIO(data),
+            S3_BUCKET,
+            key,
+            ExtraArgs={"ContentType": content_type},
         )
-        return {"status": "done", "data": exam_json}
+
+    _mark_uploaded(key)
+
+
+def _log_upload_error(future):
+    if future.exception():
+        print(f"[S3] crop 업로드 실패: {future.exception()}")
+
+
+def upload_exam_crops(exam_json, wait_uploads: bool = True):
+    """
+    문항/요소 crop("_image")을 병렬 업로드하고 URL로 바꾼다.
+    key가 내용 해시라 URL은 업로드 전에 정해지므로,
+    wait_uploads=False면 업로드 완료를 기다리지 않고 바로 반환한다.
+    """
+    pending = {}  # key → bytes (같은 페이지 안 중복 제거)
+
+    def assign(target, field):
+        crop = target.pop("_image", None)
+        if crop is None:
+            return
+        key = crop_key(crop.png)
+        pending.setdefault(key, crop.png)
+        target[field] = s3_url(key)
+
+    for q in exam_json.get("questions", []):
+        assign(q, "questionImagePath")
+        for item in q.get("items", []):
+            assign(item, "imagePath")
+
+    futures = [upload_pool.submit(upload_if_absent, data, key) for key, data in pending.items()]
+
+    if wait_uploads:
+        done, _ = wait(futures)
+        for f in done:
+            f.result()
+    else:
+        for f in futures:
+            f.add_done_callback(_log_upload_error)
+
+    return exam_json
+
+def send_callback(callback_url, payload):
+    if not callback_url:
+        return
+    try:
+        requests.post(callback_url, json=payload, timeout=10).raise_for_status()
+    except Exception as e:
+        print(f"[EXAM JOB] callback 실패: job={payload.get('jobId')} | {e}")
+
+
+@celery_app.task(name="ai_exam_ocr.tasks.run_exam_ocr")
+def run_exam_ocr(job_id: str, img_bytes: bytes, filename: str, callback_url: str | None = None):
+    """
+    시험지 1장 OCR 작업. 문항 OCR + crop 업로드가 끝나는 대로
+    작업 상태(Redis)에 쌓고 callback_url로도 문항 단위로 전달한다.
+    """
+    job = ExamJob(job_id)
+    job.update(status=RUNNING)
+
+    tmp_root = tempfile.mkdtemp(prefix="exam_job_")
+    ext = os.path.splitext(filename)[1] or ".png"
+    img_path = os.path.join(tmp_root, f"input{ext}")
+
+    def on_structure(total):
+        job.update(total=total)
+        send_callback(callback_url, {"jobId": job_id, "status": RUNNING, "total": total})
+
+    def on_question(index, question):
+        upload_exam_crops({"questions": [question]})
+        job.add_question(index, question)
+        send_callback(callback_url, {"jobId": job_id, "index": index, "question": question})
+
+    try:
+        with open(img_path, "wb") as f:
+            f.write(img_bytes)
+
+        exam_json = process_exam(image_path=img_path, on_structure=on_structure, on_question=on_question)
+        total = len(exam_json["questions"])
+
+        job.update(status=DONE, total=total)
+        send_callback(callback_url, {"jobId": job_id, "status": DONE, "total": total})
+        return {"status": DONE, "jobId": job_id, "total": total}
 
     except Exception as e:
         traceback.print_exc()
-        return {"status": "error", "message": str(e)}
+        job.update(status=FAILED, error=str(e))
+        send_callback(callback_url, {"jobId": job_id, "status": FAILED, "error": str(e)})
+        return {"status": FAILED, "jobId": job_id, "message": str(e)}
+
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
 
@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from dotenv import load_dotenv
+from kombu import Queue
 
 load_dotenv()
 BROKER_URL = os.getenv("CELERY_BROKER_URL")
@@ -14,10 +15,42 @@ celery_app = Celery(
 )
 
 
-celery_app.autodiscover_tasks(['ai_file_ocr'], force=True)
+celery_app.autodiscover_tasks(['ai_file_ocr', 'ai_exam_ocr'], force=True)
+
+# 우선순위 클래스별 큐
+# - interactive : 사용자가 기다리는 단건 작업 (시험지 OCR 등)
+# - bulk        : 대용량 배치 작업 (교안 전체 OCR 등)
+# 판서 OCR은 FastAPI 요청 경로에서 바로 처리하므로 live 큐는 두지 않는다 (BE 쪽에만 있음)
+QUEUES = ("interactive", "bulk")
+
+# 큐별 워커 설정 (환경변수로 덮어쓰기 가능)
+QUEUE_WORKER_SETTINGS = {
+    queue: {
+        "concurrency": int(os.getenv(f"CELERY_{queue.upper()}_CONCURRENCY", concurrency)),
+        "prefetch_multiplier": int(os.getenv(f"CELERY_{queue.upper()}_PREFETCH", prefetch)),
+    }
+    for queue, concurrency, prefetch in (
+        ("interactive", 4, 2),
+        ("bulk", 2, 1),
+    )
+}
 
 celery_app.conf.update(
+    task_queues=[Queue(q) for q in QUEUES],
+    task_default_queue="interactive",
     task_routes={
-        "ai_file_ocr.tasks.run_pdf_ocr": {"queue": "ai"}
-    }
-)
\ No newline at end of file
+        "ai_file_ocr.tasks.run_pdf_ocr": {"queue": "bulk"},
+        "ai_file_ocr.tasks.retry_pdf_ocr_pages": {"queue": "interactive"},
+        "ai_exam_ocr.tasks.run_exam_ocr": {"queue": "interactive"},
+    },
+)
+
+# 큐 전용 워커 실행: CELERY_WORKER_QUEUE=bulk celery -A ai_file_ocr.celery_app worker
+WORKER_QUEUE = os.getenv("CELERY_WORKER_QUEUE")
+if WORKER_QUEUE:
+    profile = QUEUE_WORKER_SETTINGS[WORKER_QUEUE]
+    celery_app.conf.update(
+        task_queues=[Queue(WORKER_QUEUE)],
+        worker_concurrency=profile["concurrency"],
+        worker_prefetch_multiplier=profile["prefetch_multiplier"],
+    )
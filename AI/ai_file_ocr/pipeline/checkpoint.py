@@ -0,0 +1,65 @@
+import json
+import os
+from typing import Dict, Optional
+
+import redis
+from dotenv import load_dotenv
+
+from ai_file_ocr.pipeline.memory import ContextMemory
+
+load_dotenv()
+CHECKPOINT_REDIS_URL = os.getenv("OCR_CHECKPOINT_REDIS_URL") or os.getenv("CELERY_BROKER_URL")
+CHECKPOINT_TTL = 60 * 60 * 24 * 7
+
+# 페이지 상태
+# - ocr_done : Vision 분석 결과 저장 완료 (콜백/mini-summary 전)
+# - done     : 콜백 전달 + mini-summary 저장 완료
+# - failed   : 처리 중 오류 (BE 재시도 요청으로 다시 처리)
+OCR_DONE = "ocr_done"
+DONE = "done"
+FAILED = "failed"
+
+_redis_client = None
+
+
+def get_redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(CHECKPOINT_REDIS_URL)
+    return _redis_client
+
+
+class OcrCheckpoint:
+    """
+    교안 OCR 페이지 단위 체크포인트 (Redis hash: page_number → 상태 JSON)
+    작업이 중간에 죽어도 완료된 페이지는 다시 분석하지 않는다.
+    """
+
+    def __init__(self, doc_id: int):
+        self.key = f"pdf_ocr:{doc_id}:pages"
+        self.client = get_redis()
+
+    def load(self) -> Dict[int, Dict]:
+        raw = self.client.hgetall(self.key)
+        return {int(k): json.loads(v) for k, v in raw.items()}
+
+    def save(self, page_number: int, state: Dict) -> None:
+        self.client.hset(self.key, int(page_number), json.dumps(state, ensure_ascii=False))
+        self.client.expire(self.key, CHECKPOINT_TTL)
+
+    def clear(self) -> None:
+        self.client.delete(self.key)
+
+
+def build_memory(states: Dict[int, Dict], page_number: int, max_history: int = 3) -> ContextMemory:
+    """page_number 직전까지 완료된 페이지들의 mini-summary로 ContextMemory 복원"""
+    mem = ContextMemory(max_history=max_history)
+
+    for n in sorted(states):
+        if n >= page_number:
+            break
+        summary: Optional[str] = states[n].get("summary")
+        if summary is not None:
+            mem.add_summary(n, summary)
+
+    return mem
@@ -0,0 +1,104 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import fitz
+
+# 페이지 처리 경로
+# - text   : 텍스트 레이어만으로 충분한 페이지 → 텍스트 전용 LLM 정리
+# - vision : 그림/표/스캔/수식이 있는 페이지 → 기존 Vision 분석
+ROUTE_TEXT = "text"
+ROUTE_VISION = "vision"
+
+TEXT_MIN_CHARS = 20          # 이보다 짧으면 스캔본/이미지 슬라이드로 간주
+IMAGE_MIN_AREA_RATIO = 0.02  # 페이지 면적 대비 이 이상인 이미지만 그림으로 간주 (로고 등 제외)
+DRAWINGS_MAX = 15            # 벡터 도형이 많으면 도식/표로 간주
+
+# 텍스트 레이어로 옮기면 깨지는 수식 기호
+MATH_CHARS = re.compile(r"[∑∫∏√∂∞≤≥≠≈±×÷∈∉⊂⊆∪∩∀∃→⇒⇔αβγδθλμπσφωΔΣΩ]")
+
+# 페이지당 예상 비용(USD): gpt-4o 이미지 1장 vs gpt-4o-mini 텍스트
+ESTIMATED_COST_USD = {
+    ROUTE_VISION: float(os.getenv("OCR_VISION_PAGE_COST", 0.01)),
+    ROUTE_TEXT: float(os.getenv("OCR_TEXT_PAGE_COST", 0.0005)),
+}
+
+
+@dataclass
+class PageLayer:
+    route: str
+    text: str
+    reason: str
+
+
+def classify_page(page: fitz.Page) -> PageLayer:
+    text = page.get_text("text").strip()
+
+    if len(text) < TEXT_MIN_CHARS:
+        return PageLayer(ROUTE_VISION, text, "no_text_layer")
+
+    if "�" in text or MATH_CHARS.search(text):
+        return PageLayer(ROUTE_VISION, text, "math_or_broken_glyph")
+
+    page_area = abs(page.rect) or 1
+    for info in page.get_image_info():
+        if abs(fitz.Rect(info["bbox"]) & page.rect) / page_area >= IMAGE_MIN_AREA_RATIO:
+            return PageLayer(ROUTE_VISION, text, "image")
+
+    if len(page.get_drawings()) > DRAWINGS_MAX:
+        return PageLayer(ROUTE_VISION, text, "drawings")
+
+    try:
+        if page.find_tables().tables:
+            return PageLayer(ROUTE_VISION, text, "table")
+    except Exception:
+        pass  # 표 탐지 실패 시 텍스트 판정 유지
+
+    return PageLayer(ROUTE_TEXT, text, "text_only")
+
+
+def classify_pdf(pdf_bytes: bytes, page_numbers: Optional[Iterable[int]] = None) -> Dict[int, PageLayer]:
+    pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+    targets = set(page_numbers) if page_numbers is not None else None
+    layers: Dict[int, PageLayer] = {}
+
+    for page_num, page in enumerate(pdf, start=1):
+        if targets is not None and page_num not in targets:
+            continue
+        layers[page_num] = classify_page(page)
+
+    pdf.close()
+    return layers
+
+
+def savings_report(timings: Dict[int, Dict]) -> Dict:
+    """
+    timings: page_number → {"route", "elapsed", "payload_bytes", "baseline_payload_bytes"}
+    텍스트 경로로 처리한 페이지를 Vision으로 처리했다면 들었을 비용/시간과 비교
+    payload는 150dpi PNG를 그대로 보냈을 때와 비교
+    """
+    by_route = {ROUTE_TEXT: [], ROUTE_VISION: []}
+    for t in timings.values():
+        by_route[t["route"]].append(t["elapsed"])
+
+    text_pages = len(by_route[ROUTE_TEXT])
+    vision_pages = len(by_route[ROUTE_VISION])
+
+    avg_text = sum(by_route[ROUTE_TEXT]) / text_pages if text_pages else 0.0
+    # 이번 교안에 Vision 페이지가 없으면 비교 기준이 없으므로 절감 시간은 0으로 둔다
+    avg_vision = sum(by_route[ROUTE_VISION]) / vision_pages if vision_pages else avg_text
+
+    return {
+        "text_pages": text_pages,
+        "vision_pages": vision_pages,
+        "estimated_cost_usd": round(
+            text_pages * ESTIMATED_COST_USD[ROUTE_TEXT] + vision_pages * ESTIMATED_COST_USD[ROUTE_VISION], 4
+        ),
+        "saved_cost_usd": round(
+            text_pages * (ESTIMATED_COST_USD[ROUTE_VISION] - ESTIMATED_COST_USD[ROUTE_TEXT]), 4
+        ),
+        "saved_seconds": round(text_pages * max(avg_vision - avg_text, 0.0), 2),
+        "payload_bytes": sum(t.get("payload_bytes", 0) for t in timings.values()),
+        "baseline_payload_bytes": sum(t.get("baseline_payload_bytes", 0) for t in timings.values()),
+    }
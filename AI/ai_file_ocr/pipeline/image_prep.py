@@ -0,0 +1,85 @@
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Iterable, Optional
+
+import fitz
+from PIL import Image
+
+# gpt-4o(detail=high)는 2048px 안으로 줄인 뒤 짧은 변을 768px로 맞춰서 본다.
+# 그보다 크게 보내면 업로드 용량만 늘어난다.
+EFFECTIVE_SHORT_SIDE = 768
+EFFECTIVE_LONG_SIDE = 2048
+SPARSE_SHORT_SIDE = 512      # 글자가 적고 큰 슬라이드
+SPARSE_CHARS_PER_INCH2 = 4   # 이보다 텍스트 밀도가 낮으면 sparse
+MIN_DPI, MAX_DPI = 50, 200
+
+PHOTO_AREA_RATIO = 0.3       # 래스터 이미지가 페이지의 30% 이상이면 사진 슬라이드
+PHOTO_FORMAT = os.getenv("OCR_PHOTO_FORMAT", "jpeg").lower()  # jpeg | webp
+PHOTO_QUALITY = int(os.getenv("OCR_PHOTO_QUALITY", 85))
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime: str
+    dpi: int
+    width: int
+    height: int
+
+
+def choose_dpi(page: fitz.Page) -> int:
+    """페이지 크기와 텍스트 밀도로 모델 유효 해상도에 맞는 DPI 선택"""
+    rect = page.rect
+    short_in = min(rect.width, rect.height) / 72
+    long_in = max(rect.width, rect.height) / 72
+
+    area_in2 = max(short_in * long_in, 1e-6)
+    density = len(page.get_text("text").strip()) / area_in2
+    target_short = SPARSE_SHORT_SIDE if density < SPARSE_CHARS_PER_INCH2 else EFFECTIVE_SHORT_SIDE
+
+    dpi = min(target_short / short_in, EFFECTIVE_LONG_SIDE / long_in)
+    return int(max(MIN_DPI, min(MAX_DPI, dpi)))
+
+
+def is_photographic(page: fitz.Page) -> bool:
+    page_area = abs(page.rect) or 1
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return covered / page_area >= PHOTO_AREA_RATIO
+
+
+def prepare_page_image(page: fitz.Page) -> PreparedImage:
+    """
+    Vision 요청용 이미지
+    - 선화/텍스트 슬라이드 : PNG (글자 경계 보존)
+    - 사진 슬라이드        : JPEG/WebP (용량 우선)
+    """
+    dpi = choose_dpi(page)
+    pix = page.get_pixmap(dpi=dpi, alpha=False)
+
+    if not is_photographic(page):
+        return PreparedImage(pix.tobytes("png"), "image/png", dpi, pix.width, pix.height)
+
+    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    buf = BytesIO()
+    if PHOTO_FORMAT == "webp":
+        img.save(buf, format="WEBP", quality=PHOTO_QUALITY)
+        mime = "image/webp"
+    else:
+        img.save(buf, format="JPEG", quality=PHOTO_QUALITY, optimize=True)
+        mime = "image/jpeg"
+    return PreparedImage(buf.getvalue(), mime, dpi, pix.width, pix.height)
+
+
+def prepare_pdf_images(pdf_bytes: bytes, page_numbers: Optional[Iterable[int]] = None) -> Dict[int, PreparedImage]:
+    pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+    targets = set(page_numbers) if page_numbers is not None else None
+    images: Dict[int, PreparedImage] = {}
+
+    for page_num, page in enumerate(pdf, start=1):
+        if targets is not None and page_num not in targets:
+            continue
+        images[page_num] = prepare_page_image(page)
+
+    pdf.close()
+    return images
@@ -1,18 +1,21 @@
 import base64
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Tuple
 import fitz  
 from ai_file_ocr.pipeline.rewrite import code_rewrite, process_latex
+from llm_gateway import chat
 
 #이미지 변환
-def pdf_to_images(pdf_bytes: bytes, dpi: int = 150) -> List[Tuple[int, bytes]]:
+def pdf_to_images(pdf_bytes: bytes, dpi: int = 150,
+                  page_numbers: Optional[Iterable[int]] = None) -> List[Tuple[int, bytes]]:
 
     pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
     pages: List[Tuple[int, bytes]] = []
+    targets = set(page_numbers) if page_numbers is not None else None
 
     for page_num, page in enumerate(pdf, start=1):
+        # 재개/재시도 시 필요한 페이지만 렌더링
+        if targets is not None and page_num not in targets:
+            continue
         pix = page.get_pixmap(dpi=dpi)
         img_bytes = pix.tobytes("png")
         pages.append((page_num, img_bytes))
@@ -20,8 +23,12 @@ def pdf_to_images(pdf_bytes: bytes, dpi: int = 150) -> List[Tuple[int, bytes]]:
     pdf.close()
     return pages
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def pdf_page_count(pdf_bytes: bytes) -> int:
+    pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+    count = pdf.page_count
+    pdf.close()
+    return count
 
 
 PROMPT_TEMPLATE = """
@@ -62,15 +69,15 @@ PROMPT_TEMPLATE = """
 
 """
 
-def analyze_page_with_context(image_bytes: bytes, context: str) -> str:
+def analyze_page_with_context(image_bytes: bytes, context: str, mime: str = "image/png") -> str:
 
     print("⭐context:"+context)
     system_prompt = PROMPT_TEMPLATE.replace("{context}", context)
 
     img_b64 = base64.b64encode(image_bytes).decode("utf-8")
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = chat(
+        "gpt-4o",
         temperature=0.2,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -81,7 +88,7 @@ def analyze_page_with_context(image_bytes: bytes, context: str) -> str:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{img_b64}"
+                            "url": f"data:{mime};base64,{img_b64}"
                         }
                     },
                 ]
@@ -95,3 +102,51 @@ def analyze_page_with_context(image_bytes: bytes, context: str) -> str:
     clean = code_rewrite(clean)
 
     return clean
+
+
+TEXT_PROMPT_TEMPLATE = """
+너는 시각장애 대학생을 위한 강의 슬라이드 분석 도우미다.
+지금까지 분석된 페이지들의 문맥 요약은 다음과 같다:
+
+{context}
+
+
+아래는 그림·표가 없는 슬라이드에서 추출한 텍스트 레이어다.
+이 문맥을 참고하여 텍스트를 정리하라.
+반드시 아래 두 섹션만 사용하고 그 외의 섹션 이름은 절대 만들지 마라.
+섹션에 쓸 내용이 전혀 없다면, 그 섹션 제목과 내용 전체를 아예 출력하지 않는다.
+
+중요 규칙
+- 추출 과정에서 끊긴 줄바꿈은 문장 단위로 자연스럽게 이어 붙인다.
+- 모든 코드(쉘 명령어 포함)는  코드블록(```)으로 감싸서 출력하되 언어명은 작성하지 않는다. 
+- 코드 내부는 여백, 줄바꿈, 공백 포함하여 원본을 그대로 보존한다.
+- 한국어 외 언어는 번역하지 않고 원문 그대로 유지한다.
+- 텍스트에 없는 내용을 추가하지 않는다.
+
+[제목]
+- 슬라이드의 핵심 제목이 있을 때만 한 줄로 작성.
+
+[본문]
+- 본문의 텍스트를 추출. 
+- 의미 변경 금지, 핵심 내용 생략 금지.
+
+=== 텍스트 레이어 ===
+{text}
+"""
+
+# 텍스트 전용 페이지: 이미지 없이 텍스트 레이어만 정리
+def analyze_text_with_context(text: str, context: str) -> str:
+
+    prompt = TEXT_PROMPT_TEMPLATE.replace("{context}", context).replace("{text}", text)
+
+    response = chat(
+        "gpt-4o-mini",
+        temperature=0.1,
+        messages=[{"role": "user", "content": prompt}],
+    )
+
+    raw = response.choices[0].message.content.strip()
+    clean = process_latex(raw)
+    clean = code_rewrite(clean)
+
+    return clean
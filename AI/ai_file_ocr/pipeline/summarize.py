@@ -1,9 +1,4 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from llm_gateway import chat
 
 
 MINI_SUMMARY_PROMPT = """
@@ -22,8 +17,8 @@ def make_mini_summary(content: str) -> str:
     if len(content) > max_chars:
         content = content[:max_chars]
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+    response = chat(
+        "gpt-4o-mini",
         temperature=0.1,
         messages=[
             {
@@ -1,24 +1,49 @@
 import traceback
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from ai_file_ocr.tasks import run_pdf_ocr
+from pydantic import BaseModel
+from ai_file_ocr.tasks import run_pdf_ocr, retry_pdf_ocr_pages
+from executors import run_io
 
 router = APIRouter()
 
+class OcrRetryRequest(BaseModel):
+    doc_id: int
+    callback_url: str
+    pages: List[int]
+
+
 @router.post("/ocr/pdf")
 async def ocr_pdf(
     doc_id: int = Form(...),
     callback_url: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    pages: Optional[str] = Form(None),  # "1,3,5" (BE에서 재사용하지 못한 페이지만)
 ):
     try:
-        pdf_bytes = file.file.read()
+        pdf_bytes = await file.read()
 
         if not pdf_bytes:
             raise ValueError("Empty PDF file received")
 
-        run_pdf_ocr.delay(doc_id, pdf_bytes, callback_url)
+        page_numbers = [int(n) for n in pages.split(",") if n.strip()] if pages else None
+        await run_io(run_pdf_ocr.delay, doc_id, pdf_bytes, callback_url, page_numbers)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
     return {"message": "OCR 작업이 큐에 등록되었습니다."}
+
+
+# 실패한 페이지만 다시 OCR
+@router.post("/ocr/pdf/retry")
+async def ocr_pdf_retry(request: OcrRetryRequest):
+    if not request.pages:
+        raise HTTPException(status_code=400, detail="pages가 비어 있습니다.")
+
+    try:
+        await run_io(retry_pdf_ocr_pages.delay, request.doc_id, request.pages, request.callback_url)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"message": "OCR 재시도 작업이 큐에 등록되었습니다.", "pages": request.pages}
@@ -1,14 +1,17 @@
 import time
-from io import BytesIO 
+from io import BytesIO
 import os
+from typing import Dict, List, Optional
 import requests
 import boto3
 from dotenv import load_dotenv
 
 from ai_file_ocr.celery_app import celery_app
-from ai_file_ocr.pipeline.ocr import pdf_to_images, analyze_page_with_context
+from ai_file_ocr.pipeline.ocr import pdf_to_images, pdf_page_count, analyze_page_with_context, analyze_text_with_context
 from ai_file_ocr.pipeline.summarize import make_mini_summary
-from ai_file_ocr.pipeline.memory import ContextMemory  
+from ai_file_ocr.pipeline.checkpoint import OcrCheckpoint, build_memory, OCR_DONE, DONE, FAILED
+from ai_file_ocr.pipeline.classify import PageLayer, ROUTE_TEXT, ROUTE_VISION, classify_pdf, savings_report
+from ai_file_ocr.pipeline.image_prep import PreparedImage, prepare_pdf_images
 
 load_dotenv()
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -17,13 +20,17 @@ AWS_S3_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME")
 AWS_S3_REGION = os.getenv("AWS_REGION")
 
 
-def upload_s3(image_bytes: bytes, key: str, content_type: str = "image/png") -> str:
-    s3 = boto3.client(
+def get_s3():
+    return boto3.client(
         "s3",
         region_name=AWS_S3_REGION,
         aws_access_key_id=AWS_ACCESS_KEY_ID,
         aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
     )
+
+
+def upload_s3(image_bytes: bytes, key: str, content_type: str = "image/png") -> str:
+    s3 = get_s3()
     s3.upload_fileobj(
         Fileobj=BytesIO(image_bytes),
         Bucket=AWS_S3_BUCKET_NAME,
@@ -33,64 +40,203 @@ def upload_s3(image_bytes: bytes, key: str, content_type: str = "image/png") ->
     return f"https://{AWS_S3_BUCKET_NAME}.s3.{AWS_S3_REGION}.amazonaws.com/{key}"
 
 
-@celery_app.task(name="ai_file_ocr.tasks.run_pdf_ocr")
-def run_pdf_ocr(doc_id: int, pdf_bytes: bytes, callback_url: str):
+def download_s3(key: str) -> bytes:
+    obj = get_s3().get_object(Bucket=AWS_S3_BUCKET_NAME, Key=key)
+    return obj["Body"].read()
 
-    total_start = time.time()
 
-    # 1) PDF → 이미지 변환
-    t0 = time.time()
-    pages = pdf_to_images(pdf_bytes)
-    print(f"[TIME] PDF to images: {time.time() - t0:.2f} sec")
+def source_pdf_key(doc_id: int) -> str:
+    return f"docs/{doc_id}/source.pdf"
 
-    mem = ContextMemory(max_history=3)
 
-    # 페이지 순회
-    for page_number, img_bytes in pages:
+def send_callback(callback_url: str, payload: Dict) -> bool:
+    try:
+        resp = requests.post(callback_url, json=payload, timeout=10)
+        resp.raise_for_status()
+        return True
+    except Exception as e:
+        print(f"[AI OCR] callback 실패: doc={payload.get('doc_id')}, page={payload.get('page_number')}, error={e}")
+        return False
 
-        print(f"\n===== PAGE {page_number} START =====")
 
-        # 2) S3 업로드
+def process_page(doc_id: int, page_number: int, img_bytes: bytes, layer: PageLayer,
+                 vision_image: Optional[PreparedImage], callback_url: str,
+                 checkpoint: OcrCheckpoint, states: Dict[int, Dict]) -> bool:
+    """
+    페이지 1장 처리. 단계마다 체크포인트를 남겨서
+    재개 시 이미 끝난 단계(S3 업로드/Vision 분석)는 건너뛴다.
+    콜백까지 전달됐으면 True
+    """
+    state = states.get(page_number, {})
+
+    if state.get("status") in (OCR_DONE, DONE) and state.get("ocr_text"):
+        image_url = state.get("image_url")
+        ocr_text = state["ocr_text"]
+        print(f"[CHECKPOINT] page {page_number}: Vision 결과 재사용")
+    else:
+        # 1) S3 업로드
         t1 = time.time()
         s3_key = f"docs/{doc_id}/pages/{page_number}.png"
         image_url = upload_s3(img_bytes, s3_key, content_type="image/png")
         print(f"[TIME] S3 upload: {time.time() - t1:.2f} sec")
 
-        # 3) 컨텍스트 로드
+        # 2) 컨텍스트 로드 (직전 완료 페이지들의 mini-summary)
         t2 = time.time()
-        context = mem.get_context()
+        context = build_memory(states, page_number).get_context()
         print(f"[TIME] Load context: {time.time() - t2:.2f} sec")
 
-        # 4) Vision GPT 분석
+        # 3) 분석 (텍스트 전용 페이지는 Vision 생략)
         t3 = time.time()
-        ocr_text = analyze_page_with_context(img_bytes, context)
-        print(f"[TIME] Vision analysis: {time.time() - t3:.2f} sec")
+        if layer.route == ROUTE_TEXT:
+            ocr_text = analyze_text_with_context(layer.text, context)
+            payload_bytes = len(layer.text.encode("utf-8"))
+        else:
+            ocr_text = analyze_page_with_context(vision_image.data, context, mime=vision_image.mime)
+            payload_bytes = len(vision_image.data)
+        elapsed = time.time() - t3
+        print(f"[TIME] {layer.route} analysis ({layer.reason}): {elapsed:.2f} sec")
+        if vision_image:
+            print(f"[PAYLOAD] page {page_number}: {vision_image.mime} {vision_image.width}x{vision_image.height} "
+                  f"@{vision_image.dpi}dpi {payload_bytes / 1024:.0f}KB (PNG 150dpi {len(img_bytes) / 1024:.0f}KB)")
+
+        state = {"status": OCR_DONE, "image_url": image_url, "ocr_text": ocr_text,
+                 "route": layer.route, "elapsed": elapsed,
+                 "payload_bytes": payload_bytes, "baseline_payload_bytes": len(img_bytes)}
+        states[page_number] = state
+        checkpoint.save(page_number, state)
+
+    # 4) callback POST
+    t4 = time.time()
+    delivered = send_callback(callback_url, {
+        "doc_id": doc_id,
+        "page_number": page_number,
+        "image_url": image_url,
+        "ocr_text": ocr_text,
+    })
+    print(f"[TIME] Callback POST: {time.time() - t4:.2f} sec")
+
+    # 5) mini-summary 생성 (다음 페이지 컨텍스트용)
+    if state.get("summary") is None:
+        t5 = time.time()
+        state["summary"] = make_mini_summary(ocr_text)
+        print(f"[TIME] Mini summary: {time.time() - t5:.2f} sec")
+
+    # 콜백이 실패하면 ocr_done으로 남겨 재개 시 콜백만 다시 보낸다
+    if delivered:
+        state["status"] = DONE
+    states[page_number] = state
+    checkpoint.save(page_number, state)
+    return delivered
+
+
+def run_pages(doc_id: int, pdf_bytes: bytes, callback_url: str,
+              page_numbers: Optional[List[int]] = None, retry: bool = False) -> Dict:
+    """
+    page_numbers가 없으면 전체 페이지를, 있으면 지정한 페이지만 대상으로
+    아직 완료되지 않은 페이지를 처리.
+    retry=True(BE 재시도 요청)면 done 페이지도 다시 처리한다 (체크포인트의 분석 결과로 콜백만 재전송).
+    페이지 단위 오류는 failed로 기록하고 다음 페이지로 넘어간다.
+    """
+    checkpoint = OcrCheckpoint(doc_id)
+    states = checkpoint.load()
+    total_pages = pdf_page_count(pdf_bytes)
+
+    if page_numbers is None:
+        page_numbers = range(1, total_pages + 1)
+    requested = list(page_numbers)
+    # BE가 실패로 보고한 페이지는 콜백 전달 후 BE 저장이 실패했을 수 있으므로 done이어도 다시 처리
+    page_numbers = [n for n in requested if retry or states.get(n, {}).get("status") != DONE]
+    skipped = len(requested) - len(page_numbers)
+    if skipped and page_numbers:
+        print(f"[CHECKPOINT] doc {doc_id}: 완료된 {skipped}페이지 건너뜀, {page_numbers[0]}페이지부터 재개")
+    elif skipped:
+        print(f"[CHECKPOINT] doc {doc_id}: 요청한 {skipped}페이지 모두 이미 완료")
+
+    # 1) PDF → 이미지 변환 + 텍스트 레이어 분류 (남은 페이지만)
+    t0 = time.time()
+    pages = pdf_to_images(pdf_bytes, page_numbers=page_numbers)
+    layers = classify_pdf(pdf_bytes, page_numbers=page_numbers)
+    vision_images = prepare_pdf_images(
+        pdf_bytes, page_numbers=[n for n, layer in layers.items() if layer.route == ROUTE_VISION]
+    )
+    print(f"[TIME] PDF to images: {time.time() - t0:.2f} sec")
+
+    failed = []
+    for page_number, img_bytes in pages:
+
+        print(f"\n===== PAGE {page_number} START =====")
 
-        # 5) callback POST
-        t4 = time.time()
         try:
-            resp = requests.post(
-                callback_url,
-                json={
-                    "doc_id": doc_id,
-                    "page_number": page_number,
-                    "image_url": image_url,
-                    "ocr_text": ocr_text,
-                },
-                timeout=10,
-            )
-            resp.raise_for_status()
+            delivered = process_page(doc_id, page_number, img_bytes, layers[page_number],
+                                     vision_images.get(page_number), callback_url, checkpoint, states)
+            # 분석은 끝났지만 BE가 결과를 받지 못함 → ocr_done으로 남기고 실패 목록에 포함
+            if not delivered:
+                failed.append(page_number)
         except Exception as e:
-            print(f"[AI OCR] callback 실패: doc={doc_id}, page={page_number}, error={e}")
-        print(f"[TIME] Callback POST: {time.time() - t4:.2f} sec")
-
-        # 6) mini-summary 생성
-        t5 = time.time()
-        mini = make_mini_summary(ocr_text)
-        mem.add_summary(page_number, mini)
-        print(f"[TIME] Mini summary: {time.time() - t5:.2f} sec")
+            print(f"[AI OCR] 페이지 처리 실패: doc={doc_id}, page={page_number}, error={e}")
+            state = {**states.get(page_number, {}), "status": FAILED, "error": str(e)}
+            states[page_number] = state
+            checkpoint.save(page_number, state)
+            failed.append(page_number)
+
+            send_callback(callback_url, {
+                "doc_id": doc_id,
+                "page_number": page_number,
+                "status": FAILED,
+                "error": str(e),
+            })
 
         print(f"===== PAGE {page_number} END =====\n")
 
+    # 교안 단위 비용/시간 절감 리포트 (체크포인트 기준이라 재개 전 페이지도 포함)
+    report = savings_report({n: s for n, s in states.items() if "route" in s})
+    print(f"[SAVINGS] doc {doc_id}: {report}")
+
+    # 요청 페이지와 체크포인트에 남은 페이지가 모두 콜백까지 끝났으면 정리
+    # (중복 제거로 BE가 일부 페이지만 보내면 나머지 페이지는 체크포인트에 없다)
+    if all(states.get(n, {}).get("status") == DONE for n in requested) \
+            and all(state.get("status") == DONE for state in states.values()):
+        checkpoint.clear()
+        print(f"[CHECKPOINT] doc {doc_id}: 요청 페이지 완료, 체크포인트 삭제")
+
+    return {"doc_id": doc_id, "processed": [n for n, _ in pages], "failed": failed, "savings": report}
+
+
+# 워커가 죽으면 메시지가 다시 전달되고, 체크포인트 기준으로 이어서 처리
+@celery_app.task(
+    name="ai_file_ocr.tasks.run_pdf_ocr",
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def run_pdf_ocr(doc_id: int, pdf_bytes: bytes, callback_url: str,
+                page_numbers: Optional[List[int]] = None):
+
+    total_start = time.time()
+
+    # 실패 페이지 재시도용 원본 보관 (재개 시에는 이미 저장됨)
+    if not OcrCheckpoint(doc_id).load():
+        upload_s3(pdf_bytes, source_pdf_key(doc_id), content_type="application/pdf")
+
+    result = run_pages(doc_id, pdf_bytes, callback_url, page_numbers=page_numbers)
+
     print(f"[TOTAL TIME] run_pdf_ocr total: {time.time() - total_start:.2f} sec")
-    return True
+    return result
+
+
+@celery_app.task(
+    name="ai_file_ocr.tasks.retry_pdf_ocr_pages",
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def retry_pdf_ocr_pages(doc_id: int, page_numbers: List[int], callback_url: str):
+
+    total_start = time.time()
+
+    pdf_bytes = download_s3(source_pdf_key(doc_id))
+    result = run_pages(doc_id, pdf_bytes, callback_url, page_numbers=sorted(set(page_numbers)), retry=True)
+
+    print(f"[TOTAL TIME] retry_pdf_ocr_pages total: {time.time() - total_start:.2f} sec")
+    return result
@@ -0,0 +1,380 @@
+"""
+판서 증분(delta) OCR
+
+같은 페이지에서 칠판을 여러 번 찍으면 대부분은 이전 사진에 몇 줄이 추가된 것이다.
+이전 판서 상태(흑백 축소 이미지 + OCR 박스 + 블록)를 캐시해 두고 새 사진과 비교해
+바뀐 영역만 다시 인식하고, 블록 단위 diff 결과에 따라 LLM 재작성 범위를 줄인다.
+
+1) 정렬   : ORB 특징점 + RANSAC homography로 이전 사진을 새 사진 좌표계로 맞춤
+2) 변경 영역: 정렬된 두 이미지 차이 → 이진화/팽창 → 연결 요소 bbox
+3) 재인식 : 변경 영역(과 걸친 이전 줄 박스)만 crop해 RapidOCR, 나머지는 이전 박스 재사용
+4) 블록 diff: 이전/새 블록 비교 →
+   - unchanged : 바뀐 블록 없음 (LLM 생략)
+   - append    : 끝에 블록이 추가되거나 마지막 블록이 이어짐 (추가분만 LLM)
+   - rewrite   : 중간 블록 변경/삭제 (영역 OCR + 전체 LLM)
+   - full      : 이전 상태 없음 / 정렬 실패 / 변경 영역이 너무 넓음 (전체 OCR + 전체 LLM)
+
+캐시는 프로세스 메모리(LRU)라 워커가 여러 개면 다른 워커의 이전 판서는 full로 처리된다.
+
+벤치마크: python -m ai_lecture_ocr.ocr_pipeline.board_delta
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .rapid_ocr_blocks import classify_blocks, decode_and_resize, reading_order, run_ocr
+
+CACHE_SIZE = int(os.getenv("BOARD_DELTA_CACHE_SIZE", 64))
+ALIGN_SIDE = 800                     # 정렬/차이 계산용 축소 크기
+MIN_MATCHES = 30                     # homography 추정에 필요한 최소 특징점 매칭 수
+DIFF_THRESHOLD = 40                  # 밝기 차이 임계값 (0~255)
+MAX_CHANGED_RATIO = float(os.getenv("BOARD_DELTA_MAX_CHANGE", 0.5))  # 넘으면 전체 OCR
+REGION_PAD = 12                      # 재인식 crop 여백 (px, OCR 해상도 기준)
+
+
+# ==============================
+# 1. 이전 판서 상태 캐시
+# ==============================
+
+class BoardStateCache:
+    """boardId → 판서 상태 (LRU, 스레드 안전)"""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        with self._lock:
+            state = self._items.get(str(key))
+            if state is not None:
+                self._items.move_to_end(str(key))
+            return state
+
+    def put(self, key, state: Dict[str, Any]):
+        if key is None:
+            return
+        with self._lock:
+            self._items[str(key)] = state
+            self._items.move_to_end(str(key))
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+board_states = BoardStateCache()
+
+
+def small_gray(img) -> Tuple[np.ndarray, float]:
+    """정렬용 흑백 축소 이미지와 축소 비율 (small = full * scale)"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    scale = min(1.0, ALIGN_SIDE / max(gray.shape[:2]))
+    if scale < 1:
+        gray = cv2.resize(gray, (int(gray.shape[1] * scale), int(gray.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+# ==============================
+# 2. 정렬 / 변경 영역
+# ==============================
+
+def align(prev_gray: np.ndarray, cur_gray: np.ndarray) -> Optional[np.ndarray]:
+    """이전 → 현재 축소 이미지 homography (특징점이 부족하면 None)"""
+    orb = cv2.ORB_create(2000)
+    kp1, des1 = orb.detectAndCompute(prev_gray, None)
+    kp2, des2 = orb.detectAndCompute(cur_gray, None)
+    if des1 is None or des2 is None:
+        return None
+
+    matches = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True).match(des1, des2)
+    if len(matches) < MIN_MATCHES:
+        return None
+
+    src = np.float32([kp1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
+    dst = np.float32([kp2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+    H, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+    if H is None or int(inliers.sum()) < MIN_MATCHES:
+        return None
+    return H
+
+
+def changed_regions(prev_gray: np.ndarray, cur_gray: np.ndarray, H: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    정렬된 이전 이미지와 현재 이미지가 다른 영역
+    반환: (축소 좌표 bbox (K, 4), 변경 면적 비율)
+    """
+    h, w = cur_gray.shape[:2]
+    warped = cv2.warpPerspective(prev_gray, H, (w, h), borderMode=cv2.BORDER_REPLICATE)
+    # 조명 차이는 줄이고 글씨 획 차이만 남도록 흐림 후 비교
+    diff = cv2.absdiff(cv2.GaussianBlur(warped, (5, 5), 0), cv2.GaussianBlur(cur_gray, (5, 5), 0))
+    _, mask = cv2.threshold(diff, DIFF_THRESHOLD, 255, cv2.THRESH_BINARY)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    mask = cv2.dilate(mask, np.ones((9, 25), np.uint8))  # 같은 줄의 획은 하나로
+
+    n, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+    boxes = stats[1:, :4].astype(np.float64)
+    boxes = boxes[stats[1:, 4] >= 40]  # 점 노이즈 제외
+    boxes[:, 2:] += boxes[:, :2]
+    area = float(((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).sum()) if len(boxes) else 0.0
+    return boxes, area / float(h * w)
+
+
+def scale_homography(H: np.ndarray, prev_scale: float, cur_scale: float) -> np.ndarray:
+    """축소 좌표 homography → OCR 해상도 좌표 homography"""
+    S_prev = np.diag([prev_scale, prev_scale, 1.0])
+    S_cur_inv = np.diag([1.0 / cur_scale, 1.0 / cur_scale, 1.0])
+    return S_cur_inv @ H @ S_prev
+
+
+def warp_boxes(boxes: List[Dict[str, Any]], H: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    이전 OCR 박스를 현재 이미지 좌표로 옮긴다
+    외접 사각형을 쓰면 회전이 있을 때 사진마다 박스가 조금씩 커지므로,
+    중심만 변환하고 크기는 homography 배율만큼만 조정한다.
+    """
+    if not boxes:
+        return []
+    b = np.array([box["bbox"] for box in boxes], dtype=np.float64)
+    centers = np.stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2], axis=1)
+    moved = cv2.perspectiveTransform(centers.reshape(-1, 1, 2), H).reshape(-1, 2)
+    scale = float(np.sqrt(abs(np.linalg.det(H[:2, :2] / H[2, 2]))))
+    half = (b[:, 2:] - b[:, :2]) * scale / 2
+    x1y1, x2y2 = moved - half, moved + half
+    return [
+        {**box, "bbox": [int(x1), int(y1), int(x2), int(y2)]}
+        for box, (x1, y1), (x2, y2) in zip(boxes, x1y1, x2y2)
+    ]
+
+
+def _intersects(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def merge_regions(regions: List[List[float]], boxes: List[Dict[str, Any]]):
+    """
+    변경 영역에 걸친 이전 박스는 버리고 영역을 그 박스까지 넓힌다 (줄 전체를 다시 인식)
+    넓힌 영역끼리 겹치면 하나로 합친다.
+    반환: (재인식 영역 목록, 유지할 이전 박스 목록)
+    """
+    regions = [list(r) for r in regions]
+    keep = list(boxes)
+
+    changed = True
+    while changed:
+        changed = False
+        for r in regions:
+            hit = [b for b in keep if _intersects(r, b["bbox"])]
+            for b in hit:
+                x1, y1, x2, y2 = b["bbox"]
+                r[:] = [min(r[0], x1), min(r[1], y1), max(r[2], x2), max(r[3], y2)]
+                keep.remove(b)
+                changed = True
+
+        merged: List[List[float]] = []
+        for r in sorted(regions, key=lambda r: (r[1], r[0])):
+            for m in merged:
+                if _intersects(r, m):
+                    m[:] = [min(m[0], r[0]), min(m[1], r[1]), max(m[2], r[2]), max(m[3], r[3])]
+                    changed = True
+                    break
+            else:
+                merged.append(r)
+        regions = merged
+
+    return regions, keep
+
+
+def ocr_regions(img, regions: List[List[float]]) -> List[Dict[str, Any]]:
+    """변경 영역만 crop해 OCR하고 박스를 이미지 좌표로 되돌린다"""
+    h, w = img.shape[:2]
+    results = []
+    for x1, y1, x2, y2 in regions:
+        x1, y1 = max(int(x1) - REGION_PAD, 0), max(int(y1) - REGION_PAD, 0)
+        x2, y2 = min(int(x2) + REGION_PAD, w), min(int(y2) + REGION_PAD, h)
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            continue
+        for box in run_ocr(img[y1:y2, x1:x2], keep_scale=True):
+            bx1, by1, bx2, by2 = box["bbox"]
+            results.append({**box, "bbox": [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]})
+    return results
+
+
+# ==============================
+# 3. 블록 diff
+# ==============================
+
+def _norm(text: str) -> str:
+    return re.sub(r"\s+", "", text or "").lower()
+
+
+def block_key(block: Dict[str, Any]) -> Tuple[str, str]:
+    if block.get("type") == "bullet_list":
+        return block["type"], "\n".join(_norm(it) for it in block.get("items", []))
+    return block.get("type", ""), _norm(block.get("text", ""))
+
+
+def _extension(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """new가 old 뒤에 내용이 이어 붙은 블록이면 추가된 부분만 담은 블록, 아니면 None"""
+    if old.get("type") != new.get("type"):
+        return None
+
+    if new["type"] == "bullet_list":
+        old_items, new_items = old.get("items", []), new.get("items", [])
+        if [_norm(i) for i in new_items[:len(old_items)]] == [_norm(i) for i in old_items]:
+            return {"type": "bullet_list", "items": new_items[len(old_items):]}
+        return None
+
+    if new["type"] == "paragraph":
+        old_text, new_text = old.get("text", ""), new.get("text", "")
+        if _norm(new_text).startswith(_norm(old_text)):
+            # 원문 기준으로 이전 텍스트 길이만큼 (공백 차이는 정규화 길이로 보정)
+            consumed, i = 0, 0
+            target = len(_norm(old_text))
+            while i < len(new_text) and consumed < target:
+                consumed += not new_text[i].isspace()
+                i += 1
+            return {"type": "paragraph", "text": new_text[i:].strip()}
+    return None
+
+
+def diff_blocks(prev_blocks: List[Dict[str, Any]], new_blocks: List[Dict[str, Any]]):
+    """
+    반환: (mode, 추가된 블록 목록)
+    - ("unchanged", [])
+    - ("append", [추가 블록...])  끝에만 블록이 추가/이어짐
+    - ("rewrite", [])             그 외 변경
+    """
+    a = [block_key(b) for b in prev_blocks]
+    b = [block_key(b) for b in new_blocks]
+    ops = [op for op in SequenceMatcher(a=a, b=b, autojunk=False).get_opcodes() if op[0] != "equal"]
+    if not ops:
+        return "unchanged", []
+
+    if len(ops) != 1:
+        return "rewrite", []
+    tag, i1, i2, j1, j2 = ops[0]
+    if i2 != len(a) or j2 != len(b):
+        return "rewrite", []
+
+    if tag == "insert":
+        return "append", new_blocks[j1:j2]
+
+    # 마지막 블록(문단/목록)에 줄이 이어진 경우
+    if tag == "replace" and i2 - i1 == 1:
+        ext = _extension(prev_blocks[i1], new_blocks[j1])
+        if ext is not None:
+            added = [ext] if (ext.get("text") or ext.get("items")) else []
+            added += new_blocks[j1 + 1:j2]
+            return ("append", added) if added else ("unchanged", [])
+    return "rewrite", []
+
+
+# ==============================
+# 4. 증분 OCR
+# ==============================
+
+def _blocks_from_boxes(boxes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return classify_blocks(reading_order(boxes)) if boxes else []
+
+
+def ocr_board_delta(img_bytes: bytes, prev_state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    반환: {
+      "mode": "full" | "unchanged" | "append" | "rewrite",
+      "blocks": 새 판서 전체 블록,
+      "addedBlocks": append일 때 추가 블록,
+      "regions": 재인식한 영역 수,
+      "state": 캐시에 저장할 상태 (text는 LLM 이후 채움),
+    }
+    """
+    img = decode_and_resize(img_bytes)
+    gray, scale = small_gray(img)
+
+    def full():
+        boxes = run_ocr(img)
+        return {
+            "mode": "full", "blocks": _blocks_from_boxes(boxes), "addedBlocks": [], "regions": 1,
+            "state": {"gray": gray, "scale": scale, "boxes": boxes},
+        }
+
+    if prev_state is None:
+        return full()
+
+    H_small = align(prev_state["gray"], gray)
+    if H_small is None:
+        print("[BOARD_DELTA] 정렬 실패 → 전체 OCR")
+        return full()
+
+    regions_small, ratio = changed_regions(prev_state["gray"], gray, H_small)
+    if ratio > MAX_CHANGED_RATIO:
+        print(f"[BOARD_DELTA] 변경 영역 {ratio:.0%} → 전체 OCR")
+        return full()
+
+    H = scale_homography(H_small, prev_state["scale"], scale)
+    prev_boxes = warp_boxes(prev_state["boxes"], H)
+    regions, kept = merge_regions((regions_small / scale).tolist(), prev_boxes)
+    boxes = kept + ocr_regions(img, regions)
+
+    blocks = _blocks_from_boxes(boxes)
+    mode, added = diff_blocks(prev_state["blocks"], blocks)
+    print(f"[BOARD_DELTA] 변경 영역 {len(regions)}개 ({ratio:.1%}) → {mode}")
+    return {
+        "mode": mode, "blocks": blocks, "addedBlocks": added, "regions": len(regions),
+        "state": {"gray": gray, "scale": scale, "boxes": boxes},
+    }
+
+
+# ==============================
+# 5. 벤치마크 (합성 판서: 한 줄씩 추가 + 카메라 흔들림)
+# ==============================
+
+def _shot(lines: List[str], rng: np.random.Generator, width: int = 1600, height: int = 1200):
+    img = np.full((height, width, 3), 235, dtype=np.uint8)
+    for i, text in enumerate(lines):
+        cv2.putText(img, text, (60, 90 + i * 80), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (30, 30, 30), 3)
+    # 손으로 찍은 것처럼 약간의 회전/이동/밝기 변화
+    angle, (tx, ty) = rng.uniform(-1.5, 1.5), rng.uniform(-15, 15, 2)
+    M = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    M[:, 2] += (tx, ty)
+    img = cv2.warpAffine(img, M, (width, height), borderValue=(235, 235, 235))
+    img = cv2.convertScaleAbs(img, alpha=rng.uniform(0.95, 1.05), beta=rng.uniform(-8, 8))
+    return cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def benchmark(steps: int = 8, seed: int = 0):
+    import time
+
+    rng = np.random.default_rng(seed)
+    words = ["gradient", "descent", "loss", "matrix", "vector", "softmax", "2025", "bias", "layer"]
+    lines = [" ".join(rng.choice(words, size=4)) for _ in range(steps)]
+
+    full_time = delta_time = 0.0
+    state = None
+    modes = []
+    for k in range(1, steps + 1):
+        shot = _shot(lines[:k], rng)
+
+        t = time.perf_counter()
+        ocr_board_delta(shot, None)
+        full_time += time.perf_counter() - t
+
+        t = time.perf_counter()
+        result = ocr_board_delta(shot, state)
+        delta_time += time.perf_counter() - t
+
+        state = {**result["state"], "blocks": result["blocks"]}
+        modes.append(result["mode"])
+
+    print(f"[BENCH] 판서 {steps}장: 전체 OCR {full_time / steps * 1000:.0f}ms/장, "
+          f"증분 OCR {delta_time / steps * 1000:.0f}ms/장, 모드 {modes}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,12 +1,5 @@
-import os
 from ai_file_ocr.pipeline.rewrite import process_latex, code_rewrite
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI(
-    base_url="https://api.groq.com/openai/v1",
-    api_key=os.getenv("GROQ_API_KEY"))
+from llm_gateway import achat, chat
 
 
 def blocks_to_text(blocks):
@@ -41,10 +34,10 @@ def strip_think_block(text: str) -> str:
 
 
 
-def call_gpt_from_blocks(blocks):
+def build_prompt(blocks) -> str:
     block_text = blocks_to_text(blocks)
 
-    prompt = f"""
+    return f"""
 너는 시각장애 학우를 위한 학습자료 제작 보조자야.
 아래는 슬라이드 한 장을 OCR과 레이아웃 분석을 통해 정제한 텍스트야.
 
@@ -79,17 +72,70 @@ def call_gpt_from_blocks(blocks):
 {block_text}
 """
 
-    resp = client.chat.completions.create(
-        model="openai/gpt-oss-20b",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.2,
-    )
 
-    raw = resp.choices[0].message.content
+def build_append_prompt(blocks, prev_text: str) -> str:
+    """같은 판서에 새로 추가된 블록만 이어서 정리하는 프롬프트 (증분 OCR)"""
+    block_text = blocks_to_text(blocks)
+
+    return f"""
+너는 시각장애 학우를 위한 학습자료 제작 보조자야.
+아래 [이전 정리본]은 같은 칠판을 앞서 찍어 정리한 내용이고, [추가된 OCR 텍스트]는 그 뒤에 새로 적힌 판서야.
+
+[추가된 OCR 텍스트]만 이전 정리본에 이어 붙일 수 있게 정리해줘:
+
+1) 오탈자, 문단 깨짐을 바로잡아 자연스러운 문장으로 재작성
+2) bullet / 목록은 bullet 항목으로 나누기
+3) 이전 정리본에 이미 있는 내용은 반복하지 않기
+4) 제목이나 핵심 요약 섹션을 새로 만들지 말고, 이어 붙일 본문만 bullet("- ")으로 출력
+
+출력 규칙 :
+- 모든 수식은 LaTeX 문법으로만 출력하라. (\(...\), \[...\], \begin{{...}}...\end{{...}} 그대로 유지)
+- 모든 코드(쉘 명령어 포함)는  코드블록(```)으로 감싸서 출력하되 언어명은 작성하지 않는다. 
+- 코드 내부는 여백, 줄바꿈, 공백 포함하여 원본을 그대로 보존한다.
+
+[이전 정리본]
+{prev_text}
+
+[추가된 OCR 텍스트]
+{block_text}
+"""
+
+
+def postprocess(raw: str) -> str:
     clean = strip_think_block(raw)
 
     clean = code_rewrite(clean)
     
     clean = process_latex(clean)
 
-    return clean
\ No newline at end of file
+    return clean
+
+
+def call_gpt_from_blocks(blocks):
+    resp = chat(
+        "openai/gpt-oss-20b",
+        provider="groq",
+        messages=[{"role": "user", "content": build_prompt(blocks)}],
+        temperature=0.2,
+    )
+    return postprocess(resp.choices[0].message.content)
+
+
+async def acall_gpt_from_blocks(blocks):
+    resp = await achat(
+        "openai/gpt-oss-20b",
+        provider="groq",
+        messages=[{"role": "user", "content": build_prompt(blocks)}],
+        temperature=0.2,
+    )
+    return postprocess(resp.choices[0].message.content)
+
+
+async def acall_gpt_append(blocks, prev_text: str):
+    resp = await achat(
+        "openai/gpt-oss-20b",
+        provider="groq",
+        messages=[{"role": "user", "content": build_append_prompt(blocks, prev_text)}],
+        temperature=0.2,
+    )
+    return postprocess(resp.choices[0].message.content)
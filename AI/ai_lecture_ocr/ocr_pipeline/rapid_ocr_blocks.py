@@ -1,16 +1,12 @@
 import cv2
 import numpy as np
-from rapidocr_onnxruntime import RapidOCR
 import re
 import statistics
 
-ocr = RapidOCR(det_use_cuda=False, rec_use_cuda=False)
-
-def load_and_resize(img_path: str, max_side: int = 1600):
-    img = cv2.imread(img_path)
-    if img is None:
-        raise FileNotFoundError(img_path)
+from layout_order import xy_cut
+from ocr_pool import get_pool
 
+def resize_max_side(img, max_side: int = 1600):
     h, w = img.shape[:2]
     scale = max_side / max(h, w)
     if scale < 1:  
@@ -20,8 +16,36 @@ def load_and_resize(img_path: str, max_side: int = 1600):
     return img
 
 
-def run_ocr(img):
-    out = ocr(img)
+def load_and_resize(img_path: str, max_side: int = 1600):
+    img = cv2.imread(img_path)
+    if img is None:
+        raise FileNotFoundError(img_path)
+    return resize_max_side(img, max_side)
+
+
+def decode_and_resize(img_bytes: bytes, max_side: int = 1600):
+    """업로드 바이트를 디스크를 거치지 않고 메모리에서 바로 디코딩"""
+    img = cv2.imdecode(np.frombuffer(img_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("이미지를 디코딩할 수 없습니다.")
+    return resize_max_side(img, max_side)
+
+
+def run_ocr(img, keep_scale: bool = False):
+    """
+    keep_scale: 부분 영역(crop) OCR용. 검출 모델이 짧은 변을 736px까지 키우지 않고
+                원본 해상도 그대로 검출하게 한다 (줄 단위 crop이 전체 이미지보다 커지는 것 방지)
+    """
+    # 요청마다 풀에서 RapidOCR 세션을 하나 빌려 쓴다 (동시 요청이 세션 하나에 몰리지 않도록)
+    with get_pool().session() as ocr:
+        det = ocr.text_det
+        limit = det.limit_type, det.limit_side_len
+        if keep_scale:
+            det.limit_type, det.limit_side_len = "max", max(img.shape[:2])
+        try:
+            out = ocr(img)
+        finally:
+            det.limit_type, det.limit_side_len = limit
     if not out:
         return []
 
@@ -68,18 +92,12 @@ def run_ocr(img):
     return results
 
 
-def reading_order(boxes):
-    if not boxes:
-        return []
-
-    # 1) 위→아래 정렬
-    boxes_sorted = sorted(boxes, key=lambda b: (b["bbox"][1], b["bbox"][0]))
-
-    # 2) y 오버랩 기반으로 줄(line) 묶기
+def group_lines(boxes):
+    """y 오버랩 기반으로 줄(line) 묶기 (boxes는 위→아래 순)"""
     lines = []
-    cur = [boxes_sorted[0]]
+    cur = [boxes[0]]
 
-    for b in boxes_sorted[1:]:
+    for b in boxes[1:]:
         prev = cur[-1]
         py1, py2 = prev["bbox"][1], prev["bbox"][3]
         by1, by2 = b["bbox"][1], b["bbox"][3]
@@ -93,6 +111,24 @@ def reading_order(boxes):
             lines.append(cur)
             cur = [b]
     lines.append(cur)
+    return lines
+
+
+def reading_order(boxes):
+    if not boxes:
+        return []
+
+    # 1) XY-cut으로 영역(단/사이드바/띠) 읽기 순서 결정
+    bboxes = np.array([b["bbox"] for b in boxes], dtype=np.float64)
+    median_box_h = float(np.median(bboxes[:, 3] - bboxes[:, 1]))
+    page_w = float(bboxes[:, 2].max() - bboxes[:, 0].min())
+    min_gap_x = max(median_box_h * 2, page_w * 0.02)  # 단어 간격보다 넓은 세로 공백만 단 경계로
+
+    # 2) 영역마다 y 오버랩 기반으로 줄(line) 묶기
+    lines = []
+    for leaf in xy_cut(bboxes, min_gap_x=min_gap_x):
+        region = sorted((boxes[i] for i in leaf), key=lambda b: (b["bbox"][1], b["bbox"][0]))
+        lines.extend(group_lines(region))
 
     # 3) 줄 단위 bbox / center / height 계산
     enriched_lines = []
@@ -138,7 +174,6 @@ def reading_order(boxes):
     page_y1 = min(all_y1)
     page_y2 = max(all_y2)
     page_height = page_y2 - page_y1
-    page_width = page_x2 - page_x1
 
     # 5) 제목 후보 감지
     try:
@@ -155,36 +190,14 @@ def reading_order(boxes):
         if is_bigger_font and is_top_region:
             ln["role"] = "title"
 
-    # 6) 2컬럼 감지
-    body_lines = [ln for ln in enriched_lines if ln["role"] != "title"]
-    split_x = None
-    if len(body_lines) >= 6:
-        x_centers = sorted(l["center_x"] for l in body_lines)
-        gaps = [x_centers[i + 1] - x_centers[i] for i in range(len(x_centers) - 1)]
-        if gaps:
-            max_gap = max(gaps)
-            if max_gap > page_width * 0.25:
-                idx = gaps.index(max_gap)
-                split_x = (x_centers[idx] + x_centers[idx + 1]) / 2
-
-    # 7) 읽기 순서
+    # 6) 읽기 순서: 제목 → 나머지 줄은 XY-cut 순서 그대로
     ordered = []
 
     title_lines = [ln for ln in enriched_lines if ln["role"] == "title"]
     title_lines = sorted(title_lines, key=lambda ln: ln["bbox"][1])
     ordered.extend(title_lines)
 
-    other_lines = [ln for ln in enriched_lines if ln["role"] != "title"]
-
-    if split_x is None:
-        ordered.extend(sorted(other_lines, key=lambda ln: ln["bbox"][1]))
-    else:
-        left = [ln for ln in other_lines if ln["center_x"] <= split_x]
-        right = [ln for ln in other_lines if ln["center_x"] > split_x]
-        left_sorted = sorted(left, key=lambda ln: ln["bbox"][1])
-        right_sorted = sorted(right, key=lambda ln: ln["bbox"][1])
-        ordered.extend(left_sorted)
-        ordered.extend(right_sorted)
+    ordered.extend(ln for ln in enriched_lines if ln["role"] != "title")
 
     return ordered
 
@@ -276,17 +289,24 @@ def classify_blocks(lines):
     return blocks
 
 
-def process_page(img_path: str):
-    img = load_and_resize(img_path)
+def process_image(img, page_name: str = ""):
     ocr_boxes = run_ocr(img)
 
     if not ocr_boxes:
-        return {"page": img_path, "blocks": []}
+        return {"page": page_name, "blocks": []}
 
     lines = reading_order(ocr_boxes)
     blocks = classify_blocks(lines)
 
     return {
-        "page": img_path,
+        "page": page_name,
         "blocks": blocks,
     }
+
+
+def process_page(img_path: str):
+    return process_image(load_and_resize(img_path), img_path)
+
+
+def process_bytes(img_bytes: bytes, page_name: str = ""):
+    return process_image(decode_and_resize(img_bytes), page_name)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
 from pydantic import BaseModel
-import base64, tempfile
+import base64
+import time
 
-from .ocr_pipeline.rapid_ocr_blocks import process_page
-from .ocr_pipeline.llm_postprocess import call_gpt_from_blocks
+from executors import run_cpu
+from .ocr_pipeline.board_delta import board_states, ocr_board_delta
+from .ocr_pipeline.rapid_ocr_blocks import process_bytes
+from .ocr_pipeline.llm_postprocess import acall_gpt_append, acall_gpt_from_blocks
 
 router = APIRouter()
 
@@ -11,20 +14,72 @@ class BoardOcrRequest(BaseModel):
     image_base64: str
 
 
-@router.post("/ocr/board")
-def board_ocr(request: BoardOcrRequest):
-    try:
-        img_bytes = base64.b64decode(request.image_base64)
+async def _board_text(img_bytes: bytes, source: str):
+    t0 = time.perf_counter()
+    # RapidOCR는 CPU 풀에서 (메모리에서 바로 디코딩), Groq 호출은 async 클라이언트로
+    page = await run_cpu(process_bytes, img_bytes)
+    t1 = time.perf_counter()
+    text = await acall_gpt_from_blocks(page["blocks"])
+    t2 = time.perf_counter()
+
+    print(f"[BOARD] {source} {len(img_bytes) / 1024:.0f}KB | OCR {t1 - t0:.2f}s, LLM {t2 - t1:.2f}s")
+    return {"text": text}
+
+
+async def _board_delta_text(img_bytes: bytes, board_id: str, prev_board_id: str | None):
+    """
+    같은 페이지의 이전 판서(prev_board_id)와 비교해 바뀐 부분만 OCR/LLM 처리
+    이전 판서 상태가 이 프로세스에 없으면 전체 처리(full)
+    """
+    t0 = time.perf_counter()
+    prev = board_states.get(prev_board_id)
+    result = await run_cpu(ocr_board_delta, img_bytes, prev)
+    t1 = time.perf_counter()
+
+    mode, appended = result["mode"], ""
+    if mode == "unchanged":
+        text = prev["text"]
+    elif mode == "append":
+        appended = await acall_gpt_append(result["addedBlocks"], prev["text"])
+        text = f"{prev['text'].rstrip()}\n\n{appended}"
+    else:
+        text = await acall_gpt_from_blocks(result["blocks"])
+    t2 = time.perf_counter()
+
+    board_states.put(board_id, {**result["state"], "blocks": result["blocks"], "text": text})
+    print(f"[BOARD] delta={mode} regions={result['regions']} {len(img_bytes) / 1024:.0f}KB | "
+          f"OCR {t1 - t0:.2f}s, LLM {t2 - t1:.2f}s")
+    return {"text": text, "mode": mode, "appendedText": appended}
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-            tmp.write(img_bytes)
-            tmp.flush()
-            img_path = tmp.name
 
-        page = process_page(img_path)
-        text = call_gpt_from_blocks(page["blocks"])
+# 바이너리 업로드 (multipart) — base64 인코딩 없이 원본 바이트 그대로 받는다
+# board_id를 주면 판서 상태를 캐시하고, prev_board_id를 주면 그 판서 대비 증분 처리
+@router.post("/ocr/board/image")
+async def board_ocr_image(
+    image: UploadFile = File(...),
+    board_id: str | None = Form(None),
+    prev_board_id: str | None = Form(None),
+):
+    img_bytes = await image.read()
+    if not img_bytes:
+        raise HTTPException(status_code=400, detail="빈 이미지입니다.")
 
-        return {"text": text}
+    try:
+        if board_id is None:
+            return await _board_text(img_bytes, "multipart")
+        return await _board_delta_text(img_bytes, board_id, prev_board_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"OCR 실패: {e}")
+
+
+# 기존 base64 JSON 업로드 (하위 호환)
+@router.post("/ocr/board")
+async def board_ocr(request: BoardOcrRequest):
+    try:
+        img_bytes = base64.b64decode(request.image_base64)
+        return await _board_text(img_bytes, "base64")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OCR 실패: {e}")
@@ -0,0 +1,33 @@
+"""
+AI 서버 공용 실행 풀
+
+FastAPI 핸들러(async def)에서 블로킹 작업을 이벤트 루프 밖으로 보낼 때 사용한다.
+- cpu : RapidOCR/cv2 등 연산 위주 작업 (코어 수만큼)
+- io  : boto3/Roboflow/파이프라인 전체 등 블로킹 I/O가 섞인 작업
+풀 크기로 동시 실행 수가 제한되고, 넘치는 요청은 풀 큐에서 대기한다.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+CPU_WORKERS = int(os.getenv("AI_CPU_WORKERS", os.cpu_count() or 2))
+IO_WORKERS = int(os.getenv("AI_IO_WORKERS", 16))
+
+cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="ai-cpu")
+io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="ai-io")
+
+
+async def run_cpu(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_pool, partial(fn, *args, **kwargs))
+
+
+async def run_io(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool, partial(fn, *args, **kwargs))
+
+
+def shutdown():
+    cpu_pool.shutdown(wait=False, cancel_futures=True)
+    io_pool.shutdown(wait=False, cancel_futures=True)
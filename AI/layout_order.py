@@ -0,0 +1,271 @@
+"""
+AI 서버 공용 레이아웃 / 읽기 순서 엔진 (numpy)
+
+- xy_cut        : 재귀 XY-cut (공백 투영) → 영역 단위 읽기 순서
+                  N단, 사이드바, 제목/표처럼 단을 가로지르는 줄을 처리한다.
+- column_boundaries / assign_columns : 박스 중심 x 간격으로 단 경계를 찾고 searchsorted로 배정
+
+사용처:
+- ai_lecture_ocr.rapid_ocr_blocks.reading_order (판서/교안 줄 순서) : xy_cut
+- ai_exam_ocr.pipeline.detection_layout.build_structured_questions (시험지 단 분할) : column_boundaries / assign_columns
+  시험지는 xy_cut을 쓰지 않는다. 문항 번호(qnum) 박스가 본문 왼쪽에 세로로 늘어서 있어
+  공백 투영으로 자르면 qnum 줄 전체가 하나의 "단"으로 떨어져 나가고, 읽기 순서로 문항을 묶으면
+  모든 본문이 마지막 문항에 붙는다. 그래서 시험지는 qnum을 기준점으로 한 구간 배정을 유지한다.
+
+알려진 한계:
+- 단들의 줄 높이가 처음부터 끝까지 정확히 맞고 위/아래에 단 구조를 보여 주는 띠가 없으면
+  표와 구분할 수 없어 행 단위로 읽는다.
+
+벤치마크: python layout_order.py
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+
+def as_boxes(bboxes) -> np.ndarray:
+    return np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+
+
+# ==============================
+# 1. 단 경계 (중심 간격)
+# ==============================
+
+def column_boundaries(centers, extent: float, min_gap_ratio: float, min_items: int = 3) -> np.ndarray:
+    """
+    정렬된 중심좌표 사이 간격이 extent * min_gap_ratio보다 큰 곳을 단 경계로 반환
+    (1단이면 빈 배열, N단이면 N-1개)
+    """
+    centers = np.sort(np.asarray(centers, dtype=np.float64))
+    if len(centers) < min_items:
+        return np.empty(0)
+
+    split = np.flatnonzero(np.diff(centers) / extent > min_gap_ratio)
+    return (centers[split] + centers[split + 1]) / 2.0
+
+
+def assign_columns(centers, boundaries: np.ndarray) -> np.ndarray:
+    """중심좌표가 속한 단 번호 (경계와 같으면 오른쪽 단)"""
+    return np.searchsorted(boundaries, np.asarray(centers, dtype=np.float64), side="right")
+
+
+# ==============================
+# 2. XY-cut
+# ==============================
+
+def _projection_split(starts: np.ndarray, ends: np.ndarray, min_gap: float):
+    """
+    한 축으로 투영했을 때 min_gap보다 넓은 공백으로 구간을 나눈다.
+    반환: (구간별 로컬 index 배열 리스트, 공백 구간 [(시작, 끝), ...])
+    """
+    order = np.argsort(starts, kind="stable")
+    s, e = starts[order], ends[order]
+    reach = np.maximum.accumulate(e)
+    cut = np.flatnonzero(s[1:] - reach[:-1] > min_gap)
+    gaps = list(zip(reach[cut], s[cut + 1]))
+    return np.split(order, cut + 1), gaps
+
+
+def _overlaps(a: List[Tuple[float, float]], b: List[Tuple[float, float]]) -> bool:
+    return any(a1 < b2 and b1 < a2 for a1, a2 in a for b1, b2 in b)
+
+
+def _is_aligned_row(boxes: np.ndarray, segments: List[np.ndarray]) -> bool:
+    """셀 3개 이상이 같은 높이에서 시작하는 띠 (표의 한 행 후보)"""
+    if len(segments) < 3:
+        return False
+    tops = np.array([boxes[seg, 1].min() for seg in segments])
+    height = np.median(boxes[:, 3] - boxes[:, 1])
+    return float(tops.max() - tops.min()) <= height * 0.15
+
+
+def _within(x1: float, x2: float, gaps: List[Tuple[float, float]]) -> bool:
+    """
+    [x1, x2]가 어떤 단의 시작선(세로 공백의 오른쪽 끝)도 넘지 않으면 True
+    공백의 왼쪽 끝은 그 띠에 있던 줄 길이로 정해지므로, 더 긴 줄이 공백으로 삐져나와도 같은 단으로 본다
+    """
+    return not any(x1 < g2 < x2 for _, g2 in gaps)
+
+
+def _continues_columns(lefts: np.ndarray, neighbor_lefts: np.ndarray, tol: float) -> bool:
+    """이웃 띠의 조각 왼쪽 끝이 모두 표 후보 띠의 조각 왼쪽 끝 중 하나와 맞으면 True (단이 이어짐)"""
+    if len(neighbor_lefts) < 2:
+        return False
+    return bool(np.all(np.abs(neighbor_lefts[:, None] - lefts[None, :]).min(axis=1) <= tol))
+
+
+def _table_bands(boxes: np.ndarray, info) -> List[bool]:
+    """
+    높이가 맞는 행이 2개 이상 연속된 구간을 표로 본다.
+    단만 있는 레이아웃도 단끼리 줄 높이가 우연히 맞으면 같은 모양이 되므로,
+    구간 바로 위/아래 띠(행이 안 맞는 띠)가 같은 왼쪽 끝에서 시작하는 조각으로만 이뤄져 있으면
+    표가 아니라 단이 이어지는 것으로 본다. (예: 2단 + 사이드바에서 사이드바가 먼저 끝나는 경우)
+    """
+    tol = float(np.median(boxes[:, 3] - boxes[:, 1]))
+    table = [False] * len(info)
+    i = 0
+    while i < len(info):
+        if not info[i][1]:
+            i += 1
+            continue
+        j = i
+        while j + 1 < len(info) and info[j + 1][1]:
+            j += 1
+        if j > i:
+            lefts = np.concatenate([info[k][2] for k in range(i, j + 1)])
+            neighbors = [info[k][2] for k in (i - 1, j + 1) if 0 <= k < len(info)]
+            if not any(_continues_columns(lefts, n, tol) for n in neighbors):
+                table[i:j + 1] = [True] * (j + 1 - i)
+        i = j + 1
+    return table
+
+
+def _merge_column_bands(boxes: np.ndarray, bands: List[np.ndarray], min_gap_x: float) -> List[np.ndarray]:
+    """
+    가로로 자른 띠(band)들 중 단 구조가 이어지는 띠는 다시 합친다.
+    두 단의 줄 간격이 우연히 맞아 띠가 줄마다 잘려도 단 단위로 읽게 하기 위함.
+    - 세로 공백이 이전 띠와 겹치거나, 한 단 안에만 들어가는 띠(단의 첫/마지막 줄)는 합침
+    - 높이가 맞는 행이 2개 이상 연속되면 표로 보고 합치지 않는다 (행 단위로 읽음, _table_bands)
+    """
+    info = []
+    for band in bands:
+        sub = boxes[band]
+        segments, gaps = _projection_split(sub[:, 0], sub[:, 2], min_gap_x)
+        lefts = np.array([sub[seg, 0].min() for seg in segments])
+        info.append((gaps, _is_aligned_row(sub, segments), lefts))
+
+    table = _table_bands(boxes, info)
+
+    groups: List[np.ndarray] = []
+    prev = None  # 현재 그룹의 세로 공백
+    for band, (gaps, _, _), is_table in zip(bands, info, table):
+        if is_table:
+            groups.append(band)
+            prev = None
+            continue
+
+        x1, x2 = boxes[band, 0].min(), boxes[band, 2].max()
+        if prev and ((gaps and _overlaps(gaps, prev)) or (not gaps and _within(x1, x2, prev))):
+            groups[-1] = np.concatenate([groups[-1], band])
+            prev = gaps or prev
+        else:
+            groups.append(band)
+            prev = gaps or None
+    return groups
+
+
+def xy_cut(bboxes, min_gap_x: float, min_gap_y: float = 0.0) -> List[np.ndarray]:
+    """
+    bboxes: (N, 4) [x1, y1, x2, y2]
+    반환: 읽기 순서대로 나열한 leaf 영역별 index 배열 (leaf 안은 (y1, x1) 순)
+
+    - 세로 공백(min_gap_x 초과)이 있으면 단으로 나눠 왼쪽 → 오른쪽
+    - 없으면 가로 공백으로 띠를 나눠 위 → 아래 (단 구조가 이어지는 띠는 합침)
+    """
+    boxes = as_boxes(bboxes)
+    leaves: List[np.ndarray] = []
+
+    def visit(idx: np.ndarray):
+        if len(idx) <= 1:
+            if len(idx):
+                leaves.append(idx)
+            return
+
+        sub = boxes[idx]
+        cols, _ = _projection_split(sub[:, 0], sub[:, 2], min_gap_x)
+        if len(cols) > 1:
+            for col in cols:
+                visit(idx[col])
+            return
+
+        bands, _ = _projection_split(sub[:, 1], sub[:, 3], min_gap_y)
+        if len(bands) == 1:
+            leaves.append(idx[np.lexsort((sub[:, 0], sub[:, 1]))])
+            return
+
+        groups = _merge_column_bands(sub, bands, min_gap_x)
+        if len(groups) == 1:
+            groups = bands  # 합쳐도 단으로 나뉘지 않으면 띠 순서 그대로
+        for group in groups:
+            visit(idx[np.sort(group)])
+
+    visit(np.arange(len(boxes)))
+    return leaves
+
+
+def reading_order(bboxes, min_gap_x: float, min_gap_y: float = 0.0) -> np.ndarray:
+    leaves = xy_cut(bboxes, min_gap_x, min_gap_y)
+    return np.concatenate(leaves) if leaves else np.empty(0, dtype=int)
+
+
+# ==============================
+# 3. 벤치마크 (합성 레이아웃)
+# ==============================
+
+def synthetic_page(rng: np.random.Generator, n_cols: int, lines_per_col: int,
+                   title: bool = True, sidebar: bool = False, table_rows: int = 0):
+    """정답 순서가 있는 합성 페이지 → (boxes, 정답 순서 index)"""
+    width, line_h, pitch = 1600.0, 24.0, 36.0
+    boxes = []
+    y = 40.0
+
+    if title:
+        boxes.append([100, y, 1500, y + line_h * 1.8])
+        y += line_h * 1.8 + pitch
+
+    # 단을 가로지르는 표 (행 단위로 읽음)
+    for _ in range(table_rows):
+        for c in range(4):
+            boxes.append([100 + c * 350, y, 100 + c * 350 + 300, y + line_h])
+        y += pitch
+
+    body_x1, body_x2 = 60.0, width - 60.0
+    if sidebar:
+        body_x2 = width - 420.0
+
+    gutter = 80.0
+    col_w = (body_x2 - body_x1 - gutter * (n_cols - 1)) / n_cols
+    for c in range(n_cols):
+        x1 = body_x1 + c * (col_w + gutter)
+        offset = rng.uniform(0, pitch) if c else 0.0  # 단마다 시작 높이가 조금씩 다름
+        for i in range(lines_per_col):
+            ly = y + offset + i * pitch + rng.uniform(-2, 2)
+            boxes.append([x1, ly, x1 + col_w * rng.uniform(0.5, 1.0), ly + line_h])
+
+    if sidebar:
+        for i in range(lines_per_col // 2):
+            ly = y + i * pitch
+            boxes.append([width - 360, ly, width - 60, ly + line_h])
+
+    perm = rng.permutation(len(boxes))
+    return np.asarray(boxes)[perm], np.argsort(perm)
+
+
+def benchmark(pages_per_case: int = 50, seed: int = 0):
+    import time
+
+    rng = np.random.default_rng(seed)
+    cases = {
+        "1단": dict(n_cols=1, lines_per_col=30),
+        "2단": dict(n_cols=2, lines_per_col=30),
+        "3단": dict(n_cols=3, lines_per_col=30),
+        "4단": dict(n_cols=4, lines_per_col=60),
+        "2단+사이드바": dict(n_cols=2, lines_per_col=30, sidebar=True),
+        "표+2단": dict(n_cols=2, lines_per_col=20, table_rows=5),
+    }
+
+    for name, conf in cases.items():
+        exact, elapsed, n_boxes = 0, 0.0, 0
+        for _ in range(pages_per_case):
+            boxes, truth = synthetic_page(rng, **conf)
+            t = time.perf_counter()
+            order = reading_order(boxes, min_gap_x=48)
+            elapsed += time.perf_counter() - t
+            exact += bool(np.array_equal(order, truth))
+            n_boxes = len(boxes)
+        print(f"[BENCH] {name:10s} boxes={n_boxes:4d} 정확도={exact / pages_per_case:.0%} "
+              f"{elapsed / pages_per_case * 1000:.2f}ms/page")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,239 @@
+"""
+AI 서버 공용 LLM 게이트웨이
+
+- 프로바이더(OpenAI/Groq)별 클라이언트를 프로세스당 한 번만 만들고 HTTP 커넥션을 재사용
+- 모델별 동시 요청 수 제한 + 토큰 버킷(분당 요청 수) 제한
+- 429/5xx/타임아웃은 지터를 섞은 지수 백오프로 재시도 (Retry-After 우선)
+- 동기(chat) / 비동기(achat) 인터페이스 제공
+- 비동기 클라이언트는 이벤트 루프별로 만들고, 루프 종료 전에 aclose_async_clients()로 닫는다
+
+사용 예:
+    from llm_gateway import chat
+    resp = chat("gpt-4o-mini", messages=[...], temperature=0.1)
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from typing import Dict, Tuple
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+
+PROVIDERS = {
+    "openai": {"base_url": None, "api_key_env": "OPENAI_API_KEY"},
+    "groq": {"base_url": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY"},
+}
+
+# 모델별 기본 한도 (환경변수 LLM_<MODEL>_CONCURRENCY / LLM_<MODEL>_RPM 으로 덮어쓰기)
+# 예: gpt-4o-mini → LLM_GPT_4O_MINI_RPM
+DEFAULT_MODEL_LIMITS = {
+    "gpt-4o": {"concurrency": 8, "rpm": 500},
+    "gpt-4o-mini": {"concurrency": 16, "rpm": 1000},
+    "openai/gpt-oss-20b": {"concurrency": 4, "rpm": 30},
+}
+FALLBACK_LIMITS = {"concurrency": 4, "rpm": 60}
+
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 50))
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 120))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """분당 rpm개 요청을 허용하는 토큰 버킷 (스레드 안전)"""
+
+    def __init__(self, rpm: int):
+        self.capacity = max(rpm, 1)
+        self.rate = self.capacity / 60.0
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self) -> float:
+        """토큰을 하나 가져가면 0, 부족하면 기다려야 할 초를 반환"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class ModelLimiter:
+    """모델 하나에 대한 동시 요청 수 + 요청 속도 제한 (sync/async 공용)"""
+
+    def __init__(self, concurrency: int, rpm: int):
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rpm)
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        self.bucket.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+
+    async def __aenter__(self):
+        # 이벤트 루프를 막지 않도록 세마포어는 폴링으로 획득
+        while not self.semaphore.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        try:
+            await self.bucket.acquire_async()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+_lock = threading.Lock()
+_limiters: Dict[str, ModelLimiter] = {}
+_sync_clients: Dict[Tuple[str, int], OpenAI] = {}
+# 루프 객체를 약한 참조로 들고 있어 루프가 사라지면 항목도 같이 사라진다 (id 재사용 문제 없음)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncOpenAI]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _env_name(model: str) -> str:
+    return re.sub(r"[^A-Z0-9]+", "_", model.upper()).strip("_")
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    with _lock:
+        if model not in _limiters:
+            limits = DEFAULT_MODEL_LIMITS.get(model, FALLBACK_LIMITS)
+            name = _env_name(model)
+            _limiters[model] = ModelLimiter(
+                concurrency=int(os.getenv(f"LLM_{name}_CONCURRENCY", limits["concurrency"])),
+                rpm=int(os.getenv(f"LLM_{name}_RPM", limits["rpm"])),
+            )
+        return _limiters[model]
+
+
+def _client_kwargs(provider: str) -> Dict:
+    conf = PROVIDERS[provider]
+    return {
+        "api_key": os.getenv(conf["api_key_env"]),
+        "base_url": conf["base_url"],
+        "timeout": REQUEST_TIMEOUT,
+        "max_retries": 0,  # 재시도는 게이트웨이에서 직접 처리
+    }
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+
+
+def get_client(provider: str = "openai") -> OpenAI:
+    # Celery prefork 워커가 부모 프로세스의 커넥션을 물려받지 않도록 pid별로 생성
+    key = (provider, os.getpid())
+    with _lock:
+        if key not in _sync_clients:
+            _sync_clients[key] = OpenAI(
+                http_client=httpx.Client(limits=_limits(), timeout=REQUEST_TIMEOUT),
+                **_client_kwargs(provider),
+            )
+        return _sync_clients[key]
+
+
+def get_async_client(provider: str = "openai") -> AsyncOpenAI:
+    # httpx.AsyncClient 커넥션은 이벤트 루프에 묶이므로 루프별로 생성
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        if provider not in clients:
+            clients[provider] = AsyncOpenAI(
+                http_client=httpx.AsyncClient(limits=_limits(), timeout=REQUEST_TIMEOUT),
+                **_client_kwargs(provider),
+            )
+        return clients[provider]
+
+
+async def aclose_async_clients() -> None:
+    """현재 이벤트 루프의 비동기 클라이언트를 닫고 제거 (서버 종료 시 호출)"""
+    with _lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        try:
+            if retry_after is not None:
+                return float(retry_after) + random.uniform(0, 1)
+        except ValueError:
+            pass
+    # full jitter
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def chat(model: str, messages, provider: str = "openai", **kwargs):
+    """동기 chat.completions.create (Celery 태스크/스레드풀용)"""
+    limiter = get_limiter(model)
+    client = get_client(provider)
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with limiter:
+                return client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"[LLM] {model} {type(e).__name__}, {delay:.1f}s 후 재시도 ({attempt + 1}/{MAX_RETRIES})")
+            time.sleep(delay)
+
+
+async def achat(model: str, messages, provider: str = "openai", **kwargs):
+    """비동기 chat.completions.create (FastAPI 핸들러용)"""
+    limiter = get_limiter(model)
+    client = get_async_client(provider)
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with limiter:
+                return await client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"[LLM] {model} {type(e).__name__}, {delay:.1f}s 후 재시도 ({attempt + 1}/{MAX_RETRIES})")
+            await asyncio.sleep(delay)
\ No newline at end of file
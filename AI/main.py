@@ -4,10 +4,31 @@ from ai_lecture_ocr.router import router as lecture_ocr_router
 from ai_exam_ocr.router import router as exam_ocr_router
 from fastapi.staticfiles import StaticFiles
 import os
+import executors
+import llm_gateway
+import ocr_pool
 
 app = FastAPI(title="AI OCR Server")
 
 
+@app.on_event("startup")
+def warmup_ocr_pool():
+    # 첫 판서 요청이 onnxruntime 세션 생성/첫 추론 비용을 치르지 않도록 미리 로드
+    if os.getenv("RAPIDOCR_WARMUP", "1") == "1":
+        ocr_pool.warmup()
+
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    executors.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    # 루프가 닫히기 전에 httpx 커넥션 정리
+    await llm_gateway.aclose_async_clients()
+
+
 os.makedirs("exam_temp", exist_ok=True)
 app.mount("/exam_images", StaticFiles(directory="exam_temp"), name="exam_images")
 
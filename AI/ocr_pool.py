@@ -0,0 +1,191 @@
+"""
+AI 서버 공용 RapidOCR 세션 풀
+
+- RapidOCR(onnxruntime 세션 3개: det/cls/rec)를 여러 개 만들어 두고 요청마다 하나씩 빌려 쓴다.
+  전역 인스턴스 하나를 모든 요청이 공유하면 ONNX 세션 하나에 요청이 몰리고,
+  세션마다 intra-op 스레드를 코어 수만큼 잡으면 동시 요청끼리 스레드를 뺏는다.
+- 세션당 intra-op 스레드 수를 고정하고 (RAPIDOCR_INTRA_THREADS),
+  풀 크기(RAPIDOCR_POOL_SIZE)는 기본값으로 코어 수 / 세션 스레드 수를 사용한다.
+- 텍스트 줄 crop 인식은 rec 모델에 RAPIDOCR_REC_BATCH개씩 묶어 한 번에 넣는다.
+- 서버 시작 시 warmup()으로 세션 생성 + 첫 추론 비용을 미리 치른다.
+
+사용 예:
+    from ocr_pool import get_pool, recognize_crops
+    with get_pool().session() as ocr:
+        result, _ = ocr(img)
+    texts = recognize_crops([crop1, crop2])   # [(text, score), ...]
+
+벤치마크: python ocr_pool.py [이미지 ...]   (이미지가 없으면 합성 판서 이미지 사용)
+"""
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INTRA_THREADS = int(os.getenv("RAPIDOCR_INTRA_THREADS", 2))
+POOL_SIZE = int(os.getenv("RAPIDOCR_POOL_SIZE", max(1, (os.cpu_count() or 2) // INTRA_THREADS)))
+REC_BATCH = int(os.getenv("RAPIDOCR_REC_BATCH", 16))
+
+
+class OCRSessionPool:
+    """RapidOCR 인스턴스 풀 (필요할 때 size개까지 만들고, 넘치는 요청은 반납을 기다린다)"""
+
+    def __init__(self, size: int = POOL_SIZE, intra_threads: int = INTRA_THREADS, rec_batch: int = REC_BATCH):
+        self.size = max(size, 1)
+        self.intra_threads = intra_threads
+        self.rec_batch = rec_batch
+        # 최근에 반납된 세션부터 재사용 (메모리/캐시가 따뜻한 세션)
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self):
+        from rapidocr_onnxruntime import RapidOCR
+
+        return RapidOCR(
+            det_use_cuda=False,
+            cls_use_cuda=False,
+            rec_use_cuda=False,
+            intra_op_num_threads=self.intra_threads,
+            inter_op_num_threads=1,
+            rec_batch_num=self.rec_batch,
+        )
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._create()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    @contextmanager
+    def session(self):
+        engine = self._acquire()
+        try:
+            yield engine
+        finally:
+            self._idle.put(engine)
+
+    def warmup(self):
+        """세션을 size개까지 모두 만들고 각 세션에 더미 이미지를 한 번씩 통과시킨다"""
+        img = synthetic_board(np.random.default_rng(0), lines=3)
+        engines = [self._acquire() for _ in range(self.size)]
+        try:
+            for engine in engines:
+                engine(img)
+        finally:
+            for engine in engines:
+                self._idle.put(engine)
+        print(f"[OCR_POOL] warm-up 완료: 세션 {self.size}개, 세션당 intra-op {self.intra_threads}스레드")
+
+
+_pools: Dict[int, OCRSessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool() -> OCRSessionPool:
+    # Celery prefork 워커가 부모 프로세스의 onnxruntime 세션을 물려받지 않도록 pid별로 생성
+    pid = os.getpid()
+    with _pools_lock:
+        if pid not in _pools:
+            _pools[pid] = OCRSessionPool()
+        return _pools[pid]
+
+
+def warmup():
+    get_pool().warmup()
+
+
+def recognize_crops(crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+    """
+    텍스트 줄 crop 여러 장을 rec 모델로만 인식 (검출/방향 분류 생략)
+    crop을 가로세로 비율 순으로 정렬해 REC_BATCH개씩 한 번에 추론한다. 입력 순서대로 반환.
+    """
+    crops = list(crops)
+    if not crops:
+        return []
+
+    with get_pool().session() as ocr:
+        rec_res, _ = ocr.text_rec(crops)
+    return [(str(text), float(score)) for text, score in rec_res]
+
+
+# ==============================
+# 벤치마크 (boards/sec @ 동시 요청 1/4/8)
+# ==============================
+
+def synthetic_board(rng: np.random.Generator, lines: int = 12, width: int = 1600, height: int = 1200):
+    """흰 배경에 영문/숫자 줄을 찍은 합성 판서 이미지"""
+    import cv2
+
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    words = ["gradient", "descent", "loss", "matrix", "vector", "O(n log n)", "f(x)=ax+b", "softmax", "2025"]
+    pitch = (height - 80) // max(lines, 1)
+    for i in range(lines):
+        text = " ".join(rng.choice(words, size=int(rng.integers(2, 6))))
+        cv2.putText(img, text, (60, 80 + i * pitch), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (30, 30, 30), 3)
+    return img
+
+
+def benchmark(images=None, boards: int = 16, concurrencies=(1, 4, 8)):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    import cv2
+
+    if images:
+        imgs = [cv2.imread(p) for p in images]
+        imgs = [img for img in imgs if img is not None]
+    else:
+        rng = np.random.default_rng(0)
+        imgs = [synthetic_board(rng) for _ in range(4)]
+
+    # 기존 방식: 전역 RapidOCR 하나를 모든 요청이 동시에 호출 (intra-op 스레드는 onnxruntime 기본값)
+    shared = OCRSessionPool(size=1, intra_threads=-1)
+    shared.warmup()
+    with shared.session() as engine:
+        pass
+
+    pool = OCRSessionPool()
+    pool.warmup()
+
+    def run_pooled(img):
+        with pool.session() as ocr:
+            ocr(img)
+
+    cases = {
+        "전역 세션 공유": engine,
+        f"풀 {pool.size}x{pool.intra_threads}스레드": run_pooled,
+    }
+    for name, run in cases.items():
+        for concurrency in concurrencies:
+            with ThreadPoolExecutor(max_workers=concurrency) as ex:
+                t = time.perf_counter()
+                list(ex.map(lambda i: run(imgs[i % len(imgs)]), range(boards)))
+                elapsed = time.perf_counter() - t
+            print(f"[BENCH] {name:16s} 동시 {concurrency}: {boards / elapsed:.2f} boards/sec "
+                  f"({elapsed / boards * 1000:.0f}ms/board)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    benchmark(sys.argv[1:] or None)
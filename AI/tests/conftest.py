@@ -0,0 +1,8 @@
+import os
+import sys
+
+# AI 서버 모듈(layout_order, llm_gateway 등)은 AI/ 기준 최상위 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 모듈 import 시 키 존재만 확인한다 (테스트는 외부 API를 호출하지 않음)
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,56 @@
+"""
+시험지 단 분할 / qnum 구간 배정 회귀 테스트
+
+fixtures/exam_layout_pages.json
+- boxes  : 검출 결과 (qnum 박스는 question_number 포함)
+- legacy : numpy 벡터화 이전 구현(최대 간격 1곳으로 1단/2단만 판단)의 출력
+- expected : 동작이 의도적으로 바뀐 페이지(3단 이상)의 새 기대 출력
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from ai_exam_ocr.pipeline import detection_layout
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "exam_layout_pages.json")
+CLASSES = ["text", "choice", "chart", "table", "code"]
+
+with open(FIXTURES, encoding="utf-8") as f:
+    PAGES = json.load(f)["pages"]
+
+
+def structure(page, monkeypatch):
+    boxes = [dict(b) for b in page["boxes"]]
+    qnums = {tuple(b["bbox"]): b["question_number"] for b in boxes if b["class_name"] == "qnum"}
+    # qnum OCR(GPT Vision) 대신 fixture의 문항 번호 사용
+    monkeypatch.setattr(
+        detection_layout, "read_qnums",
+        lambda img, bboxes: [(qnums[tuple(bb)], str(qnums[tuple(bb)])) for bb in bboxes],
+    )
+    img = np.broadcast_to(np.uint8(255), (page["height"], page["width"], 3))
+
+    return [
+        {"question_number": q["question_number"], "qnum_bbox": list(q["qnum_bbox"]),
+         **{c: [b["id"] for b in q[c]] for c in CLASSES}}
+        for q in detection_layout.build_structured_questions(img, boxes)
+    ]
+
+
+@pytest.mark.parametrize("page", [p for p in PAGES if "expected" not in p], ids=lambda p: p["name"])
+def test_matches_legacy_output(page, monkeypatch):
+    assert structure(page, monkeypatch) == page["legacy"]
+
+
+def test_three_columns_split_into_every_column(monkeypatch):
+    page = next(p for p in PAGES if p["name"] == "three-columns")
+    qnums = [b for b in page["boxes"] if b["class_name"] == "qnum"]
+
+    # 1단/2단 사이, 2단/3단 사이 모두 경계 (이전 구현은 더 넓은 간격 한 곳만)
+    boundaries = detection_layout.detect_columns(qnums, page["width"])
+    assert boundaries.tolist() == [300.0, 800.0]
+
+    result = structure(page, monkeypatch)
+    assert result == page["expected"]
+    assert result != page["legacy"]
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Page
+from .serializers import PageSerializer
+
+# L1: 프로세스 로컬 캐시 (짧은 TTL로 다른 워커와의 불일치 최소화)
+# L2: Redis 공유 캐시 (OCR 콜백/요약/TTS 시점에 정확히 무효화)
+local_cache = caches["default"]
+shared_cache = caches["redis"]
+
+STATS_PREFIX = "page_cache:stats"
+STATS_FIELDS = ("local_hit", "shared_hit", "miss")
+PAGE_CACHE_ENDPOINTS = ("page-detail",)
+
+
+def page_cache_key(doc_id: int, page_number: int) -> str:
+    return f"page_cache:doc:{doc_id}:page:{page_number}"
+
+
+def _shared_get(key):
+    try:
+        return shared_cache.get(key)
+    except Exception as e:
+        print(f"[page_cache] redis get 실패: {key} | {e}")
+        return None
+
+
+def _shared_set(key, data):
+    try:
+        shared_cache.set(key, data, settings.PAGE_CACHE_TIMEOUT)
+    except Exception as e:
+        print(f"[page_cache] redis set 실패: {key} | {e}")
+
+
+def record_stat(endpoint: str, field: str):
+    key = f"{STATS_PREFIX}:{endpoint}:{field}"
+    try:
+        shared_cache.add(key, 0, timeout=None)
+        shared_cache.incr(key)
+    except Exception as e:
+        print(f"[page_cache] 통계 기록 실패: {key} | {e}")
+
+
+def get_page_data(doc, page_number: int, endpoint: str) -> dict:
+    """
+    (doc, page) 단위 PageSerializer 결과 조회
+    L1 → L2 → DB 순서로 조회하고, 하위 계층에서 찾으면 상위 계층을 채운다.
+    """
+    key = page_cache_key(doc.id, page_number)
+
+    data = local_cache.get(key)
+    if data is not None:
+        record_stat(endpoint, "local_hit")
+        return data
+
+    data = _shared_get(key)
+    if data is not None:
+        local_cache.set(key, data, settings.PAGE_CACHE_LOCAL_TIMEOUT)
+        record_stat(endpoint, "shared_hit")
+        return data
+
+    page = doc.pages.get(page_number=page_number)
+    data = dict(PageSerializer(page).data)
+
+    local_cache.set(key, data, settings.PAGE_CACHE_LOCAL_TIMEOUT)
+    _shared_set(key, data)
+    record_stat(endpoint, "miss")
+    return data
+
+
+def _delete_page(doc_id: int, page_number: int):
+    key = page_cache_key(doc_id, page_number)
+    local_cache.delete(key)
+    try:
+        shared_cache.delete(key)
+    except Exception as e:
+        print(f"[page_cache] redis delete 실패: {key} | {e}")
+
+
+def _delete_doc(doc_id: int):
+    page_numbers = Page.objects.filter(doc_id=doc_id).values_list("page_number", flat=True)
+    keys = [page_cache_key(doc_id, n) for n in page_numbers]
+    if not keys:
+        return
+
+    local_cache.delete_many(keys)
+    try:
+        shared_cache.delete_many(keys)
+    except Exception as e:
+        print(f"[page_cache] redis delete 실패: doc={doc_id} | {e}")
+
+
+# 무효화는 DB 쓰기가 커밋된 뒤에 실행한다.
+# 커밋 전에 지우면 동시 요청(get_page_data)이 아직 바뀌기 전 행으로 캐시를 다시 채워
+# PAGE_CACHE_TIMEOUT 동안 오래된 값이 나간다. (트랜잭션 밖이면 on_commit은 즉시 실행)
+def invalidate_page(doc_id: int, page_number: int):
+    transaction.on_commit(lambda: _delete_page(doc_id, page_number))
+
+
+def invalidate_doc(doc_id: int):
+    """페이지 수(totalPage)가 바뀌면 교안 전체 페이지 캐시 무효화"""
+    transaction.on_commit(lambda: _delete_doc(doc_id))
+
+
+def get_stats() -> dict:
+    """엔드포인트별 캐시 적중률"""
+    stats = {}
+    for endpoint in PAGE_CACHE_ENDPOINTS:
+        keys = [f"{STATS_PREFIX}:{endpoint}:{field}" for field in STATS_FIELDS]
+        try:
+            values = shared_cache.get_many(keys)
+        except Exception as e:
+            print(f"[page_cache] 통계 조회 실패: {endpoint} | {e}")
+            values = {}
+
+        counts = {field: int(values.get(key) or 0) for field, key in zip(STATS_FIELDS, keys)}
+        total = sum(counts.values())
+        hits = counts["local_hit"] + counts["shared_hit"]
+
+        stats[endpoint] = {
+            **counts,
+            "total": total,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+    return stats
@@ -5,6 +5,7 @@ from jwt import decode as jwt_decode
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from asgiref.sync import sync_to_async
+from .precompute import set_current_page
 
 User = get_user_model()
 
@@ -69,6 +70,12 @@ class DocSync(AsyncJsonWebsocketConsumer):
 
             if self.user.role != "assistant":
                 return
+
+            # 사전 생성 우선순위용 현재 페이지 기록
+            try:
+                await sync_to_async(set_current_page)(self.doc_id, page)
+            except Exception as e:
+                print(f"[DocSync] 현재 페이지 기록 실패: doc={self.doc_id} | {e}")
             
             await self.channel_layer.group_send(
                 self.group_name,
@@ -0,0 +1,309 @@
+import json
+import os
+import uuid
+
+import redis
+from django.conf import settings
+from dotenv import load_dotenv
+
+load_dotenv()
+redis_client = redis.Redis.from_url(os.getenv("EXAM_REDIS_URL"))
+
+# 시험 세션 Redis 구조 (모든 키는 종료 시각 + 유예 시간에 EXPIREAT)
+# - exam:{user}:session      : hash  endTime / totalPages / expireAt / complete
+# - exam:{user}:order        : zset  문항 키 → 읽는 순서 (페이지 * 1000 + 페이지 내 index)
+# - exam:{user}:q:{문항 키}  : hash  meta / itemCount / item:{i} / tts:{i}
+# - exam:{user}:jobs         : hash  페이지 → queued / done / failed (비동기 OCR)
+# - exam:{user}:tts_worker   : string  TTS 사전 생성 워커 토큰 (짧은 TTL, 실행 중인 워커가 갱신)
+# 문항 키는 문제 번호 (번호가 없거나 겹치면 페이지/위치를 덧붙인다)
+# 클라이언트에는 문항마다 questionKey로 내려주고, TTS 요청은 이 키로 조회한다
+ORDER_STRIDE = 1000
+
+_hset_if_exists = redis_client.register_script("""
+if redis.call('HEXISTS', KEYS[1], 'itemCount') == 1 then
+    return redis.call('HSET', KEYS[1], ARGV[1], ARGV[2]) + 1
+end
+return 0
+""")
+
+
+# 워커 토큰이 그대로일 때만 TTL 연장 / 삭제 (만료 후 새로 뜬 워커의 표시는 건드리지 않음)
+_refresh_if_owner = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+""")
+
+_delete_if_owner = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+
+def _key(user_id, name: str) -> str:
+    return f"exam:{user_id}:{name}"
+
+
+def question_key(user_id, qkey) -> str:
+    return _key(user_id, f"q:{qkey}")
+
+
+def session_expire_at(end_time) -> int:
+    return int(end_time.timestamp()) + settings.EXAM_SESSION_GRACE_SECONDS
+
+
+def _decode(raw: dict) -> dict:
+    return {k.decode(): v.decode() for k, v in raw.items()}
+
+
+def clear_session(user_id):
+    """세션/문항/작업 키 전체 삭제"""
+    qkeys = redis_client.zrange(_key(user_id, "order"), 0, -1)
+    redis_client.delete(
+        _key(user_id, "session"),
+        _key(user_id, "order"),
+        _key(user_id, "jobs"),
+        _key(user_id, "tts_worker"),
+        *[question_key(user_id, k.decode()) for k in qkeys],
+    )
+
+
+def start_session(user_id, end_time, total_pages: int) -> int:
+    """이전 세션을 지우고 새 세션 생성. 반환: 만료 시각(epoch)"""
+    clear_session(user_id)
+
+    expire_at = session_expire_at(end_time)
+    pipe = redis_client.pipeline()
+    pipe.hset(_key(user_id, "session"), mapping={
+        "endTime": end_time.isoformat(),
+        "totalPages": total_pages,
+        "expireAt": expire_at,
+        "complete": 0,
+    })
+    pipe.expireat(_key(user_id, "session"), expire_at)
+    pipe.execute()
+    return expire_at
+
+
+def _parse_session(raw: dict) -> dict:
+    session = _decode(raw)
+    session["totalPages"] = int(session.get("totalPages", 0))
+    session["expireAt"] = int(session["expireAt"])
+    session["complete"] = session.get("complete") == "1"
+    return session
+
+
+def get_session(user_id) -> dict | None:
+    raw = redis_client.hgetall(_key(user_id, "session"))
+    return _parse_session(raw) if raw else None
+
+
+def mark_complete(user_id):
+    redis_client.hset(_key(user_id, "session"), "complete", 1)
+
+
+def set_job_states(user_id, states: dict, expire_at: int):
+    pipe = redis_client.pipeline()
+    pipe.hset(_key(user_id, "jobs"), mapping=states)
+    pipe.expireat(_key(user_id, "jobs"), expire_at)
+    pipe.execute()
+
+
+def set_job_state(user_id, page: int, state: str, expire_at: int) -> dict:
+    """페이지 작업 상태 갱신 후 전체 페이지 상태 반환"""
+    pipe = redis_client.pipeline()
+    pipe.hset(_key(user_id, "jobs"), page, state)
+    pipe.expireat(_key(user_id, "jobs"), expire_at)
+    pipe.hgetall(_key(user_id, "jobs"))
+    return _decode(pipe.execute()[-1])
+
+
+def save_questions(user_id, page: int, questions, expire_at: int, start_index: int = 0):
+    """
+    한 페이지의 문항들을 문항별 hash로 저장 (같은 문항이 다시 오면 덮어쓴다)
+    TTS가 이미 붙어 있는 item은 tts:{i} 필드로 분리해 저장
+    반환: 문항별 저장 키 (questions 순서)
+    """
+    if not questions:
+        return []
+
+    order_key = _key(user_id, "order")
+    scores = [page * ORDER_STRIDE + start_index + i for i in range(len(questions))]
+    candidates = [
+        str(q.get("questionNumber")) if q.get("questionNumber") is not None else f"p{page}-{score % ORDER_STRIDE}"
+        for q, score in zip(questions, scores)
+    ]
+
+    # 같은 번호가 다른 위치에 이미 있으면 위치를 덧붙여 충돌 방지
+    pipe = redis_client.pipeline()
+    for qkey in candidates:
+        pipe.zscore(order_key, qkey)
+    existing = pipe.execute()
+
+    qkeys = []
+    pipe = redis_client.pipeline()
+    for q, score, qkey, taken in zip(questions, scores, candidates, existing):
+        if taken is not None and int(taken) != score:
+            qkey = f"{qkey}@p{page}-{score % ORDER_STRIDE}"
+        qkeys.append(qkey)
+
+        items = q.get("items", [])
+        fields = {
+            "meta": json.dumps({k: v for k, v in q.items() if k != "items"}),
+            "itemCount": len(items),
+        }
+        for i, item in enumerate(items):
+            item = dict(item)
+            tts = item.pop("tts", None)
+            fields[f"item:{i}"] = json.dumps(item)
+            if tts:
+                fields[f"tts:{i}"] = json.dumps(tts)
+
+        pipe.hset(question_key(user_id, qkey), mapping=fields)
+        pipe.expireat(question_key(user_id, qkey), expire_at)
+        pipe.zadd(order_key, {qkey: score})
+    pipe.expireat(order_key, expire_at)
+    pipe.execute()
+    return qkeys
+
+
+def _build_question(qkey: str, raw: dict) -> dict:
+    fields = _decode(raw)
+    question = json.loads(fields["meta"])
+    question["questionKey"] = qkey
+    items = []
+    for i in range(int(fields.get("itemCount", 0))):
+        item = json.loads(fields.get(f"item:{i}", "{}"))
+        if f"tts:{i}" in fields:
+            item["tts"] = json.loads(fields[f"tts:{i}"])
+        items.append(item)
+    question["items"] = items
+    return question
+
+
+def load_exam(user_id):
+    """
+    세션/작업 상태/문항 전체를 파이프라인 2번으로 조회
+    반환: (session | None, questions, jobs)
+    """
+    pipe = redis_client.pipeline()
+    pipe.hgetall(_key(user_id, "session"))
+    pipe.zrange(_key(user_id, "order"), 0, -1)
+    pipe.hgetall(_key(user_id, "jobs"))
+    session_raw, qkeys, jobs_raw = pipe.execute()
+
+    if not session_raw:
+        return None, [], {}
+
+    qkeys = [k.decode() for k in qkeys]
+    pipe = redis_client.pipeline()
+    for qkey in qkeys:
+        pipe.hgetall(question_key(user_id, qkey))
+    questions = [_build_question(qkey, raw) for qkey, raw in zip(qkeys, pipe.execute()) if raw]
+
+    return _parse_session(session_raw), questions, _decode(jobs_raw)
+
+
+def get_item(user_id, question_number, item_index: int):
+    """
+    문항 1개 item 조회 (문항 hash 필드만 읽음)
+    반환: (item | None, itemCount) — 문항이 없으면 None
+    """
+    item_json, tts_json, count = redis_client.hmget(
+        question_key(user_id, question_number),
+        f"item:{item_index}", f"tts:{item_index}", "itemCount",
+    )
+    if count is None:
+        return None
+
+    item = json.loads(item_json) if item_json else None
+    if item is not None and tts_json:
+        item["tts"] = json.loads(tts_json)
+    return item, int(count)
+
+
+def set_item_tts(user_id, question_number, item_index: int, tts) -> bool:
+    """item TTS를 해당 필드에만 원자적으로 기록 (문항이 이미 만료/삭제됐으면 False)"""
+    # 만료된 키를 TTL 없이 다시 만들지 않도록 존재 확인 + HSET을 한 번에 실행
+    return bool(_hset_if_exists(
+        keys=[question_key(user_id, question_number)],
+        args=[f"tts:{item_index}", json.dumps(tts)],
+    ))
+
+
+def item_tts_flight_key(user_id, question_number, item_index) -> str:
+    # 재생 요청(ExamTTSView)과 사전 생성이 같은 item을 동시에 합성하지 않도록 공유하는 키
+    return f"exam:{user_id}:q:{question_number}:item:{item_index}:tts"
+
+
+def mark_tts_failed(user_id, question_number, item_index: int):
+    """사전 생성 실패 item은 다시 대기열에 넣지 않는다 (재생 시 ExamTTSView에서 생성)"""
+    _hset_if_exists(
+        keys=[question_key(user_id, question_number)],
+        args=[f"ttsFailed:{item_index}", 1],
+    )
+
+
+def pending_tts_items(user_id, gender: str):
+    """
+    아직 gender 음성이 없는 item을 읽는 순서대로 반환
+    반환: [(문항 키, item index, displayText), ...]
+    """
+    qkeys = [k.decode() for k in redis_client.zrange(_key(user_id, "order"), 0, -1)]
+
+    pipe = redis_client.pipeline()
+    for qkey in qkeys:
+        pipe.hgetall(question_key(user_id, qkey))
+
+    pending = []
+    for qkey, raw in zip(qkeys, pipe.execute()):
+        fields = _decode(raw)
+        for i in range(int(fields.get("itemCount", 0))):
+            if f"ttsFailed:{i}" in fields:
+                continue
+            tts = json.loads(fields.get(f"tts:{i}", "{}"))
+            text = json.loads(fields.get(f"item:{i}", "{}")).get("displayText")
+            if text and not tts.get(gender):
+                pending.append((qkey, i, text))
+    return pending
+
+
+def ensure_tts_worker(user_id):
+    """
+    사용자당 TTS 사전 생성 워커를 하나만 띄운다
+    표시는 EXAM_TTS_WORKER_LEASE초 뒤 만료되므로 워커가 죽어도 다음 저장 때 다시 기동된다
+    """
+    from .tasks import pregenerate_exam_tts
+
+    if not get_session(user_id):
+        return
+
+    worker_key = _key(user_id, "tts_worker")
+    token = uuid.uuid4().hex
+    if not redis_client.set(worker_key, token, nx=True, ex=settings.EXAM_TTS_WORKER_LEASE):
+        return
+
+    try:
+        pregenerate_exam_tts.delay(user_id, token)
+    except Exception:
+        _delete_if_owner(keys=[worker_key], args=[token])
+        raise
+
+
+def heartbeat_tts_worker(user_id, token: str) -> bool:
+    """실행 중인 워커의 표시 TTL 연장 (다른 워커로 넘어갔으면 False)"""
+    return bool(_refresh_if_owner(
+        keys=[_key(user_id, "tts_worker")],
+        args=[token, settings.EXAM_TTS_WORKER_LEASE],
+    ))
+
+
+def release_tts_worker(user_id, token: str, gender: str):
+    _delete_if_owner(keys=[_key(user_id, "tts_worker")], args=[token])
+
+    # 워커가 끝나는 사이에 새 문항이 저장됐으면 다시 기동
+    if pending_tts_items(user_id, gender):
+        ensure_tts_worker(user_id)
@@ -0,0 +1,54 @@
+import hashlib
+import re
+from typing import Dict, List, Tuple
+
+import fitz
+
+# 래스터 해시용 저해상도 렌더링 (같은 슬라이드면 같은 픽셀)
+FINGERPRINT_DPI = 50
+
+# 페이지 재사용 시 복사할 필드 (OCR 결과 + 요약/TTS 산출물)
+REUSE_FIELDS = ("image", "ocr", "page_tts", "summary", "summary_tts")
+
+
+def page_fingerprints(pdf_bytes: bytes) -> List[Tuple[str, str]]:
+    """
+    페이지별 (raster_hash, text_hash)
+    - raster_hash : 렌더링된 픽셀 sha256
+    - text_hash   : 텍스트 레이어(공백 정규화) sha256
+    """
+    pdf = fitz.open(stream=pdf_bytes, filetype="pdf")
+    fingerprints = []
+
+    for page in pdf:
+        pix = page.get_pixmap(dpi=FINGERPRINT_DPI)
+        raster_hash = hashlib.sha256(pix.samples).hexdigest()
+
+        text = re.sub(r"\s+", " ", page.get_text("text")).strip()
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+        fingerprints.append((raster_hash, text_hash))
+
+    pdf.close()
+    return fingerprints
+
+
+def find_reusable_pages(fingerprints: List[Tuple[str, str]], exclude_doc_id: int) -> Dict[Tuple[str, str], "Page"]:
+    """이미 OCR이 끝난 같은 지문의 페이지 (지문당 가장 최근 1개)"""
+    from .models import Page
+
+    raster_hashes = {r for r, _ in fingerprints}
+    candidates = (
+        Page.objects
+        .filter(raster_hash__in=raster_hashes, ocr__isnull=False)
+        .exclude(doc_id=exclude_doc_id)
+        .order_by("-created_at")
+    )
+
+    wanted = set(fingerprints)
+    matches = {}
+    for page in candidates:
+        key = (page.raster_hash, page.text_hash)
+        if key in wanted and key not in matches:
+            matches[key] = page
+    return matches
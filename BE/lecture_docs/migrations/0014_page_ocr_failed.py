@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture_docs', '0013_doc_doc_tts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='ocr_failed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
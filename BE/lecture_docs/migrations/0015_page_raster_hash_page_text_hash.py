@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture_docs', '0014_page_ocr_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='raster_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='text_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
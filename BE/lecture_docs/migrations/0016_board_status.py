@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lecture_docs', '0015_page_raster_hash_page_text_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='status',
+            field=models.CharField(default='done', max_length=20),
+        ),
+    ]
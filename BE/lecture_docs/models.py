@@ -23,6 +23,9 @@ class Page(models.Model):
     page_number = models.IntegerField()
     image = models.URLField(blank=True, null=True)
     ocr = models.TextField(blank=True, null=True)  # OCR 결과 텍스트
+    ocr_failed = models.BooleanField(default=False)  # AI OCR 페이지 처리 실패 여부
+    raster_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # 렌더링 이미지 지문
+    text_hash = models.CharField(max_length=64, blank=True, null=True)  # 텍스트 레이어 지문
     page_tts =  models.JSONField(blank=True, null=True) 
     summary = models.TextField(blank=True, null=True) 
     summary_tts = models.JSONField(blank=True, null=True)
@@ -37,10 +40,15 @@ class Page(models.Model):
     
 #판서/필기
 class Board(models.Model):
+    STATUS_PROCESSING = "processing"  # 이미지 업로드 후 OCR 진행 중
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
     page = models.ForeignKey(Page, on_delete=models.CASCADE, related_name='boards',  null=True, blank=True)
     text = models.TextField(blank=True, null=True) 
     board_tts =  models.JSONField(blank=True, null=True) 
     image = models.URLField(blank=True, null=True) #판서이미지
+    status = models.CharField(max_length=20, default=STATUS_DONE)  # OCR 상태
     created_at = models.DateTimeField(auto_now_add=True)
     @property
     def lecture(self):
@@ -0,0 +1,124 @@
+import time
+import uuid
+
+from django.conf import settings
+
+from .singleflight import redis_client
+
+# 교안별 사전 생성 대기열 상태 (Redis)
+# - current : DocSync로 동기화된 현재 페이지
+# - pending : 처리 대기 중인 페이지 번호 집합
+# - budget  : 지금까지 대기열에 넣은 페이지 수
+# - workers : 실행 중인 precompute_doc 워커 lease (zset 워커 id → 만료 시각)
+#             워커가 죽거나 .delay가 실패해도 lease가 만료되면 자리가 풀린다
+STATE_TTL = 60 * 60 * 6
+
+# 만료된 lease를 지우고, 자리가 남아 있을 때만 새 lease를 추가 (원자적으로)
+_acquire_lease = redis_client.register_script("""
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+""")
+
+
+def _key(doc_id: int, name: str) -> str:
+    return f"precompute:doc:{doc_id}:{name}"
+
+
+def set_current_page(doc_id: int, page_number: int):
+    redis_client.set(_key(doc_id, "current"), int(page_number), ex=STATE_TTL)
+
+
+def get_current_page(doc_id: int) -> int | None:
+    value = redis_client.get(_key(doc_id, "current"))
+    return int(value) if value is not None else None
+
+
+def page_priority(page_number: int, current: int | None) -> tuple:
+    """
+    처리 우선순위 (작을수록 먼저)
+    1. 현재 동기화 페이지
+    2. 주변 페이지 (거리순, 같은 거리면 다음 페이지 우선)
+    3. 나머지 페이지 (앞 페이지부터)
+    """
+    if current is None:
+        return (1, page_number)
+
+    distance = abs(page_number - current)
+    if distance <= settings.PRECOMPUTE_NEARBY_PAGES:
+        return (0, distance, page_number < current)
+    return (1, page_number)
+
+
+def enqueue_page(doc_id: int, page_number: int) -> bool:
+    """페이지를 대기열에 넣고 워커가 부족하면 새로 띄운다. 예산 초과 시 False"""
+    pending_key = _key(doc_id, "pending")
+    budget_key = _key(doc_id, "budget")
+
+    if not redis_client.sadd(pending_key, int(page_number)):
+        return True  # 이미 대기 중
+    redis_client.expire(pending_key, STATE_TTL)
+
+    used = redis_client.incr(budget_key)
+    redis_client.expire(budget_key, STATE_TTL)
+    if used > settings.PRECOMPUTE_PAGE_BUDGET:
+        redis_client.srem(pending_key, int(page_number))
+        return False
+
+    ensure_worker(doc_id)
+    return True
+
+
+def ensure_worker(doc_id: int):
+    from .tasks import precompute_doc
+
+    now = time.time()
+    worker_id = uuid.uuid4().hex
+    workers_key = _key(doc_id, "workers")
+    acquired = _acquire_lease(
+        keys=[workers_key],
+        args=[now, settings.PRECOMPUTE_MAX_CONCURRENCY, now + settings.PRECOMPUTE_WORKER_LEASE, worker_id, STATE_TTL],
+    )
+    if not acquired:
+        return
+
+    try:
+        precompute_doc.delay(doc_id, worker_id)
+    except Exception:
+        # 브로커 장애 등으로 작업이 등록되지 않았으면 자리를 바로 돌려준다
+        redis_client.zrem(workers_key, worker_id)
+        raise
+
+
+def heartbeat_worker(doc_id: int, worker_id: str):
+    """실행 중인 워커의 lease 연장 (페이지를 하나 꺼낼 때마다 호출)"""
+    workers_key = _key(doc_id, "workers")
+    redis_client.zadd(workers_key, {worker_id: time.time() + settings.PRECOMPUTE_WORKER_LEASE})
+    redis_client.expire(workers_key, STATE_TTL)
+
+
+def claim_next_page(doc_id: int) -> int | None:
+    """우선순위가 가장 높은 대기 페이지를 하나 꺼낸다 (SREM 성공한 워커만 처리)"""
+    pending_key = _key(doc_id, "pending")
+    current = get_current_page(doc_id)
+
+    while True:
+        members = redis_client.smembers(pending_key)
+        if not members:
+            return None
+
+        page_number = min((int(m) for m in members), key=lambda n: page_priority(n, current))
+        if redis_client.srem(pending_key, page_number):
+            return page_number
+
+
+def release_worker(doc_id: int, worker_id: str):
+    redis_client.zrem(_key(doc_id, "workers"), worker_id)
+
+    # 워커가 끝나는 사이에 들어온 페이지가 있으면 다시 기동
+    if redis_client.scard(_key(doc_id, "pending")):
+        ensure_worker(doc_id)
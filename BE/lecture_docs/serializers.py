@@ -54,7 +54,9 @@ class PageSerializer(serializers.ModelSerializer):
         return obj.doc.pages.count()
 
     def get_status(self, obj):
-        return "done" if obj.ocr else "processing"
+        if obj.ocr:
+            return "done"
+        return "failed" if obj.ocr_failed else "processing"
 
 
 
@@ -67,7 +69,7 @@ class BoardSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Board
-        fields = ["boardId", "image", "text"]
+        fields = ["boardId", "image", "text", "status"]
 
 class BoardReviewSerializer(serializers.ModelSerializer):
     boardId = serializers.IntegerField(source='id')
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+
+redis_client = redis.Redis.from_url(settings.CACHE_REDIS_URL)
+
+
+class SingleFlightTimeout(Exception):
+    """다른 요청의 생성 작업을 기다리다 시간 초과"""
+
+
+@contextmanager
+def single_flight(key: str):
+    """
+    같은 산출물(요약/TTS)에 대한 동시 생성 요청을 하나로 합치는 락
+    - 먼저 들어온 요청만 생성하고, 나머지는 락이 풀릴 때까지 대기
+    - 대기 후에는 호출 측에서 DB를 다시 읽어 결과를 공유한다
+    - Redis 장애 시에는 락 없이 그대로 진행
+    """
+    lock = redis_client.lock(
+        f"single_flight:{key}",
+        timeout=settings.SINGLE_FLIGHT_LOCK_TIMEOUT,
+        blocking_timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT,
+    )
+
+    try:
+        acquired = lock.acquire()
+    except redis.RedisError as e:
+        print(f"[single_flight] 락 획득 실패, 락 없이 진행: {key} | {e}")
+        lock = None
+        acquired = True
+
+    if not acquired:
+        raise SingleFlightTimeout(key)
+
+    try:
+        yield
+    finally:
+        if lock is not None:
+            try:
+                lock.release()
+            except redis.RedisError:
+                # 생성이 락 TTL보다 오래 걸려 이미 만료된 경우
+                pass
@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from celery import shared_task
+from django.conf import settings
+
+from classes.utils import preprocess_text, text_to_speech
+from users.models import User
+from . import exam_store
+from .cache import invalidate_page
+from .models import Board, Page
+from .precompute import claim_next_page, heartbeat_worker, release_worker
+from .singleflight import single_flight
+from .utils import board_ocr, download_s3, exam_item_tts, exam_voice_gender, send_board_event, summarize_doc
+
+
+def _generate_once(page, field, build):
+    """
+    요청 경로(PageSummaryView 등)와 같은 single-flight 키를 사용해
+    이미 생성 중이거나 생성된 산출물은 다시 만들지 않는다.
+    """
+    if getattr(page, field):
+        return
+
+    try:
+        with single_flight(f"page:{page.id}:{field}"):
+            page.refresh_from_db(fields=[field])
+            if getattr(page, field):
+                return
+
+            setattr(page, field, build())
+            page.save(update_fields=[field])
+            invalidate_page(page.doc_id, page.page_number)
+    except Exception as e:
+        print(f"[precompute] ERROR | page_id={page.id} field={field} | {e}")
+
+
+def precompute_page(doc_id: int, page_number: int):
+    page = Page.objects.select_related("doc__lecture").get(doc_id=doc_id, page_number=page_number)
+    if not page.ocr:
+        return
+
+    lecture = page.doc.lecture
+    user = lecture.student or lecture.assistant
+
+    _generate_once(page, "summary", lambda: summarize_doc(doc_id, page.ocr))
+    if page.summary:
+        _generate_once(page, "summary_tts", lambda: text_to_speech(
+            preprocess_text(page.summary), user=user, s3_folder="tts/page_summary/"
+        ))
+    _generate_once(page, "page_tts", lambda: text_to_speech(
+        preprocess_text(page.ocr), user=user, s3_folder="tts/page_ocr/"
+    ))
+
+
+@shared_task
+def precompute_doc(doc_id: int, worker_id: str):
+    try:
+        while True:
+            heartbeat_worker(doc_id, worker_id)
+            page_number = claim_next_page(doc_id)
+            if page_number is None:
+                break
+
+            try:
+                precompute_page(doc_id, page_number)
+            except Exception as e:
+                print(f"[precompute_doc] ERROR | doc_id={doc_id} page={page_number} | {e}")
+    finally:
+        release_worker(doc_id, worker_id)
+
+
+def _pregenerate_item(user, gender, question_number, item_index, text):
+    try:
+        with single_flight(exam_store.item_tts_flight_key(user.id, question_number, item_index)):
+            found = exam_store.get_item(user.id, question_number, item_index)
+            if found is None or found[0] is None:
+                return
+
+            tts = found[0].get("tts") or {}
+            if tts.get(gender):
+                return
+
+            tts = {**tts, **exam_item_tts(preprocess_text(text), user)}
+            exam_store.set_item_tts(user.id, question_number, item_index, tts)
+    except Exception as e:
+        print(f"[exam_tts] ERROR | user={user.id} q={question_number} item={item_index} | {e}")
+        exam_store.mark_tts_failed(user.id, question_number, item_index)
+
+
+@shared_task
+def pregenerate_exam_tts(user_id: int, token: str):
+    """
+    시험 OCR 결과가 저장되면 모든 item TTS를 읽는 순서대로 미리 생성
+    (앞 문항부터 제출해서 먼저 끝나도록 병렬 처리)
+    item이 하나 끝날 때마다 워커 표시 TTL을 연장한다
+    """
+    user = User.objects.get(id=user_id)
+    gender = exam_voice_gender(user)
+
+    try:
+        while exam_store.heartbeat_tts_worker(user_id, token):
+            pending = exam_store.pending_tts_items(user_id, gender)
+            if not pending:
+                break
+
+            print(f"[exam_tts] user={user_id} item {len(pending)}개 생성 시작")
+            with ThreadPoolExecutor(max_workers=settings.EXAM_TTS_CONCURRENCY) as pool:
+                futures = [
+                    pool.submit(_pregenerate_item, user, gender, question_number, item_index, text)
+                    for question_number, item_index, text in pending
+                ]
+                for _ in as_completed(futures):
+                    exam_store.heartbeat_tts_worker(user_id, token)
+    finally:
+        exam_store.release_tts_worker(user_id, token, gender)
+
+
+def _board_text(prev, result: dict) -> str:
+    """
+    AI 증분 결과를 이전 판서 텍스트에 반영
+    이전 판서를 사용자가 직접 고쳤을 수 있으므로 AI 캐시의 이전 정리본 대신 DB 텍스트에 이어 붙인다.
+    """
+    mode = result.get("mode")
+    if prev is None or prev.status != Board.STATUS_DONE or not prev.text:
+        return result.get("text", "")
+    if mode == "unchanged":
+        return prev.text
+    if mode == "append":
+        return f"{prev.text.rstrip()}\n\n{result.get('appendedText', '')}"
+    return result.get("text", "")
+
+
+@shared_task
+def run_board_ocr(board_id: int, s3_key: str, name: str, content_type: str):
+    """
+    업로드된 판서 이미지 OCR → Board.text 저장 후 updated 이벤트 전송
+    같은 페이지의 직전 판서를 함께 알려 AI 서버가 바뀐 영역만 OCR/LLM 처리하게 한다.
+    OCR 도중 판서가 삭제됐거나 사용자가 직접 수정했으면 결과를 버린다.
+    """
+    board = Board.objects.filter(id=board_id).only("id", "page_id").first()
+    if board is None:
+        return
+    prev = Board.objects.filter(page_id=board.page_id, id__lt=board_id).order_by("-id").first()
+
+    result = {}
+    try:
+        content = download_s3(s3_key)
+        result = board_ocr(
+            name, content, content_type,
+            timeout=settings.BOARD_OCR_TIMEOUT,
+            board_id=board_id,
+            prev_board_id=prev.id if prev else None,
+        )
+        text = _board_text(prev, result)
+        status = Board.STATUS_DONE
+    except Exception as e:
+        print(f"[run_board_ocr] ERROR | board_id={board_id} s3_key={s3_key} | {e}")
+        text, status = "", Board.STATUS_FAILED
+
+    updated = Board.objects.filter(id=board_id, status=Board.STATUS_PROCESSING).update(text=text, status=status)
+    if not updated:
+        return
+
+    board = Board.objects.select_related("page").get(id=board_id)
+    send_board_event(board.page.doc_id, "updated", {
+        "boardId": board.id,
+        "text": board.text,
+        "status": board.status,
+        # 증분 결과: full / unchanged / append / rewrite, append면 추가된 부분만 따로 전달
+        "mode": result.get("mode", "full"),
+        "appendedText": result.get("appendedText", ""),
+    })
@@ -6,6 +6,7 @@ urlpatterns = [
     path('lecture/<int:lectureId>/doc/', DocUploadView.as_view(), name='doc-upload'),
     path('doc/<int:docId>/', DocDetailView.as_view(), name='doc-detail'),
     path('doc/<int:docId>/<int:pageNumber>/', PageDetailView.as_view(), name='page-detail'),
+    path('doc/<int:docId>/ocr/retry/', DocOcrRetryView.as_view(), name='doc-ocr-retry'),
     
     path('page/<int:pageId>/tts/', PageTTSView.as_view(), name='tts-upload'),
     path('page/<int:pageId>/board/', BoardView.as_view(), name='board-upload'),
@@ -23,6 +24,9 @@ urlpatterns = [
     path("exam/tts/", ExamTTSView.as_view()),
     path('exam/end/',  ExamEndView.as_view(), name='exam-result'),
 
+    path("docs/cache/stats/", PageCacheStatsView.as_view(), name="page-cache-stats"),
+
     ## BE <> AI
     path("docs/<int:docId>/ocr-callback/", OcrCallbackView.as_view(), name="doc-ocr-callback"),
+    path("exam/ocr-callback/<str:token>/", ExamOcrCallbackView.as_view(), name="exam-ocr-callback"),
 ]
\ No newline at end of file
@@ -1,4 +1,6 @@
+import io
 import re
+import uuid
 from google.cloud import texttospeech
 from classes.utils import text_to_speech, time_to_seconds, math_pattern
 from lecture_docs.models import *
@@ -7,6 +9,10 @@ from users.models import User
 from django.conf import settings
 from botocore.exceptions import NoCredentialsError
 import boto3
+import requests
+import time
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 
 latex_patterns = [
     r'\\\((.*?)\\\)',
@@ -237,7 +243,71 @@ def upload_s3(file_obj, file_name, folder=None, content_type=None):
     except Exception as e:
         raise Exception(f"S3 업로드 실패: {e}")
 
-def exam_tts(text: str, user: User):
+def download_s3(key: str) -> bytes:
+    try:
+        s3 = boto3.client(
+            "s3",
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_REGION,
+        )
+        obj = s3.get_object(Bucket=settings.AWS_BUCKET_NAME, Key=key)
+        return obj["Body"].read()
+
+    except NoCredentialsError:
+        raise Exception("AWS 자격 증명이 없습니다. 환경변수를 확인하세요.")
+    except Exception as e:
+        raise Exception(f"S3 다운로드 실패: {e}")
+
+
+def board_ocr(name, content, content_type, timeout=12, board_id=None, prev_board_id=None) -> dict:
+    """
+    판서 이미지 AI OCR → {"text", "mode", "appendedText"}
+    바이너리 업로드 API가 설정돼 있으면 multipart로 전송하고,
+    board_id / prev_board_id를 함께 보내 같은 페이지 이전 판서 대비 증분 처리를 요청한다.
+    (base64 API는 항상 전체 처리: mode 없음)
+    """
+    started = time.perf_counter()
+    if settings.AI_BOARD_OCR_IMAGE_URL:
+        data = {"board_id": board_id, "prev_board_id": prev_board_id}
+        ai_resp = requests.post(
+            settings.AI_BOARD_OCR_IMAGE_URL,
+            files={"image": (name, content, content_type)},
+            data={k: v for k, v in data.items() if v is not None},
+            timeout=timeout
+        )
+        payload = len(content)
+    else:
+        import base64
+        image_b64 = base64.b64encode(content).decode()
+        ai_resp = requests.post(
+            settings.AI_BOARD_OCR_URL,
+            json={"image_base64": image_b64},
+            timeout=timeout
+        )
+        payload = len(image_b64)
+    ai_resp.raise_for_status()
+
+    result = ai_resp.json()
+    print(f"[BOARD] AI OCR 요청 {payload / 1024:.0f}KB, {time.perf_counter() - started:.2f}s, "
+          f"mode={result.get('mode', 'full')}")
+    return result
+
+
+def send_board_event(doc_id, event: str, data: dict):
+    """교안 웹소켓 그룹에 판서 이벤트 전송 (created / updated / deleted)"""
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f"doc_{doc_id}",
+        {
+            "type": "board_event",
+            "event": event,
+            "data": data,
+        }
+    )
+
+
+def exam_tts(text: str, user: User, rate: str | None = None):
     synthesis_input = texttospeech.SynthesisInput(text=text)
 
     voice_map = {
@@ -252,7 +322,7 @@ def exam_tts(text: str, user: User):
     )
 
     rate_map = {"느림": 0.8, "보통": 1.0, "빠름": 1.25}
-    speaking_rate = rate_map.get(user.rate or "보통")
+    speaking_rate = rate_map.get(rate or user.rate or "보통")
 
     audio_config = texttospeech.AudioConfig(
         audio_encoding=texttospeech.AudioEncoding.MP3,
@@ -263,4 +333,24 @@ def exam_tts(text: str, user: User):
         input=synthesis_input, voice=voice_config, audio_config=audio_config
     )
 
-    return response.audio_content 
\ No newline at end of file
+    return response.audio_content 
+
+
+def exam_voice_gender(user: User) -> str:
+    return "male" if user.voice == "남성" else "female"
+
+
+def exam_item_tts(text: str, user: User, s3_folder: str = "tts/exam_items") -> dict:
+    """
+    시험 item TTS: 사용자 목소리 1개만 합성 + S3 업로드 → {"female" | "male": url}
+    속도는 FE에서 사용자 설정(playbackRate)으로 적용하므로 보통 속도로 합성
+    """
+    if not text or text.strip() == "":
+        raise ValueError("TTS 변환할 텍스트가 비어 있습니다.")
+
+    audio = exam_tts(text, user, rate="보통")
+    if not audio:
+        raise ValueError("TTS 변환에 실패했습니다. 응답이 비어 있습니다.")
+
+    url = upload_s3(io.BytesIO(audio), f"{uuid.uuid4()}.mp3", folder=s3_folder, content_type="audio/mpeg")
+    return {exam_voice_gender(user): url}
@@ -3,6 +3,8 @@ import os
 from urllib.parse import unquote
 from io import BytesIO
 import time
+import uuid
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
@@ -20,8 +22,16 @@ from classes.utils import markdown_to_text, preprocess_text, text_to_speech
 from .models import Doc, Page, Board
 from lectures.models import Lecture
 from .utils import  *
+from .cache import get_page_data, get_stats, invalidate_doc, invalidate_page
+from .singleflight import SingleFlightTimeout, single_flight
+from .precompute import enqueue_page
+from .tasks import run_board_ocr
+from .fingerprint import REUSE_FIELDS, find_reusable_pages, page_fingerprints
+from . import exam_store
+from .exam_store import redis_client
 from classes.serializers import *
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import redis
 from dotenv import load_dotenv
 
@@ -68,19 +78,51 @@ class DocUploadView(APIView):
             )
         pdf_bytes = file.read() 
 
-        pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        total_pages = pdf_doc.page_count
-        pdf_doc.close()
-
-        # page 객체 생성
-        for page_num in range(1, total_pages + 1):
+        # 페이지 지문 (래스터 + 텍스트 레이어)
+        fingerprints = page_fingerprints(pdf_bytes)
+        total_pages = len(fingerprints)
+        reusable = find_reusable_pages(fingerprints, exclude_doc_id=doc.id)
+
+        # page 객체 생성 (이미 OCR된 같은 페이지가 있으면 결과 재사용)
+        pending_pages = []
+        reused_pages = []
+        for page_num, (raster_hash, text_hash) in enumerate(fingerprints, start=1):
+            source = reusable.get((raster_hash, text_hash))
+            copied = {field: getattr(source, field) for field in REUSE_FIELDS} if source else {}
             Page.objects.create(
                 doc=doc,
                 page_number=page_num,
-                ocr=None,
-                image=None,
-        )
-        # AI로 전송
+                raster_hash=raster_hash,
+                text_hash=text_hash,
+                **copied,
+            )
+            if source:
+                reused_pages.append(page_num)
+            else:
+                pending_pages.append(page_num)
+
+        hit_rate = round(len(reused_pages) / total_pages, 3) if total_pages else 0.0
+        print(f"[dedup] doc={doc.id} | reused {len(reused_pages)}/{total_pages} pages (hit_rate={hit_rate})")
+
+        # 재사용 페이지 중 요약/TTS가 비어 있는 페이지는 사전 생성 대기열로
+        if lecture.precompute:
+            for page_num in reused_pages:
+                try:
+                    enqueue_page(doc.id, page_num)
+                except Exception as e:
+                    print(f"[precompute] 대기열 등록 실패: doc={doc.id}, page={page_num} | {e}")
+
+        dedup = {
+            "totalPages": total_pages,
+            "reusedPages": len(reused_pages),
+            "hitRate": hit_rate,
+        }
+
+        # 모든 페이지를 재사용했으면 AI OCR 생략
+        if not pending_pages:
+            return Response({"docId": doc.id, "title": doc.title, "dedup": dedup}, status=201)
+
+        # AI로 전송 (재사용하지 못한 페이지만 OCR)
         ai_ocr_url = settings.AI_OCR_URL
         callback_url = f"{settings.BACKEND_BASE_URL}/docs/{doc.id}/ocr-callback/"
         #로컬 테스트용
@@ -93,6 +135,8 @@ class DocUploadView(APIView):
             "doc_id": doc.id,
             "callback_url": callback_url,
         }
+        if reused_pages:
+            data["pages"] = ",".join(str(n) for n in pending_pages)
 
         try:
             resp = requests.post(ai_ocr_url, files=files, data=data, timeout=60)
@@ -103,7 +147,7 @@ class DocUploadView(APIView):
                 status=status.HTTP_502_BAD_GATEWAY,
             )
 
-        return Response({"docId": doc.id, "title": doc.title}, status=201)
+        return Response({"docId": doc.id, "title": doc.title, "dedup": dedup}, status=201)
 #BE<>AI
 class OcrCallbackView(APIView):
 
@@ -114,12 +158,20 @@ class OcrCallbackView(APIView):
         image_url = request.data.get("image_url")
         ocr_text = request.data.get("ocr_text")
 
+        # 페이지 처리 실패 알림 → 재시도 대상으로 표시
+        if page_number and request.data.get("status") == "failed":
+            updated = Page.objects.filter(doc=doc, page_number=page_number, ocr__isnull=True) \
+                .update(ocr_failed=True)
+            if updated:
+                invalidate_page(doc.id, page_number)
+            return Response({"message": "페이지 OCR 실패 기록 완료"}, status=status.HTTP_200_OK)
+
         if not page_number or not ocr_text:
             return Response({"error": "page_number와 ocr_text는 필수입니다."},
                             status=status.HTTP_400_BAD_REQUEST)
 
         # Page 레코드 생성/갱신
-        page_obj, _ = Page.objects.get_or_create(
+        page_obj, created = Page.objects.get_or_create(
             doc=doc,
             page_number=page_number,
             defaults={},
@@ -129,9 +181,60 @@ class OcrCallbackView(APIView):
             page_obj.image = image_url
 
         page_obj.ocr = ocr_text
-        page_obj.save(update_fields=["image", "ocr"])
+        page_obj.ocr_failed = False
+        page_obj.save(update_fields=["image", "ocr", "ocr_failed"])
+
+        # 페이지 캐시 무효화 (새 페이지면 totalPage가 바뀌므로 교안 전체)
+        if created:
+            invalidate_doc(doc.id)
+        else:
+            invalidate_page(doc.id, page_obj.page_number)
+
+        # 요약/TTS 사전 생성 (강의 설정 시)
+        if doc.lecture and doc.lecture.precompute:
+            try:
+                enqueue_page(doc.id, page_obj.page_number)
+            except Exception as e:
+                print(f"[precompute] 대기열 등록 실패: doc={doc.id}, page={page_obj.page_number} | {e}")
 
         return Response({"message": "페이지 OCR 저장 완료"}, status=status.HTTP_200_OK)
+
+#실패 페이지 OCR 재시도
+class DocOcrRetryView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsLectureMember]
+
+    def post(self, request, docId):
+        doc = get_object_or_404(Doc, id=docId)
+        self.check_object_permissions(request, doc)
+
+        # 실패 표시된 페이지 + 결과가 아직 없는 페이지 (콜백이 유실된 경우 포함)
+        failed_pages = list(
+            doc.pages.filter(Q(ocr_failed=True) | Q(ocr__isnull=True))
+            .values_list("page_number", flat=True)
+        )
+        if not failed_pages:
+            return Response({"docId": doc.id, "pages": []}, status=status.HTTP_200_OK)
+
+        callback_url = f"{settings.BACKEND_BASE_URL}/docs/{doc.id}/ocr-callback/"
+
+        try:
+            resp = requests.post(
+                settings.AI_OCR_RETRY_URL,
+                json={"doc_id": doc.id, "callback_url": callback_url, "pages": failed_pages},
+                timeout=10,
+            )
+            resp.raise_for_status()
+        except Exception as e:
+            return Response(
+                {"error": f"AI 서버 요청 실패: {e}"},
+                status=status.HTTP_502_BAD_GATEWAY,
+            )
+
+        # 재시도 중에는 다시 processing 상태
+        doc.pages.filter(page_number__in=failed_pages).update(ocr_failed=False)
+        invalidate_doc(doc.id)
+
+        return Response({"docId": doc.id, "pages": failed_pages}, status=status.HTTP_202_ACCEPTED)
     
 #교안 TTS
 class PageTTSView(APIView):
@@ -146,24 +249,34 @@ class PageTTSView(APIView):
         if page.page_tts:
             return Response({"page_tts": page.page_tts}, status=200)
 
-        # 수식 전처리된 OCR 텍스트
-        # 없으면 원본 OCR 사용
-        processed_math = request.data.get("ocr_text", page.ocr)
-
-        # 최종 전처리 텍스트
-        preprocessed_text = preprocess_text(processed_math)
-        
         try:
-            tts_url = text_to_speech(
-                preprocessed_text,
-                user=request.user,
-                s3_folder="tts/page_ocr/"
-            )
-        except Exception as e:
-            return Response({"error": f"TTS 오류: {e}"}, status=500)
+            with single_flight(f"page:{page.id}:page_tts"):
+                # 대기하는 동안 다른 요청이 생성했으면 그 결과를 공유
+                page.refresh_from_db(fields=["page_tts"])
+                if page.page_tts:
+                    return Response({"page_tts": page.page_tts}, status=200)
+
+                # 수식 전처리된 OCR 텍스트
+                # 없으면 원본 OCR 사용
+                processed_math = request.data.get("ocr_text", page.ocr)
+
+                # 최종 전처리 텍스트
+                preprocessed_text = preprocess_text(processed_math)
+
+                try:
+                    tts_url = text_to_speech(
+                        preprocessed_text,
+                        user=request.user,
+                        s3_folder="tts/page_ocr/"
+                    )
+                except Exception as e:
+                    return Response({"error": f"TTS 오류: {e}"}, status=500)
 
-        page.page_tts = tts_url
-        page.save(update_fields=["page_tts"])
+                page.page_tts = tts_url
+                page.save(update_fields=["page_tts"])
+                invalidate_page(page.doc_id, page.page_number)
+        except SingleFlightTimeout:
+            return Response({"error": "TTS 생성 중입니다. 잠시 후 다시 시도해주세요."}, status=503)
 
         return Response({"page_tts": page.page_tts}, status=201)
 
@@ -184,13 +297,24 @@ class PageSummaryView(APIView):
             }, status=200)
 
         try:
-            summary = summarize_doc(page.doc.id, page.ocr)
-        except Exception as e:
-            return Response({"error": f"요약 생성 실패: {e}"}, status=500)
+            with single_flight(f"page:{page.id}:summary"):
+                # 대기하는 동안 다른 요청이 생성했으면 그 결과를 공유
+                page.refresh_from_db(fields=["summary"])
+                if page.summary:
+                    return Response({
+                        "summary": page.summary
+                    }, status=200)
 
+                try:
+                    summary = summarize_doc(page.doc.id, page.ocr)
+                except Exception as e:
+                    return Response({"error": f"요약 생성 실패: {e}"}, status=500)
 
-        page.summary = summary
-        page.save(update_fields=["summary"])
+                page.summary = summary
+                page.save(update_fields=["summary"])
+                invalidate_page(page.doc_id, page.page_number)
+        except SingleFlightTimeout:
+            return Response({"error": "요약 생성 중입니다. 잠시 후 다시 시도해주세요."}, status=503)
 
         return Response({
             "summary": page.summary,
@@ -208,23 +332,33 @@ class PageSummaryTTSView(APIView):
 
         if page.summary_tts:
             return Response({"summary_tts": page.summary_tts}, status=200)
-        
-        processed_math = request.data.get("summary_text", page.summary)
-
-        # 최종 전처리 텍스트
-        preprocessed_text = preprocess_text(processed_math)
 
         try:
-            tts_url = text_to_speech(
-                preprocessed_text,
-                user=request.user,
-                s3_folder="tts/page_summary/"
-            )
-        except Exception as e:
-            return Response({"error": f"TTS 오류: {e}"}, status=500)
+            with single_flight(f"page:{page.id}:summary_tts"):
+                # 대기하는 동안 다른 요청이 생성했으면 그 결과를 공유
+                page.refresh_from_db(fields=["summary_tts"])
+                if page.summary_tts:
+                    return Response({"summary_tts": page.summary_tts}, status=200)
 
-        page.summary_tts = tts_url
-        page.save(update_fields=["summary_tts"])
+                processed_math = request.data.get("summary_text", page.summary)
+
+                # 최종 전처리 텍스트
+                preprocessed_text = preprocess_text(processed_math)
+
+                try:
+                    tts_url = text_to_speech(
+                        preprocessed_text,
+                        user=request.user,
+                        s3_folder="tts/page_summary/"
+                    )
+                except Exception as e:
+                    return Response({"error": f"TTS 오류: {e}"}, status=500)
+
+                page.summary_tts = tts_url
+                page.save(update_fields=["summary_tts"])
+                invalidate_page(page.doc_id, page.page_number)
+        except SingleFlightTimeout:
+            return Response({"error": "TTS 생성 중입니다. 잠시 후 다시 시도해주세요."}, status=503)
 
         return Response({"summary_tts": page.summary_tts}, status=201)
 
@@ -289,14 +423,20 @@ class PageDetailView(APIView):
             return Response({"detail": "문서를 찾을 수 없습니다."},
                             status=status.HTTP_404_NOT_FOUND)
         self.check_object_permissions(request, doc)
-        page = doc.pages.get(page_number=pageNumber)
-        data = PageSerializer(page).data
+        data = get_page_data(doc, pageNumber, endpoint="page-detail")
 
-        if not page.ocr:
+        if data["status"] != "done":
             return Response(data, status=status.HTTP_202_ACCEPTED)
 
         return Response(data, status=status.HTTP_200_OK)
 
+#페이지 캐시 적중률
+class PageCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats(), status=status.HTTP_200_OK)
+
     
 #판서   
 class BoardView(APIView):
@@ -330,49 +470,28 @@ class BoardView(APIView):
         img_bytes = image.read()
 
         s3_stream = BytesIO(img_bytes)
-        s3_key = f"boards/{page.id}_{image.name}"
+        # 연속 업로드 시 같은 파일명(image.jpg 등)이 OCR 전에 덮어써지지 않도록 고유 키 사용
+        s3_key = f"boards/{page.id}_{uuid.uuid4().hex[:8]}_{image.name}"
         s3_url = upload_s3(s3_stream, s3_key, content_type=image.content_type)
 
-        import base64
-        image_b64 = base64.b64encode(img_bytes).decode()
-
-        ai_url = settings.AI_BOARD_OCR_URL  
-        try:
-            import requests
-            ai_resp = requests.post(
-                ai_url,
-                json={"image_base64": image_b64},
-                timeout=12
-            )
-            ai_resp.raise_for_status()
-            ocr_text = ai_resp.json().get("text", "")
-        except Exception as e:
-            return Response(
-                {"error": f"AI 서버 요청 실패: {str(e)}"},
-                status=status.HTTP_502_BAD_GATEWAY
-            )
+        # 판서는 바로 만들고(processing), OCR은 백그라운드에서 끝나면 updated 이벤트로 전달
         board = Board.objects.create(
             page=page,
             image=s3_url,
-            text=ocr_text
+            text="",
+            status=Board.STATUS_PROCESSING,
         )
 
         # 웹소켓
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"doc_{page.doc.id}",
-            {
-                "type": "board_event",
-                "event": "created",
-                "data": {
-                    "boardId": board.id,
-                    "image": board.image,
-                    "text": board.text,
-                }
-            }
-        )
+        send_board_event(page.doc.id, "created", {
+            "boardId": board.id,
+            "image": board.image,
+            "text": board.text,
+            "status": board.status,
+        })
+
+        run_board_ocr.delay(board.id, s3_key, image.name, image.content_type)
 
-        # 8) 최종 응답 (serializer)
         return Response(BoardSerializer(board).data, status=status.HTTP_201_CREATED)
 
     #수정
@@ -385,7 +504,9 @@ class BoardView(APIView):
             return Response({"error": "text 필드가 필요합니다."}, status=400)
 
         board.text = new_text
-        board.save(update_fields=["text"])
+        # 직접 수정한 내용은 아직 끝나지 않은 OCR 결과로 덮어쓰지 않는다
+        board.status = Board.STATUS_DONE
+        board.save(update_fields=["text", "status"])
 
         # 웹소켓
         channel_layer = get_channel_layer()
@@ -448,8 +569,9 @@ class BoardTTSView(APIView):
         
         board.text = board_text
         board.board_tts = tts_url
-            
-        board.save(update_fields=["text", "board_tts"])
+        # 직접 수정한 내용은 아직 끝나지 않은 OCR 결과로 덮어쓰지 않는다 (BoardView.patch와 동일)
+        board.status = Board.STATUS_DONE
+        board.save(update_fields=["text", "board_tts", "status"])
 
         return Response({
             "board_id": board.id,
@@ -625,12 +747,70 @@ class PageView(APIView):
 
 #시험 OCR
 load_dotenv()
-redis_client = redis.Redis.from_url(os.getenv("EXAM_REDIS_URL"))
 
 #시험 시작
 kst = timezone(timedelta(hours=9))  # 한국 시간대
 
 
+def exam_page_ocr(ai_url, name, content, content_type):
+    """시험지 1장 AI OCR → questions 리스트"""
+    files = {
+        "image": (name, content, content_type)
+    }
+    ai_resp = requests.post(ai_url, files=files, timeout=300)
+    ai_resp.raise_for_status()
+
+    result_json = ai_resp.json()
+
+    # questions 추출 (AI 응답 형태 유연하게 대응)
+    questions = (
+        result_json.get("questions")
+        or result_json.get("data", {}).get("questions")
+        or []
+    )
+
+    if not isinstance(questions, list):
+        raise ValueError("AI OCR 결과 형식 오류")
+
+    return questions
+
+
+def submit_exam_job(user_id, page, expire_at, name, content, content_type):
+    """시험지 1장을 AI 비동기 작업으로 제출 (문항 단위 결과는 callback으로 수신)"""
+    token = uuid.uuid4().hex
+    token_key = f"exam_job_token:{token}"
+    redis_client.set(token_key, json.dumps({"userId": user_id, "page": page, "expireAt": expire_at}))
+    redis_client.expireat(token_key, expire_at)
+    callback_url = f"{settings.BACKEND_BASE_URL}/exam/ocr-callback/{token}/"
+
+    resp = requests.post(
+        settings.AI_EXAM_OCR_JOB_URL,
+        files={"image": (name, content, content_type)},
+        data={"callback_url": callback_url},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return resp.json().get("jobId")
+
+
+def start_exam_tts(user_id):
+    """
+    item TTS 사전 생성 워커 기동 (실패해도 시험 진행에는 영향 없음)
+    워커를 못 띄우면 재생 시 ExamTTSView에서 생성한다
+    """
+    try:
+        exam_store.ensure_tts_worker(user_id)
+    except Exception as e:
+        print(f"[exam_tts] 워커 기동 실패: user={user_id} | {e}")
+
+
+def exam_session_open(session):
+    """세션이 있고 종료 시각 전이면 True"""
+    if not session:
+        return False
+    return datetime.now(kst) <= datetime.fromisoformat(session["endTime"])
+
+
 class ExamStartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -661,42 +841,80 @@ class ExamStartView(APIView):
             tzinfo=kst,
         )
 
-        # Redis에 full datetime(ISO 형태) 저장
-        session_key = f"exam_session:{user.id}"
-        redis_client.set(
-            session_key,
-            json.dumps({"endTime": end_time_kst.isoformat()})
-        )
-
-        # OCR 처리
-        ai_url = settings.AI_EXAM_OCR_URL
-        #result_url = settings.AI_EXAM_OCR_RESULT_URL
-        all_questions = []
+        # Redis 세션 생성 (모든 시험 키는 종료 시각 기준으로 자동 만료)
+        expire_at = exam_store.start_session(user.id, end_time_kst, len(images))
 
-        for image in images:
-            files = {
-                "image": (image.name, image.read(), image.content_type)
-            }
-            ai_resp = requests.post(ai_url, files=files, timeout=300)
-            ai_resp.raise_for_status()
+        pages = [(image.name, image.read(), image.content_type) for image in images]
+        workers = min(len(pages), settings.EXAM_OCR_MAX_CONCURRENCY)
 
+        # 비동기 모드: 작업만 제출하고 바로 응답 → 문항은 ExamResultView로 폴링
+        if request.query_params.get("async") in ("1", "true") and settings.AI_EXAM_OCR_JOB_URL:
+            # 제출 전에 queued로 기록 (빨리 끝난 작업의 callback을 덮어쓰지 않도록)
+            exam_store.set_job_states(user.id, {idx: "queued" for idx in range(len(pages))}, expire_at)
 
-            result_json = ai_resp.json()
-
-            # questions 추출 (AI 응답 형태 유연하게 대응)
-            questions = (
-                result_json.get("questions")
-                or result_json.get("data", {}).get("questions")
-                or []
-            )
-
-            if not isinstance(questions, list):
-                return Response({"error": "AI OCR 결과 형식 오류"}, status=500)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(submit_exam_job, user.id, idx, expire_at, *page)
+                    for idx, page in enumerate(pages)
+                ]
+                job_ids, failed_pages, error = [], [], None
+                for idx, f in enumerate(futures):
+                    try:
+                        job_ids.append(f.result())
+                    except Exception as e:
+                        print(f"[exam] user={user.id} page {idx + 1} 작업 등록 실패 | {e}")
+                        job_ids.append(None)
+                        failed_pages.append(idx)
+                        error = e
+
+            # 한 페이지도 등록하지 못했으면 세션 정리 (열린 시험이 작업 없이 남지 않도록)
+            if len(failed_pages) == len(pages):
+                exam_store.clear_session(user.id)
+                return Response({"error": f"AI OCR 작업 등록 실패: {error}"}, status=status.HTTP_502_BAD_GATEWAY)
+
+            # 일부만 실패하면 등록된 페이지는 계속 진행하고 실패 페이지는 failed로 기록
+            for idx in failed_pages:
+                states = exam_store.set_job_state(user.id, idx, "failed", expire_at)
+                if all(s in ("done", "failed") for s in states.values()):
+                    exam_store.mark_complete(user.id)
 
-            all_questions.extend(questions)
+            return Response({
+                "endTime": end_time_kst.isoformat(),
+                "jobs": job_ids,
+                "totalPages": len(pages),
+                "failedPages": failed_pages,
+                "questions": [],
+            }, status=status.HTTP_202_ACCEPTED)
+
+        # OCR 처리 (페이지 병렬, 끝나는 대로 Redis에 문항별 저장)
+        ai_url = settings.AI_EXAM_OCR_URL
+        #result_url = settings.AI_EXAM_OCR_RESULT_URL
+        page_questions = [None] * len(pages)
 
-        ocr_key = f"exam_ocr:{user.id}"
-        redis_client.set(ocr_key, json.dumps(all_questions))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(exam_page_ocr, ai_url, *page): idx
+                for idx, page in enumerate(pages)
+            }
+            try:
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    page_questions[idx] = future.result()
+                    qkeys = exam_store.save_questions(user.id, idx, page_questions[idx], expire_at)
+                    for q, qkey in zip(page_questions[idx], qkeys):
+                        q["questionKey"] = qkey
+                    start_exam_tts(user.id)
+                    print(f"[exam] user={user.id} page {idx + 1}/{len(pages)} OCR 완료")
+            except Exception as e:
+                for f in futures:
+                    f.cancel()
+                exam_store.clear_session(user.id)
+                return Response({"error": f"AI OCR 실패: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+
+        exam_store.mark_complete(user.id)
+
+        # 페이지 순서대로 병합
+        all_questions = [q for questions in page_questions for q in questions]
 
 
         return Response({
@@ -712,27 +930,21 @@ class ExamResultView(APIView):
     def get(self, request):
         user = request.user
 
-        session_key = f"exam_session:{user.id}"
-        ocr_key = f"exam_ocr:{user.id}"
-
-        session_val = redis_client.get(session_key)
-        if not session_val:
+        # 세션/작업 상태/문항을 파이프라인으로 한 번에 조회
+        session, questions, jobs = exam_store.load_exam(user.id)
+        if not exam_session_open(session):
             return Response({"error": "시험 종료됨"}, status=403)
 
-        session = json.loads(session_val)
-        end_time_kst = datetime.fromisoformat(session["endTime"])
-        now_kst = datetime.now(kst)
-
-        if now_kst > end_time_kst:
-            return Response({"error": "시험 종료됨"}, status=403)
-
-        cached = redis_client.get(ocr_key)
-        if not cached:
+        # 아직 OCR 중이면 완료된 문항까지 먼저 제공
+        if not session["complete"] and not questions and not jobs:
             return Response({"error": "OCR 없음"}, status=404)
 
         return Response({
             "endTime": session["endTime"],
-            "questions": json.loads(cached)
+            "questions": questions,
+            "complete": session["complete"],
+            "totalPages": session["totalPages"],
+            "failedPages": sorted(int(p) for p, s in jobs.items() if s == "failed"),
         }, status=200)
 
 #시험 종료
@@ -742,14 +954,40 @@ class ExamEndView(APIView):
     def post(self, request):
         user = request.user
 
-        session_key = f"exam_session:{user.id}"
-        ocr_key = f"exam_ocr:{user.id}"
-
-        redis_client.delete(session_key)
-        redis_client.delete(ocr_key)
+        # 종료 시각이 지나면 자동 만료되지만, 조기 종료 시 바로 정리
+        exam_store.clear_session(user.id)
 
         return Response({"message": "시험 종료됨"}, status=200)
 
+#BE<>AI 시험 OCR 작업 callback (문항 단위)
+class ExamOcrCallbackView(APIView):
+
+    def post(self, request, token):
+        raw = redis_client.get(f"exam_job_token:{token}")
+        if not raw:
+            return Response({"error": "알 수 없는 작업"}, status=status.HTTP_404_NOT_FOUND)
+
+        info = json.loads(raw)
+        user_id, page, expire_at = info["userId"], info["page"], info["expireAt"]
+
+        question = request.data.get("question")
+        job_status = request.data.get("status")
+
+        if question is not None:
+            exam_store.save_questions(user_id, page, [question], expire_at,
+                                      start_index=int(request.data.get("index", 0)))
+            start_exam_tts(user_id)
+
+        elif job_status in ("done", "failed"):
+            states = exam_store.set_job_state(user_id, page, job_status, expire_at)
+            print(f"[exam] user={user_id} page {page + 1} 작업 {job_status}")
+
+            # 모든 페이지 작업이 끝나면 완료 표시
+            if states and all(s in ("done", "failed") for s in states.values()):
+                exam_store.mark_complete(user_id)
+
+        return Response({"message": "ok"}, status=status.HTTP_200_OK)
+
 #시험 tts
 class ExamTTSView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -759,84 +997,72 @@ class ExamTTSView(APIView):
         
         question_number = request.data.get("questionNumber")
         item_index = request.data.get("itemIndex")
+        # 결과 조회 때 받은 문항 키 (번호가 겹치거나 없는 문항도 구분됨), 없으면 문제 번호로 조회
+        qkey = request.data.get("questionKey") or question_number
 
-        if question_number is None:
-            return Response({"error": "questionNumber 필요"}, status=400)
+        if qkey is None:
+            return Response({"error": "questionKey 또는 questionNumber 필요"}, status=400)
+        qkey = str(qkey)
         if item_index is None:
             return Response({"error": "itemIndex 필요"}, status=400)
 
         item_index = int(item_index)
 
-        session_key = f"exam_session:{user.id}"
-        ocr_key = f"exam_ocr:{user.id}"
-
         # 1) 시험 종료 여부 확인
-        session_val = redis_client.get(session_key)
-        if not session_val:
+        if not exam_session_open(exam_store.get_session(user.id)):
             return Response({"error": "시험 종료됨"}, status=403)
 
-        session = json.loads(session_val)
-        end_time_kst = datetime.fromisoformat(session["endTime"])
-        now_kst = datetime.now(kst)
-
-        if now_kst > end_time_kst:
-            return Response({"error": "시험 종료됨"}, status=403)
-
-        # 2) OCR 데이터 불러오기
-        cached = redis_client.get(ocr_key)
-        if not cached:
-            return Response({"error": "OCR 없음"}, status=404)
+        # 2) 문항 hash에서 해당 item만 조회
+        found = exam_store.get_item(user.id, qkey, item_index)
+        if found is None:
+            return Response({"error": "해당 문항 없음"}, status=404)
 
-        questions = json.loads(cached)
-
-        # 3) 문제 번호 찾기
-        try:
-            question = next(q for q in questions if q["questionNumber"] == int(question_number))
-        except StopIteration:
-            return Response({"error": "해당 questionNumber 없음"}, status=404)
-
-        items = question.get("items", [])
-        if item_index < 0 or item_index >= len(items):
+        item, item_count = found
+        if item_index < 0 or item_index >= item_count:
             return Response({"error": "itemIndex 범위 초과"}, status=400)
 
-        item = items[item_index]
-
-        # 이미 TTS가 존재하면 바로 재사용
-        if "tts" in item and item["tts"]:
+        # 이미 사용자 목소리 TTS가 있으면 바로 재사용 (대부분 사전 생성으로 여기서 끝남)
+        gender = exam_voice_gender(user)
+        if (item.get("tts") or {}).get(gender):
             return Response({
                 "questionNumber": question_number,
+                "questionKey": qkey,
                 "itemIndex": item_index,
                 "tts": item["tts"]
             }, status=200)
 
-        # 4) TTS 생성
+        # 3) TTS 생성
         text = item.get("displayText")
         if not text:
             return Response({"error": "item에 displayText 없음"}, status=400)
 
         processed_math = request.data.get("text", text)
 
-        preprocessed_text = preprocess_text(processed_math)
-
-        # TTS 생성
         try:
-            tts_url = text_to_speech(
-                preprocessed_text,
-                user=user,
-                s3_folder="tts/exam_items/"
-            )
-        except Exception as e:
-            return Response({"error": f"TTS 오류: {e}"}, status=500)
+            with single_flight(exam_store.item_tts_flight_key(user.id, qkey, item_index)):
+                # 대기하는 동안 사전 생성 워커가 만들었으면 그 결과를 공유
+                found = exam_store.get_item(user.id, qkey, item_index)
+                if found is None:
+                    return Response({"error": "시험 종료됨"}, status=403)
+                tts_url = found[0].get("tts") or {}
+                if not tts_url.get(gender):
+                    preprocessed_text = preprocess_text(processed_math)
+
+                    # TTS 생성
+                    try:
+                        tts_url = {**tts_url, **exam_item_tts(preprocessed_text, user)}
+                    except Exception as e:
+                        return Response({"error": f"TTS 오류: {e}"}, status=500)
 
-        # 5) 생성된 tts를 Redis 저장 구조에 반영
-        item["tts"] = tts_url
-        redis_client.set(ocr_key, json.dumps(questions))
+                    # 4) 생성된 tts를 해당 item 필드에만 기록
+                    exam_store.set_item_tts(user.id, qkey, item_index, tts_url)
+        except SingleFlightTimeout:
+            return Response({"error": "TTS 생성 중입니다. 잠시 후 다시 시도해주세요."}, status=503)
 
-        # 6) 응답
+        # 5) 응답
         return Response({
             "questionNumber": question_number,
+            "questionKey": qkey,
             "itemIndex": item_index,
             "tts": tts_url
         }, status=200)
-
-
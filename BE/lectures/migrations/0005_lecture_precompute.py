@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lectures', '0004_alter_lecture_lecture_tts_alter_sharednote_note_tts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lecture',
+            name='precompute',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -14,6 +14,7 @@ class Lecture(models.Model):
     title = models.CharField(max_length=100)
     code = models.CharField(max_length=10, unique=True, default=lecture_code)
     lecture_tts =  models.JSONField(blank=True, null=True) 
+    precompute = models.BooleanField(default=False)  # OCR 직후 요약/TTS 미리 생성
     created_at = models.DateTimeField(auto_now_add=True)
 
 #공유 노트
@@ -5,7 +5,7 @@ from users.models import User
 class LectureSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lecture
-        fields = ['id', 'title', 'code', 'lecture_tts', 'created_at']
+        fields = ['id', 'title', 'code', 'lecture_tts', 'precompute', 'created_at']
 
 class LectureCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,9 +26,10 @@ class LectureCreateSerializer(serializers.ModelSerializer):
 class LectureUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lecture
-        fields = ['title']
+        fields = ['title', 'precompute']
 
     def update(self, instance, validated_data):
         instance.title = validated_data.get('title', instance.title)
+        instance.precompute = validated_data.get('precompute', instance.precompute)
         instance.save()
         return instance
\ No newline at end of file
@@ -77,13 +77,16 @@ class LectureDetailView(APIView):
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
-        lecture.lecture_tts = text_to_speech(lecture.title, request.user, "tts/lecture/")
-        lecture.save(update_fields=['lecture_tts'])
+        # 제목이 바뀐 경우에만 TTS 재생성
+        if 'title' in serializer.validated_data:
+            lecture.lecture_tts = text_to_speech(lecture.title, request.user, "tts/lecture/")
+            lecture.save(update_fields=['lecture_tts'])
 
         return Response({
             "lecture_id": lecture.id,
             "title": lecture.title,
-            "lecture_tts": lecture.lecture_tts
+            "lecture_tts": lecture.lecture_tts,
+            "precompute": lecture.precompute
         }, status=status.HTTP_200_OK)
     
     def delete(self, request, lectureId):
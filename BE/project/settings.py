@@ -14,6 +14,7 @@ from datetime import timedelta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -206,6 +207,32 @@ CORS_ALLOWED_ORIGINS = [
     "https://classmatess.netlify.app",
 ]
 
+#cache
+# 페이지 OCR 응답 캐시: 프로세스 로컬(L1) + Redis 공유(L2)
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/1")
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "page-local",
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_REDIS_URL,
+    },
+}
+PAGE_CACHE_LOCAL_TIMEOUT = 5
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 요약/TTS 중복 생성 방지 (Redis 락)
+SINGLE_FLIGHT_LOCK_TIMEOUT = 120
+SINGLE_FLIGHT_WAIT_TIMEOUT = 90
+
+# OCR 직후 요약/TTS 사전 생성 (강의별 opt-in)
+PRECOMPUTE_NEARBY_PAGES = 3        # 현재 동기화 페이지 기준 우선 처리 범위
+PRECOMPUTE_MAX_CONCURRENCY = 2     # 교안당 동시 처리 워커 수
+PRECOMPUTE_PAGE_BUDGET = 300       # 교안당 사전 생성 최대 페이지 수
+PRECOMPUTE_WORKER_LEASE = 300      # 워커 lease (초), 페이지 하나 처리 시간보다 길게
+
 #celery
 CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
@@ -214,11 +241,57 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Seoul'
 
+# 우선순위 클래스별 큐
+# - live        : 수업 중 실시간 작업 (발화 STT 등)
+# - interactive : 사용자가 기다리는 단건 작업
+# - bulk        : 교안 단위 배치 작업 (요약/TTS 사전 생성 등)
+CELERY_TASK_QUEUES = [Queue(q) for q in ("live", "interactive", "bulk")]
+CELERY_TASK_DEFAULT_QUEUE = "interactive"
+CELERY_TASK_ROUTES = {
+    "classes.tasks.run_speech": {"queue": "live"},
+    "lecture_docs.tasks.precompute_doc": {"queue": "bulk"},
+    "lecture_docs.tasks.pregenerate_exam_tts": {"queue": "interactive"},
+    "lecture_docs.tasks.run_board_ocr": {"queue": "live"},
+}
+
+# 큐별 워커 설정 (환경변수로 덮어쓰기 가능)
+QUEUE_WORKER_SETTINGS = {
+    queue: {
+        "concurrency": int(os.getenv(f"CELERY_{queue.upper()}_CONCURRENCY", concurrency)),
+        "prefetch_multiplier": int(os.getenv(f"CELERY_{queue.upper()}_PREFETCH", prefetch)),
+    }
+    for queue, concurrency, prefetch in (
+        ("live", 4, 4),
+        ("interactive", 4, 2),
+        ("bulk", 2, 1),
+    )
+}
+
+# 큐 전용 워커 실행: CELERY_WORKER_QUEUE=live celery -A project worker
+CELERY_WORKER_QUEUE = os.getenv("CELERY_WORKER_QUEUE")
+if CELERY_WORKER_QUEUE:
+    CELERY_TASK_QUEUES = [Queue(CELERY_WORKER_QUEUE)]
+    CELERY_WORKER_CONCURRENCY = QUEUE_WORKER_SETTINGS[CELERY_WORKER_QUEUE]["concurrency"]
+    CELERY_WORKER_PREFETCH_MULTIPLIER = QUEUE_WORKER_SETTINGS[CELERY_WORKER_QUEUE]["prefetch_multiplier"]
+
 AI_OCR_URL = os.getenv("AI_OCR_URL")
+AI_OCR_RETRY_URL = os.getenv("AI_OCR_RETRY_URL")
 AI_BOARD_OCR_URL = os.getenv("AI_BOARD_OCR_URL")
+AI_BOARD_OCR_IMAGE_URL = os.getenv("AI_BOARD_OCR_IMAGE_URL")  # 판서 바이너리 업로드 API (/ocr/board/image)
+# 판서 OCR은 백그라운드 태스크에서 실행하므로 요청 스레드보다 여유 있게 대기
+BOARD_OCR_TIMEOUT = int(os.getenv("BOARD_OCR_TIMEOUT", 60))
 AI_EXAM_OCR_URL = os.getenv("AI_EXAM_OCR_URL")
 AI_EXAM_OCR_URL = os.getenv("AI_EXAM_OCR_URL")
 AI_EXAM_OCR_RESULT_URL = os.getenv("AI_EXAM_OCR_RESULT_URL") 
+AI_EXAM_OCR_JOB_URL = os.getenv("AI_EXAM_OCR_JOB_URL")  # 비동기 작업 API (/exam/jobs)
+# 시험지 여러 장을 동시에 AI OCR로 보낼 최대 개수
+EXAM_OCR_MAX_CONCURRENCY = int(os.getenv("EXAM_OCR_MAX_CONCURRENCY", 4))
+# 시험 세션 Redis 키는 종료 시각 + 유예 시간에 자동 만료
+EXAM_SESSION_GRACE_SECONDS = int(os.getenv("EXAM_SESSION_GRACE_SECONDS", 600))
+# 시험 item TTS 사전 생성 동시 처리 수
+EXAM_TTS_CONCURRENCY = int(os.getenv("EXAM_TTS_CONCURRENCY", 4))
+# TTS 사전 생성 워커 표시 TTL (초), 워커가 item을 끝낼 때마다 연장
+EXAM_TTS_WORKER_LEASE = int(os.getenv("EXAM_TTS_WORKER_LEASE", 120))
 BACKEND_BASE_URL= "https://campusmate.shop"
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
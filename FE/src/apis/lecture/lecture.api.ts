@@ -1,7 +1,7 @@
 import { getResponse, postResponse } from "@apis/instance";
 import type { AxiosError } from "axios";
 
-export type PageStatus = "processing" | "done";
+export type PageStatus = "processing" | "done" | "failed";
 
 export type PageTTSResponse = {
   status?: "processing" | "done";